@@ -0,0 +1,18 @@
+-- Tag every forecast row with the run that produced it
+ALTER TABLE forecast_results ADD COLUMN run_id VARCHAR(64) NOT NULL DEFAULT 'legacy';
+
+-- Remove duplicates left by earlier re-runs, keeping the most recent row of each
+DELETE FROM forecast_results older
+USING forecast_results newer
+WHERE older.country_code = newer.country_code
+  AND older.indicator_id = newer.indicator_id
+  AND older.forecast_date = newer.forecast_date
+  AND older.forecast_horizon = newer.forecast_horizon
+  AND older.model_name = newer.model_name
+  AND older.run_id = newer.run_id
+  AND older.forecast_id < newer.forecast_id;
+
+-- Natural key used by the pipeline to upsert forecasts idempotently
+ALTER TABLE forecast_results
+    ADD CONSTRAINT forecast_results_natural_key
+    UNIQUE (country_code, indicator_id, forecast_date, forecast_horizon, model_name, run_id);
\ No newline at end of file
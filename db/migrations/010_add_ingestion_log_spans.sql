@@ -0,0 +1,8 @@
+-- Nested telemetry spans in ingestion_log (see forecasting/scripts/telemetry.py).
+-- run_id groups every span of one pipeline run; parent_span_id links a step to its stage.
+ALTER TABLE ingestion_log
+    ADD COLUMN span_id UUID,
+    ADD COLUMN parent_span_id UUID,
+    ADD COLUMN metrics JSONB;
+
+CREATE INDEX idx_ingestion_log_parent_span ON ingestion_log(parent_span_id);
\ No newline at end of file
@@ -0,0 +1,41 @@
+-- Point-in-time reads of canonical_timeseries: for each (country, indicator, date)
+-- the latest vintage published on or before p_as_of. Rows without a vintage_date
+-- count as the oldest vintage. p_as_of NULL means the latest vintage overall.
+CREATE INDEX idx_canonical_timeseries_vintage
+    ON canonical_timeseries(country_code, indicator_id, date_value, vintage_date DESC NULLS LAST);
+
+CREATE OR REPLACE FUNCTION timeseries_as_of(
+    p_as_of DATE DEFAULT NULL,
+    p_countries TEXT[] DEFAULT NULL,
+    p_indicators INTEGER[] DEFAULT NULL,
+    p_start_date DATE DEFAULT NULL,
+    p_end_date DATE DEFAULT NULL,
+    -- Keyset cursor: the (country_code, indicator_id, date_value) of the last row already read
+    p_after_country TEXT DEFAULT NULL,
+    p_after_indicator INTEGER DEFAULT NULL,
+    p_after_date DATE DEFAULT NULL,
+    p_limit INTEGER DEFAULT NULL
+)
+RETURNS TABLE (
+    country_code VARCHAR,
+    indicator_id INTEGER,
+    date_value DATE,
+    value DECIMAL,
+    unit VARCHAR,
+    vintage_date DATE
+) AS $$
+    SELECT DISTINCT ON (t.country_code, t.indicator_id, t.date_value)
+           t.country_code, t.indicator_id, t.date_value, t.value, t.unit, t.vintage_date
+    FROM canonical_timeseries t
+    WHERE (p_as_of IS NULL OR t.vintage_date IS NULL OR t.vintage_date <= p_as_of)
+      AND (p_countries IS NULL OR t.country_code = ANY(p_countries))
+      AND (p_indicators IS NULL OR t.indicator_id = ANY(p_indicators))
+      AND (p_start_date IS NULL OR t.date_value >= p_start_date)
+      AND (p_end_date IS NULL OR t.date_value <= p_end_date)
+      AND (p_after_country IS NULL
+           OR (t.country_code, t.indicator_id, t.date_value) > (p_after_country, p_after_indicator, p_after_date))
+    ORDER BY t.country_code, t.indicator_id, t.date_value, t.vintage_date DESC NULLS LAST
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+GRANT EXECUTE ON FUNCTION timeseries_as_of TO service_role;
\ No newline at end of file
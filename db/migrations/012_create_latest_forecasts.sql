@@ -0,0 +1,79 @@
+-- Latest forecast per (country, indicator, horizon, model), kept current by a trigger
+-- on forecast_results so readers never scan the forecast history
+-- (see forecasting/scripts/forecast_reader.py). "Latest" is the most recently
+-- created row; updated_at records when each entry last changed, for delta reads.
+CREATE TABLE latest_forecasts (
+    country_code VARCHAR(3) NOT NULL,
+    indicator_id INTEGER NOT NULL,
+    forecast_horizon VARCHAR(10) NOT NULL,
+    model_name VARCHAR(50) NOT NULL,
+    forecast_id INTEGER NOT NULL,
+    forecast_date DATE NOT NULL,
+    forecast_value FLOAT NOT NULL,
+    confidence_interval_lower FLOAT,
+    confidence_interval_upper FLOAT,
+    run_id VARCHAR(64) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (country_code, indicator_id, forecast_horizon, model_name)
+);
+
+CREATE INDEX idx_latest_forecasts_updated_at ON latest_forecasts(updated_at);
+-- Keyset paging for full and delta reads
+CREATE INDEX idx_latest_forecasts_forecast_id ON latest_forecasts(forecast_id);
+
+CREATE OR REPLACE FUNCTION track_latest_forecast() RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.country_code IS NULL OR NEW.indicator_id IS NULL THEN
+        RETURN NULL;
+    END IF;
+    INSERT INTO latest_forecasts AS l (
+        country_code, indicator_id, forecast_horizon, model_name, forecast_id, forecast_date,
+        forecast_value, confidence_interval_lower, confidence_interval_upper, run_id, created_at, updated_at
+    ) VALUES (
+        NEW.country_code, NEW.indicator_id, NEW.forecast_horizon, NEW.model_name, NEW.forecast_id, NEW.forecast_date,
+        NEW.forecast_value, NEW.confidence_interval_lower, NEW.confidence_interval_upper, NEW.run_id,
+        COALESCE(NEW.created_at, NOW()), clock_timestamp()
+    )
+    ON CONFLICT (country_code, indicator_id, forecast_horizon, model_name) DO UPDATE SET
+        forecast_id = EXCLUDED.forecast_id,
+        forecast_date = EXCLUDED.forecast_date,
+        forecast_value = EXCLUDED.forecast_value,
+        confidence_interval_lower = EXCLUDED.confidence_interval_lower,
+        confidence_interval_upper = EXCLUDED.confidence_interval_upper,
+        run_id = EXCLUDED.run_id,
+        created_at = EXCLUDED.created_at,
+        updated_at = EXCLUDED.updated_at
+    -- An upsert that rewrites an older run must not replace a newer forecast
+    WHERE (l.created_at, l.forecast_id) <= (EXCLUDED.created_at, EXCLUDED.forecast_id);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER forecast_results_track_latest
+    AFTER INSERT OR UPDATE ON forecast_results
+    FOR EACH ROW EXECUTE FUNCTION track_latest_forecast();
+
+-- Backfill from the existing history
+INSERT INTO latest_forecasts (
+    country_code, indicator_id, forecast_horizon, model_name, forecast_id, forecast_date,
+    forecast_value, confidence_interval_lower, confidence_interval_upper, run_id, created_at
+)
+SELECT DISTINCT ON (country_code, indicator_id, forecast_horizon, model_name)
+       country_code, indicator_id, forecast_horizon, model_name, forecast_id, forecast_date,
+       forecast_value, confidence_interval_lower, confidence_interval_upper, run_id, COALESCE(created_at, NOW())
+FROM forecast_results
+WHERE country_code IS NOT NULL AND indicator_id IS NOT NULL
+ORDER BY country_code, indicator_id, forecast_horizon, model_name, created_at DESC NULLS LAST, forecast_id DESC;
+
+ALTER TABLE latest_forecasts ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY service_role_access ON latest_forecasts
+    FOR ALL
+    TO service_role
+    USING (true);
+
+CREATE POLICY auth_read_access ON latest_forecasts
+    FOR SELECT
+    TO authenticated
+    USING (true);
\ No newline at end of file
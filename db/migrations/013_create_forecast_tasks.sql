@@ -0,0 +1,26 @@
+-- Work queue for distributed forecasting (see forecasting/scripts/work_queue.py).
+-- A coordinator enqueues one task per chunk of series for a run; workers on any
+-- node claim tasks with FOR UPDATE SKIP LOCKED and hold them under a lease they
+-- renew by heartbeat. A task whose lease expires can be claimed again until it
+-- has used max_attempts, after which it is marked failed.
+CREATE TABLE forecast_tasks (
+    task_id BIGSERIAL PRIMARY KEY,
+    run_id VARCHAR(64) NOT NULL,
+    task_key TEXT NOT NULL,
+    payload JSONB NOT NULL,
+    status VARCHAR(10) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'done', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    worker_id TEXT,
+    lease_expires_at TIMESTAMP WITH TIME ZONE,
+    heartbeat_at TIMESTAMP WITH TIME ZONE,
+    result JSONB,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    -- Re-enqueueing a run never duplicates its tasks
+    CONSTRAINT forecast_tasks_run_key UNIQUE (run_id, task_key)
+);
+
+-- Claims only scan the open tasks of a run, oldest first
+CREATE INDEX idx_forecast_tasks_open ON forecast_tasks(run_id, task_id) WHERE status IN ('pending', 'running');
\ No newline at end of file
@@ -0,0 +1,13 @@
+-- Version of latest_forecasts for reader caches (see forecasting/scripts/forecast_reader.py).
+-- Every write reaches latest_forecasts through the migration 012 trigger, which stamps
+-- updated_at, so the newest updated_at moves whenever any writer changes an entry;
+-- the entry count also catches entries deleted without a replacement.
+CREATE OR REPLACE FUNCTION latest_forecasts_version()
+RETURNS TABLE (
+    updated_at TIMESTAMP WITH TIME ZONE,
+    entries BIGINT
+) AS $$
+    SELECT max(l.updated_at), count(*) FROM latest_forecasts l;
+$$ LANGUAGE sql STABLE;
+
+GRANT EXECUTE ON FUNCTION latest_forecasts_version TO service_role;
\ No newline at end of file
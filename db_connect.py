@@ -1,23 +1,32 @@
 import psycopg2
+import psycopg2.pool
 from dotenv import load_dotenv
 import os
 from contextlib import contextmanager
 
 load_dotenv()
 
+_pool = None
+
+def connection_params():
+    """Connection settings for Supabase; DATABASE_URL overrides them (e.g. a local Postgres)."""
+    if os.getenv("DATABASE_URL"):
+        return {"dsn": os.getenv("DATABASE_URL")}
+    return {
+        "dbname": "postgres",
+        "user": "postgres",
+        "password": os.getenv("SUPABASE_KEY"),
+        "host": os.getenv("SUPABASE_URL").replace("https://", "").replace("/rest/v1", ""),
+        "port": 5432,
+        "sslmode": "require",
+        "fallback_application_name": "your_app_name"
+    }
+
 @contextmanager
 def get_db_connection():
     """Create a database connection to Supabase with SSL."""
     try:
-        conn = psycopg2.connect(
-            dbname="postgres",
-            user="postgres",
-            password=os.getenv("SUPABASE_KEY"),
-            host=os.getenv("SUPABASE_URL").replace("https://", "").replace("/rest/v1", ""),
-            port=5432,
-            sslmode="require",
-            fallback_application_name="your_app_name" # Add this line
-        )
+        conn = psycopg2.connect(**connection_params())
         yield conn
     except psycopg2.Error as e:
         print(f"ERROR: Database connection failed - {e}")
@@ -26,6 +35,27 @@ def get_db_connection():
         if 'conn' in locals():
             conn.close()
 
+def get_connection_pool():
+    """Process-wide connection pool, created on first use (size from DB_POOL_MAX, default 4)."""
+    global _pool
+    if _pool is None:
+        _pool = psycopg2.pool.ThreadedConnectionPool(1, int(os.getenv("DB_POOL_MAX", "4")), **connection_params())
+    return _pool
+
+@contextmanager
+def get_pooled_connection():
+    """Borrow a pooled connection; commits on success, rolls back on error."""
+    pool = get_connection_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
+
 def test_connection():
     """Test database connection and table existence."""
     try:
@@ -1,8 +1,12 @@
 from supabase import create_client, Client
 from dotenv import load_dotenv
 import os
+import sys
 import pandas as pd
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+from timeseries_stream import read_timeseries
+
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -13,16 +17,12 @@ def retrieve_timeseries():
         # Initialize Supabase client
         supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
         
-        # Fetch data from canonical_timeseries
-        response = supabase.table("canonical_timeseries").select("country_code, indicator_id, date_value, value").execute()
+        # Fetch data from canonical_timeseries, one keyset page at a time
+        df = read_timeseries(supabase, columns=["country_code", "indicator_id", "date_value", "value"])
         
-        if not response.data:
+        if df.empty:
             print("No data retrieved from canonical_timeseries")
             return None
-            
-        # Convert to DataFrame
-        df = pd.DataFrame(response.data)
-        df['date_value'] = pd.to_datetime(df['date_value'])
         
         print(f"Retrieved {len(df)} records from canonical_timeseries")
         return df
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+# A point in the panel; each key can have several vintages
+SERIES_KEY = ["country_code", "indicator_id", "date_value"]
+
+def as_of_param(as_of):
+    """Database form of an as-of argument: 'latest' becomes NULL (no cutoff), dates become ISO strings."""
+    if as_of is None or as_of == 'latest':
+        return None
+    return pd.Timestamp(as_of).strftime('%Y-%m-%d')
+
+class AsOfIndex:
+    """Point-in-time view over every vintage of a timeseries frame.
+
+    The frame is sorted once by key and vintage (missing vintages first, as the
+    oldest). Each query is then a vectorized eligibility mask plus "last eligible
+    row per key", so repeated as-of queries, such as one per backtest cutoff,
+    never re-sort or re-group.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame.sort_values(SERIES_KEY + ['vintage_date'], na_position='first', kind='stable', ignore_index=True)
+        # Keys are contiguous after the sort, so a change in any key column starts a new group
+        key_change = np.zeros(len(self.frame), dtype=bool)
+        for column in SERIES_KEY:
+            values = self.frame[column].to_numpy()
+            key_change[1:] |= values[1:] != values[:-1]
+        self.group = np.cumsum(key_change)
+        self.vintage = pd.to_datetime(self.frame['vintage_date']).to_numpy('datetime64[ns]')
+        self.undated = np.isnat(self.vintage)
+
+    def positions(self, as_of='latest'):
+        """Row positions of the latest vintage at or before as_of for every key."""
+        if as_of is None or as_of == 'latest':
+            eligible = np.flatnonzero(np.ones(len(self.frame), dtype=bool))
+        else:
+            cutoff = np.datetime64(pd.Timestamp(as_of).to_datetime64(), 'ns')
+            eligible = np.flatnonzero(self.undated | (self.vintage <= cutoff))
+        groups = self.group[eligible]
+        last = np.ones(len(eligible), dtype=bool)
+        last[:-1] = groups[1:] != groups[:-1]
+        return eligible[last]
+
+    def select(self, as_of='latest', columns=None):
+        """One row per key: the value as it was known on as_of."""
+        rows = self.frame.iloc[self.positions(as_of)]
+        return (rows[columns] if columns else rows).reset_index(drop=True)
+
+    def changes(self, since, as_of='latest', columns=None):
+        """Rows of select(as_of) that differ from select(since): new points and revisions published after since."""
+        positions = self.positions(as_of)
+        cutoff = np.datetime64(pd.Timestamp(since).to_datetime64(), 'ns')
+        revised = ~self.undated[positions] & (self.vintage[positions] > cutoff)
+        rows = self.frame.iloc[positions[revised]]
+        return (rows[columns] if columns else rows).reset_index(drop=True)
\ No newline at end of file
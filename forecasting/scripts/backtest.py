@@ -0,0 +1,173 @@
+import argparse
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+import pandas as pd
+from forecast_engine import horizon_steps
+from model_registry import DEFAULT_MODEL, as_series, fit_model
+from process_pool import default_chunksize
+
+def synthetic_series(n_series, n_points=120, seed=0):
+    """Monthly random walks with drift, yearly seasonality and AR(1) noise, keyed like preprocess_data columns."""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2000-01-31', periods=n_points, freq='ME')
+    panel = {}
+    for i in range(n_series):
+        noise = np.zeros(n_points)
+        shocks = rng.normal(0, 1, n_points)
+        phi = rng.uniform(-0.5, 0.8)
+        for t in range(1, n_points):
+            noise[t] = phi * noise[t - 1] + shocks[t]
+        level = 100 + np.cumsum(rng.normal(rng.uniform(-0.2, 0.5), 0.5, n_points))
+        seasonal = rng.uniform(0, 4) * np.sin(np.arange(n_points) * 2 * np.pi / 12 + rng.uniform(0, np.pi))
+        panel[f'S{i:04d}_Synthetic'] = pd.Series(level + seasonal + noise, index=index)
+    return panel
+
+def cached_series(cache_dir=None, min_points=36):
+    """Monthly series from the local canonical cache (see canonical_cache.py), without touching the network."""
+    from canonical_cache import CanonicalCache
+    cache = CanonicalCache(cache_dir)
+    timeseries = cache.load_timeseries(["country_code", "indicator_id", "date_value", "value"])
+    panel = {}
+    for (country_code, indicator_id), group in timeseries.groupby(['country_code', 'indicator_id']):
+        monthly = group.set_index('date_value')['value'].resample('ME').mean().interpolate(method='linear')
+        if len(monthly) >= min_points:
+            panel[f'{country_code}_{indicator_id}'] = monthly
+    return panel
+
+def update_fit(model, model_fit, history, new_values):
+    """Roll a fit forward to include new_values, reusing its parameters where the model allows it."""
+    if hasattr(model_fit, 'extend'):
+        # State-space fits only run the filter over the new points; no re-optimization
+        return model_fit.extend(new_values)
+    # The naive models are cheap enough to rebuild from the full history
+    return fit_model(model, history)
+
+def backtest_series(name, series, model=DEFAULT_MODEL, horizons=('1M', '3M', '6M'), initial=36, step=1, refit_every=12, alpha=0.05):
+    """Replay one series at every cutoff from `initial` onwards and score each horizon.
+
+    The model is fully re-estimated every refit_every cutoffs; cutoffs in between
+    extend the previous fit with the newly revealed observations.
+    """
+    series = as_series(series)
+    parsed = [horizon_steps(horizon) for horizon in horizons]
+    max_steps = max(steps for _, steps in parsed)
+    values = series.to_numpy()
+
+    folds = []
+    model_fit = None
+    last_cutoff = None
+    since_refit = 0
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for cutoff in range(initial, len(series), step):
+            start = time.perf_counter()
+            try:
+                if model_fit is None or since_refit >= refit_every:
+                    model_fit = fit_model(model, series.iloc[:cutoff])
+                    fit_kind, since_refit = 'fit', 0
+                else:
+                    model_fit = update_fit(model, model_fit, series.iloc[:cutoff], series.iloc[last_cutoff:cutoff])
+                    fit_kind = 'update'
+                fitted = time.perf_counter()
+
+                forecast_obj = model_fit.get_forecast(steps=max_steps)
+                predicted_mean = forecast_obj.predicted_mean.to_numpy()
+                conf_int = forecast_obj.conf_int(alpha=alpha).to_numpy()
+                predicted = time.perf_counter()
+            except Exception:
+                # Start over with a fresh fit at the next cutoff
+                model_fit = None
+                continue
+            last_cutoff = cutoff
+            since_refit += 1
+
+            for label, steps in parsed:
+                target = cutoff + steps - 1
+                if target >= len(values):
+                    continue
+                actual = values[target]
+                forecast = predicted_mean[steps - 1]
+                folds.append({
+                    'series': name,
+                    'model_name': model,
+                    'cutoff': series.index[cutoff - 1],
+                    'forecast_horizon': label,
+                    'forecast_value': forecast,
+                    'actual': actual,
+                    'abs_error': abs(forecast - actual),
+                    'ape': abs(forecast - actual) / abs(actual) if actual != 0 else np.nan,
+                    'covered': conf_int[steps - 1, 0] <= actual <= conf_int[steps - 1, 1],
+                    'fit_kind': fit_kind,
+                    'fit_seconds': fitted - start,
+                    'predict_seconds': predicted - fitted
+                })
+    return folds
+
+def run_backtest(panel, models=(DEFAULT_MODEL,), horizons=('1M', '3M', '6M'), initial=36, step=1, refit_every=12, workers=1):
+    """Backtest every (series, model) pair, across processes when workers > 1; returns one row per fold and horizon."""
+    jobs = [(name, series, model) for name, series in panel.items() for model in models]
+    run = partial(run_job, horizons=horizons, initial=initial, step=step, refit_every=refit_every)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            outputs = list(executor.map(run, jobs, chunksize=default_chunksize(len(jobs), workers)))
+    else:
+        outputs = list(map(run, jobs))
+    return pd.DataFrame([fold for folds in outputs for fold in folds])
+
+def run_job(job, **kwargs):
+    name, series, model = job
+    return backtest_series(name, series, model=model, **kwargs)
+
+def summarize(folds):
+    """Accuracy per model and horizon, plus wall time per model split by full fits and rolled-forward updates."""
+    accuracy = folds.groupby(['model_name', 'forecast_horizon']).agg(
+        folds=('abs_error', 'size'),
+        mae=('abs_error', 'mean'),
+        mape=('ape', 'mean'),
+        coverage=('covered', 'mean')
+    )
+    # Timings are recorded once per cutoff, so drop the per-horizon repeats first
+    per_cutoff = folds.drop_duplicates(['series', 'model_name', 'cutoff'])
+    timing = per_cutoff.pivot_table(index='model_name', columns='fit_kind', values='fit_seconds', aggfunc='mean')
+    timing.columns = [f'mean_{kind}_s' for kind in timing.columns]
+    timing['mean_predict_s'] = per_cutoff.groupby('model_name')['predict_seconds'].mean()
+    timing['total_s'] = per_cutoff.groupby('model_name')[['fit_seconds', 'predict_seconds']].sum().sum(axis=1)
+    return accuracy, timing
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of forecast models, offline")
+    parser.add_argument("--source", choices=["synthetic", "cache"], default="synthetic", help="synthetic series or the local canonical cache")
+    parser.add_argument("--series", type=int, default=20, help="number of synthetic series")
+    parser.add_argument("--points", type=int, default=120, help="monthly points per synthetic series")
+    parser.add_argument("--models", default=DEFAULT_MODEL, help="semicolon-separated registry model names")
+    parser.add_argument("--horizons", default="1M,3M,6M", help="comma-separated horizons")
+    parser.add_argument("--initial", type=int, default=36, help="first cutoff (training points)")
+    parser.add_argument("--refit-every", type=int, default=12, help="cutoffs between full re-estimations")
+    parser.add_argument("--workers", type=int, default=1, help="number of processes")
+    parser.add_argument("--output", default=None, help="optional CSV path for the per-fold results")
+    args = parser.parse_args()
+
+    if args.source == "synthetic":
+        panel = synthetic_series(args.series, args.points)
+    else:
+        panel = cached_series(min_points=args.initial + 1)
+
+    start = time.perf_counter()
+    folds = run_backtest(
+        panel, models=args.models.split(';'), horizons=args.horizons.split(','),
+        initial=args.initial, refit_every=args.refit_every, workers=args.workers
+    )
+    elapsed = time.perf_counter() - start
+    if folds.empty:
+        print("No folds produced")
+    else:
+        accuracy, timing = summarize(folds)
+        print(f"Backtested {len(panel)} series, {folds[['series', 'model_name', 'cutoff']].drop_duplicates().shape[0]} cutoffs in {elapsed:.1f}s")
+        print(accuracy.to_string())
+        print(timing.to_string())
+        if args.output:
+            folds.to_csv(args.output, index=False)
+            print(f"Saved fold results to {args.output}")
\ No newline at end of file
@@ -0,0 +1,186 @@
+import numpy as np
+
+# Two-sided 95% normal quantile, as used by conf_int(alpha=0.05)
+Z_95 = 1.959963984540054
+# Newton starts for (phi, theta): white noise, two opposite-sign pairs and two
+# near-cancelling pairs, since drifting or oscillating series often peak with both roots close to +-1
+START_POINTS = [(0.0, 0.0), (0.5, -0.5), (-0.5, 0.5), (0.98, -0.95), (-0.95, 0.98)]
+STEP_SCALES = np.array([1.0, 0.5, 0.25, 0.1, 0.02])
+
+def pad_panel(series_list):
+    """Left-align ragged series in one (series x time) array; returns (values, lengths)."""
+    lengths = np.array([len(s) for s in series_list], dtype='int64')
+    values = np.zeros((len(series_list), lengths.max() if len(lengths) else 0))
+    for i, s in enumerate(series_list):
+        values[i, :lengths[i]] = np.asarray(s, dtype='float64')
+    return values, lengths
+
+def arma11_filter(w, lengths, phi, theta, keep_last=False):
+    """Kalman filter of zero-mean ARMA(1,1) for every row of w at once, with unit innovation variance.
+
+    Rows are left-aligned; steps at or beyond a row's length are filtered but
+    weighted out, so ragged rows need no per-row loop. Returns the sums of
+    squared standardized innovations and of log innovation variances, plus
+    (with keep_last) the last observation, innovation and innovation variance
+    of every row.
+    """
+    n, steps = w.shape
+    columns = np.ascontiguousarray(w.T)
+    weights = (np.arange(steps)[:, None] < lengths).astype('float64')
+    theta2 = theta * theta
+    # Stationary variance of w_t, the first innovation variance
+    F = (1 + 2 * phi * theta + theta2) / (1 - phi ** 2)
+    prediction = np.zeros(n)
+    sum_squares = np.zeros(n)
+    sum_log_f = np.zeros(n)
+    # log is the dearest step, so innovation variances are multiplied up and logged in blocks
+    product_f = np.ones(n)
+    last = [np.zeros(n), np.zeros(n), np.ones(n)] if keep_last else None
+    for t in range(steps):
+        y, weight = columns[t], weights[t]
+        v = y - prediction
+        ratio = v / F
+        sum_squares += v * ratio * weight
+        product_f *= np.where(weight > 0, F, 1.0)
+        if t % 32 == 31:
+            sum_log_f += np.log(product_f)
+            product_f[:] = 1.0
+        if keep_last:
+            is_last = t == lengths - 1
+            for values, current in zip(last, (y, v, F)):
+                np.copyto(values, current, where=is_last)
+        prediction = phi * y + theta * ratio
+        F = 1 + theta2 * (1 - 1 / F)
+    sum_log_f += np.log(product_f)
+    if keep_last:
+        return (sum_squares, sum_log_f, *last)
+    return sum_squares, sum_log_f
+
+def objective(x, w, lengths):
+    """Average negative concentrated log-likelihood at transformed parameters x = (atanh phi, atanh theta)."""
+    phi, theta = np.tanh(x[:, 0]), np.tanh(x[:, 1])
+    sum_squares, sum_log_f = arma11_filter(w, lengths, phi, theta)
+    sigma2 = np.maximum(sum_squares / lengths, 1e-300)
+    return 0.5 * (np.log(2 * np.pi) + 1 + np.log(sigma2)) + 0.5 * sum_log_f / lengths
+
+def stacked(points, w, lengths):
+    # Evaluate k parameter sets per series in one filter pass over k stacked copies of the panel
+    k = len(points)
+    values = objective(np.concatenate(points), np.tile(w, (k, 1)), np.tile(lengths, k))
+    return values.reshape(k, -1)
+
+def newton_arma11(x, w, lengths, max_iter=50, h=1e-4, tol=1e-9):
+    """Minimize objective() from transformed start points x, one row per series, by batched damped Newton steps.
+
+    Gradient and Hessian come from central differences; all the probe points
+    of an iteration, and all the trial step lengths, are filtered in a single
+    pass each. Rows drop out of the batch as they converge. Returns
+    (x, objective at x, converged).
+    """
+    x = x.copy()
+    fx = objective(x, w, lengths)
+    converged = np.zeros(len(w), dtype=bool)
+    active = np.arange(len(w))
+    e1, e2 = np.array([h, 0.0]), np.array([0.0, h])
+    for _ in range(max_iter):
+        xa, fa, wa, la = x[active], fx[active], w[active], lengths[active]
+        f = stacked([xa + e1, xa - e1, xa + e2, xa - e2, xa + e1 + e2, xa - e1 - e2], wa, la)
+        gradient = np.stack([(f[0] - f[1]) / (2 * h), (f[2] - f[3]) / (2 * h)], axis=1)
+        h11 = (f[0] - 2 * fa + f[1]) / h ** 2
+        h22 = (f[2] - 2 * fa + f[3]) / h ** 2
+        h12 = (f[4] - f[0] - f[2] + 2 * fa - f[1] - f[3] + f[5]) / (2 * h ** 2)
+
+        # Newton direction where the Hessian is positive definite, steepest descent elsewhere
+        det = h11 * h22 - h12 ** 2
+        newton = (h11 > 0) & (det > 0)
+        safe_det = np.where(newton, det, 1.0)[:, None]
+        newton_step = -np.stack([h22 * gradient[:, 0] - h12 * gradient[:, 1],
+                                 h11 * gradient[:, 1] - h12 * gradient[:, 0]], axis=1) / safe_det
+        step = np.where(newton[:, None], newton_step, -gradient)
+        # Cap the step; one unit in atanh space already moves phi from 0 to 0.76
+        norm = np.linalg.norm(step, axis=1)
+        step *= np.minimum(1.0, 1.0 / np.maximum(norm, 1e-300))[:, None]
+
+        trials = stacked([xa + scale * step for scale in STEP_SCALES], wa, la)
+        best = trials.argmin(axis=0)
+        best_f = trials[best, np.arange(len(active))]
+        improved = best_f < fa
+        x[active] = np.where(improved[:, None], xa + STEP_SCALES[best][:, None] * step, xa)
+        fx[active] = np.where(improved, best_f, fa)
+        done = fa - fx[active] < tol * (1 + np.abs(fa))
+        converged[active[done]] = True
+        active = active[~done]
+        if len(active) == 0:
+            break
+    return x, fx, converged
+
+def fit_arma11(w, lengths, starts=START_POINTS, max_iter=100):
+    """Maximum likelihood (phi, theta) for every row of w.
+
+    The ARMA(1,1) likelihood is often multimodal (near-cancelling roots at the
+    boundary compete with interior optima), so Newton runs from every start
+    point at once and the best end point of each series wins.
+    """
+    n, k = len(w), len(starts)
+    x0 = np.repeat(np.arctanh(np.array(starts, dtype='float64')), n, axis=0)
+    x, fx, converged = newton_arma11(x0, np.tile(w, (k, 1)), np.tile(lengths, k), max_iter=max_iter)
+    best = fx.reshape(k, n).argmin(axis=0) * n + np.arange(n)
+    return np.tanh(x[best, 0]), np.tanh(x[best, 1]), converged[best]
+
+def forecast_arima111(levels, lengths, phi, theta, max_steps):
+    """Level forecasts and forecast standard deviations for ARIMA(1,1,1) with fitted phi and theta.
+
+    The ARMA filter state after each row's last difference is pushed forward,
+    and the level error variance is propagated exactly through the
+    cumulated-state recursion, including the remaining state uncertainty, as
+    statsmodels does.
+    """
+    w = np.diff(levels, axis=1)
+    w_lengths = lengths - 1
+    sum_squares, _, last_y, last_v, last_f = arma11_filter(w, w_lengths, phi, theta, keep_last=True)
+    sigma2 = sum_squares / w_lengths
+    last_level = levels[np.arange(len(levels)), lengths - 1]
+
+    # One-step-ahead ARMA state [w, theta * e] and its error covariance (unit variance)
+    a0 = phi * last_y + theta * last_v / last_f
+    p00 = 1 + theta ** 2 * (1 - 1 / last_f)
+    p01 = theta
+    p11 = theta ** 2
+
+    # Covariance of [cumulated level error S, state error u0, u1], starting at S = u0
+    c = np.zeros((len(levels), 3, 3))
+    c[:, 0, 0] = c[:, 0, 1] = c[:, 1, 0] = c[:, 1, 1] = p00
+    c[:, 0, 2] = c[:, 2, 0] = c[:, 1, 2] = c[:, 2, 1] = p01
+    c[:, 2, 2] = p11
+    m = np.zeros((len(levels), 3, 3))
+    m[:, 0, 0] = 1
+    m[:, 0, 1] = m[:, 1, 1] = phi
+    m[:, 0, 2] = m[:, 1, 2] = 1
+    r = np.stack([np.ones_like(theta), np.ones_like(theta), theta], axis=1)
+
+    means = np.zeros((len(levels), max_steps))
+    variances = np.zeros((len(levels), max_steps))
+    level, prediction = last_level.copy(), a0
+    for step in range(max_steps):
+        level = level + prediction
+        means[:, step] = level
+        variances[:, step] = c[:, 0, 0] * sigma2
+        prediction = phi * prediction
+        c = m @ c @ m.transpose(0, 2, 1) + r[:, :, None] * r[:, None, :]
+    return means, np.sqrt(variances), sigma2
+
+def fit_forecast_arima111(series_list, max_steps):
+    """Fit ARIMA(1,1,1) to every series together and forecast max_steps ahead.
+
+    Returns (means, standard deviations, fitted parameters); rows for series the
+    batched fit could not handle (too short, constant, non-finite) are NaN, and
+    params['ok'] marks the usable ones.
+    """
+    levels, lengths = pad_panel(series_list)
+    w = np.diff(levels, axis=1)
+    phi, theta, converged = fit_arma11(w, lengths - 1)
+    means, sd, sigma2 = forecast_arima111(levels, lengths, phi, theta, max_steps)
+    ok = (lengths >= 3) & np.isfinite(means).all(axis=1) & np.isfinite(sd).all(axis=1) & (sigma2 > 0)
+    means[~ok] = np.nan
+    sd[~ok] = np.nan
+    return means, sd, {'phi': phi, 'theta': theta, 'sigma2': sigma2, 'converged': converged, 'ok': ok}
\ No newline at end of file
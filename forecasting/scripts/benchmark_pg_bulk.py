@@ -0,0 +1,70 @@
+import argparse
+import time
+import uuid
+import pandas as pd
+import pg_bulk
+import supabase_client
+from forecast_sink import ForecastResultSink
+from timeseries_stream import read_timeseries
+
+# Needs DATABASE_URL for the COPY path; the REST path is timed too when Supabase is configured
+
+def make_rows(keys, rows):
+    # Spread the rows over the existing series so they satisfy the foreign keys
+    per_key = -(-rows // len(keys))
+    dates = pd.date_range('2030-01-01', periods=per_key, freq='D').strftime('%Y-%m-%d')
+    return [{
+        'country_code': country_code, 'indicator_id': int(indicator_id), 'forecast_date': date,
+        'forecast_value': float(i), 'forecast_horizon': '1M', 'model_name': 'ARIMA(1,1,1)',
+        'confidence_interval_lower': float(i) - 1, 'confidence_interval_upper': float(i) + 1
+    } for country_code, indicator_id in keys for i, date in enumerate(dates)][:rows]
+
+def time_write(sink, rows):
+    start = time.perf_counter()
+    with sink:
+        sink.add(rows)
+    return time.perf_counter() - start
+
+def time_read(read):
+    start = time.perf_counter()
+    frame = read()
+    return time.perf_counter() - start, len(frame)
+
+def benchmark(rows, batch_size):
+    keys = pg_bulk.load_timeseries(['country_code', 'indicator_id'])[['country_code', 'indicator_id']].drop_duplicates()
+    forecasts = make_rows(list(keys.itertuples(index=False)), rows)
+    results = {}
+
+    run_id = f"benchmark-{uuid.uuid4().hex[:8]}"
+    try:
+        results['copy'] = (time_write(pg_bulk.PgForecastSink(run_id=run_id, batch_size=batch_size), forecasts),
+                           *time_read(pg_bulk.load_timeseries))
+    finally:
+        pg_bulk.delete_forecast_run(run_id)
+
+    if supabase_client.is_configured():
+        client = supabase_client.get_client()
+        run_id = f"benchmark-{uuid.uuid4().hex[:8]}"
+        try:
+            results['rest'] = (time_write(ForecastResultSink(client, run_id=run_id, batch_size=batch_size), forecasts),
+                               *time_read(lambda: read_timeseries(client)))
+        finally:
+            pg_bulk.delete_forecast_run(run_id)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare COPY and REST writes of forecast_results and reads of canonical_timeseries")
+    parser.add_argument("--rows", default="10000,100000", help="comma-separated forecast row counts")
+    parser.add_argument("--batch-size", type=int, default=1000, help="rows per REST upsert or COPY batch")
+    args = parser.parse_args()
+
+    for rows in [int(r) for r in args.rows.split(',')]:
+        results = benchmark(rows, args.batch_size)
+        for path, (write_s, read_s, read_rows) in results.items():
+            print(f"{rows:>10,} rows via {path}: write {write_s:.2f}s ({rows / write_s:,.0f} rows/s), "
+                  f"read {read_rows:,} timeseries rows in {read_s:.2f}s")
+        if 'rest' in results:
+            print(f"{'':>10}       COPY speedup: write {results['rest'][0] / results['copy'][0]:.1f}x, "
+                  f"read {results['rest'][1] / results['copy'][1]:.1f}x")
+        else:
+            print(f"{'':>10}       REST path skipped: Supabase is not configured")
\ No newline at end of file
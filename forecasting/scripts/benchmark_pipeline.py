@@ -0,0 +1,142 @@
+import contextlib
+import json
+import os
+import tempfile
+import time
+import supabase_client
+from fake_supabase import FakeSupabase
+from memory_profile import MemoryProfiler
+from synthetic_data import generate_canonical
+from telemetry import peak_rss_mb
+
+# Recorded for the default configuration (python benchmark_pipeline.py --repeat 3 --save-baseline).
+# `python benchmark_pipeline.py --repeat 3` compares a run against it and exits 1 on a regression;
+# timings are machine-specific, so re-record it when moving to other hardware.
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+# A stage regresses when its time or traced peak grows by more than this fraction over the baseline
+DEFAULT_TOLERANCE = 0.25
+
+def run_benchmark(countries=20, indicators=10, years=10, vintages=2, engine='batched', lean=False, seed=0, trace_memory=False):
+    """Run fetch, preprocess, forecast and taxonomy on synthetic data against a FakeSupabase.
+
+    Returns {'config', 'stages', 'requests', 'peak_rss_mb'}; each stage has its
+    wall time, the count it processed (timeseries rows, or series for forecast)
+    and throughput. With trace_memory each stage also gets its traced peak above
+    its start; tracing slows Python allocations several times over, so time
+    and memory are best taken from separate runs (see measure()).
+    """
+    from fetch_data import fetch_validated_data
+    from forecast_data import forecast_data
+    from map_taxonomy import map_taxonomy
+    from preprocess_data import preprocess_panel
+
+    config = {'countries': countries, 'indicators': indicators, 'years': years, 'vintages': vintages,
+              'engine': engine, 'lean': lean, 'seed': seed}
+    client = FakeSupabase(generate_canonical(countries, indicators, years, vintages, seed=seed))
+    # Every module reaches the database through get_client(), so this reroutes the whole pipeline
+    previous = supabase_client._client
+    supabase_client.set_client(client)
+    stages = {}
+
+    try:
+        profiler = MemoryProfiler() if trace_memory else None
+        with profiler or contextlib.nullcontext(), tempfile.TemporaryDirectory() as state_dir:
+            def timed(stage, run, count):
+                with profiler.step(f"benchmark.{stage}") if profiler else contextlib.nullcontext():
+                    started = time.perf_counter()
+                    output = run()
+                    seconds = time.perf_counter() - started
+                n = count(output)
+                stages[stage] = {'seconds': round(seconds, 4), 'count': n, 'per_s': round(n / seconds, 1) if seconds else None,
+                                 'peak_mb': round(profiler.steps[-1]['peak_mb'], 2) if profiler else None}
+                return output
+
+            data = timed('fetch', lambda: fetch_validated_data(use_cache=False, backend='rest'), lambda out: len(out[2]))
+            countries_df, indicators_df, timeseries = data
+            panel = timed('preprocess', lambda: preprocess_panel(countries_df, indicators_df, timeseries, lean=lean),
+                          lambda out: len(timeseries))
+            timed('forecast', lambda: forecast_data(panel, countries_df, indicators_df, backend='rest', engine=engine,
+                                                    state_dir=state_dir), lambda out: len(panel))
+            timed('taxonomy', lambda: map_taxonomy(countries_df, indicators_df, backend='rest', timeseries=timeseries),
+                  lambda out: len(out))
+    finally:
+        supabase_client.set_client(previous)
+
+    return {'config': config, 'stages': stages, 'requests': dict(client.requests), 'peak_rss_mb': round(peak_rss_mb(), 1)}
+
+def measure(repeat=1, **config):
+    """Best time per stage over `repeat` untraced runs, plus traced peaks from one more run."""
+    best = run_benchmark(**config)
+    for _ in range(repeat - 1):
+        # The fastest run is the one least disturbed by the rest of the machine
+        for stage, metrics in run_benchmark(**config)['stages'].items():
+            if metrics['seconds'] < best['stages'][stage]['seconds']:
+                best['stages'][stage].update(seconds=metrics['seconds'], per_s=metrics['per_s'])
+    for stage, metrics in run_benchmark(trace_memory=True, **config)['stages'].items():
+        best['stages'][stage]['peak_mb'] = metrics['peak_mb']
+    return best
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Stage metrics that grew more than tolerance over the baseline, as messages (empty when none did)."""
+    if current['config'] != baseline['config']:
+        raise ValueError(f"Baseline was recorded for {baseline['config']}, not {current['config']}")
+    regressions = []
+    for stage, metrics in current['stages'].items():
+        base = baseline['stages'].get(stage)
+        if base is None:
+            continue
+        for metric, unit in (('seconds', 's'), ('peak_mb', 'MB')):
+            if base[metric] and metrics[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{stage}: {metric} {metrics[metric]:.2f} {unit} vs {base[metric]:.2f} {unit} "
+                                   f"baseline (+{metrics[metric] / base[metric] - 1:.0%})")
+    return regressions
+
+def format_result(result, baseline=None):
+    lines = [f"{'stage':<12} {'seconds':>9} {'count':>9} {'per s':>11} {'peak MB':>9} {'vs base':>8}"]
+    for stage, m in result['stages'].items():
+        change = ""
+        if baseline and stage in baseline['stages'] and baseline['stages'][stage]['seconds']:
+            change = f"{m['seconds'] / baseline['stages'][stage]['seconds'] - 1:+.0%}"
+        lines.append(f"{stage:<12} {m['seconds']:>9.3f} {m['count']:>9} {m['per_s'] or 0:>11.1f} {m['peak_mb']:>9.1f} {change:>8}")
+    lines.append(f"Requests: {result['requests']}")
+    lines.append(f"Peak RSS: {result['peak_rss_mb']} MB")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    from forecast_engine import ENGINES
+
+    parser = argparse.ArgumentParser(description="Time the pipeline end to end on synthetic data, offline")
+    parser.add_argument("--countries", type=int, default=20)
+    parser.add_argument("--indicators", type=int, default=10)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--vintages", type=int, default=2)
+    parser.add_argument("--engine", choices=ENGINES, default="batched", help="forecast engine")
+    parser.add_argument("--lean", action="store_true", help="use lean preprocessing")
+    parser.add_argument("--repeat", type=int, default=1, help="runs to take the best of")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed growth over the baseline")
+    args = parser.parse_args()
+
+    # Benchmark the work itself, not span shipping
+    os.environ.setdefault("TELEMETRY_LEVEL", "off")
+    result = measure(args.repeat, countries=args.countries, indicators=args.indicators, years=args.years,
+                     vintages=args.vintages, engine=args.engine, lean=args.lean)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print(format_result(result, baseline))
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    elif baseline is not None:
+        regressions = compare(result, baseline, args.tolerance)
+        for message in regressions:
+            print(f"Regression: {message}")
+        sys.exit(1 if regressions else 0)
\ No newline at end of file
@@ -0,0 +1,47 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from units import UNIT_MULTIPLIERS, standardize_units
+
+def make_timeseries(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    units = np.array(list(UNIT_MULTIPLIERS) + ['Index'], dtype=object)
+    return pd.DataFrame({
+        'value': rng.normal(100, 10, rows),
+        'unit': units[rng.integers(0, len(units), rows)]
+    })
+
+def row_wise_standardize(timeseries):
+    # The previous implementation, kept here as the benchmark reference
+    return timeseries.apply(lambda row: row['value'] * UNIT_MULTIPLIERS.get(row['unit'], 1), axis=1)
+
+def benchmark(rows, legacy_max_rows):
+    timeseries = make_timeseries(rows)
+
+    start = time.perf_counter()
+    standardized, unknown_units = standardize_units(timeseries['value'], timeseries['unit'])
+    vectorized_s = time.perf_counter() - start
+
+    row_wise_s = None
+    if rows <= legacy_max_rows:
+        start = time.perf_counter()
+        reference = row_wise_standardize(timeseries)
+        row_wise_s = time.perf_counter() - start
+        assert np.array_equal(reference.to_numpy(), standardized), "Vectorized result differs from row-wise apply"
+
+    return vectorized_s, row_wise_s, unknown_units
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare row-wise and vectorized unit standardization")
+    parser.add_argument("--rows", default="1000000,10000000", help="comma-separated row counts")
+    parser.add_argument("--legacy-max-rows", type=int, default=1_000_000, help="skip the slow row-wise run above this size")
+    args = parser.parse_args()
+
+    for rows in [int(r) for r in args.rows.split(',')]:
+        vectorized_s, row_wise_s, unknown_units = benchmark(rows, args.legacy_max_rows)
+        if row_wise_s is None:
+            print(f"{rows:>12,} rows: vectorized {vectorized_s:.3f}s (row-wise skipped)")
+        else:
+            print(f"{rows:>12,} rows: vectorized {vectorized_s:.3f}s, row-wise {row_wise_s:.2f}s, speedup {row_wise_s / vectorized_s:.0f}x")
+        print(f"{'':>12}       unknown units reported: {unknown_units}")
\ No newline at end of file
@@ -0,0 +1,278 @@
+import json
+import os
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from as_of import SERIES_KEY, AsOfIndex
+from timeseries_stream import fetch_table, iter_timeseries
+
+DEFAULT_CACHE_DIR = os.getenv("CANONICAL_CACHE_DIR", ".canonical_cache")
+# Delta syncs start this far before the watermark, so rows from a transaction
+# that committed after a later one are not skipped
+SYNC_OVERLAP = timedelta(seconds=60)
+# Delta segments per table before they are merged back into the base file
+MAX_SEGMENTS = 8
+
+# For each cached table: the columns kept locally, the key used to merge deltas,
+# and the timestamp column whose maximum becomes the sync watermark
+CACHE_TABLES = {
+    'canonical_countries': {
+        'columns': ["country_code", "country_name", "region", "updated_at"],
+        'key': ["country_code"],
+        'watermark': "updated_at"
+    },
+    'canonical_indicators': {
+        'columns': ["indicator_id", "indicator_name", "unit", "updated_at"],
+        'key': ["indicator_id"],
+        'watermark': "updated_at"
+    },
+    'canonical_timeseries': {
+        'columns': ["id", "country_code", "indicator_id", "date_value", "value", "unit",
+                    "release_date", "vintage_date", "ingested_at", "content_hash"],
+        'key': ["id"],
+        'watermark': "ingested_at"
+    }
+}
+
+class CanonicalCache:
+    """On-disk Arrow copy of the canonical tables, kept current with delta syncs.
+
+    Each table is a base Arrow IPC file plus the delta segments appended by
+    later syncs, all uncompressed, so warm loads are memory maps rather than a
+    download. sync() pulls rows whose watermark column is newer than the cached
+    maximum less SYNC_OVERLAP, keeps those that are new or changed, and drops
+    keys that no longer exist upstream. A later segment's row replaces any
+    earlier row with its key; segments are merged back into the base when
+    there are MAX_SEGMENTS of them or rows were deleted.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.manifest_path = os.path.join(self.cache_dir, "manifest.json")
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+
+    def table_path(self, table, segment=None):
+        return os.path.join(self.cache_dir, segment or f"{table}.arrow")
+
+    def segments(self, table):
+        return self.manifest.get(table, {}).get('segments', [f"{table}.arrow"])
+
+    def watermark(self, table):
+        return self.manifest.get(table, {}).get('watermark')
+
+    def fetch_delta(self, client, table, since=None):
+        spec = CACHE_TABLES[table]
+        if table == 'canonical_timeseries':
+            chunks = list(iter_timeseries(client, columns=spec['columns'], ingested_after=since))
+            if not chunks:
+                return pd.DataFrame(columns=spec['columns'])
+            delta = pd.concat(chunks, ignore_index=True)
+        else:
+            delta = fetch_table(client, table, spec['columns'], key=spec['key'][0], updated_after=since)
+        return normalize_types(delta)
+
+    def fetch_keys(self, client, table):
+        # Only the key column, paged on itself, to find rows deleted upstream
+        key = CACHE_TABLES[table]['key'][0]
+        return normalize_types(fetch_table(client, table, [key], key=key))[key]
+
+    def sync(self, client, full=False, reconcile=False):
+        """Pull new and changed rows for every cached table; returns {table: rows_synced}.
+
+        Deletes leave no watermark to read, so finding them means paging through
+        every upstream key. That only happens with reconcile=True (or full=True,
+        which rebuilds the cache), so routine syncs stay proportional to the delta.
+        """
+        if full:
+            for table in CACHE_TABLES:
+                self.remove_segments(table, keep=[])
+            self.manifest = {}
+        synced = {}
+        for table, spec in CACHE_TABLES.items():
+            key = spec['key'][0]
+            watermark = self.watermark(table)
+            since = (pd.Timestamp(watermark) - SYNC_OVERLAP).isoformat() if watermark is not None else None
+            delta = self.fetch_delta(client, table, since)
+            if not delta.empty:
+                watermark = max([pd.Timestamp(w) for w in (watermark, delta[spec['watermark']].max()) if w is not None]).isoformat()
+
+            if table not in self.manifest:
+                synced[table] = len(delta)
+                if delta.empty:
+                    continue
+                self.write_table(table, delta.sort_values(spec['key'], ignore_index=True))
+                self.update_manifest(table, [f"{table}.arrow"], watermark, len(delta))
+                continue
+
+            cached = self.load_table(table)
+            key_type = cached.schema.field(key).type
+            # The overlap window re-reads rows that are already cached; keep the new and changed ones
+            existing = cached.filter(pc.is_in(cached[key], value_set=pa.array(delta[key], key_type))).to_pandas()
+            changed = delta.merge(existing, how='left', on=list(delta.columns), indicator=True)['_merge'] == 'left_only'
+            delta = delta[changed.to_numpy()]
+            replaced = pc.is_in(cached[key], value_set=pa.array(delta[key], key_type))
+            if reconcile:
+                deleted = pc.invert(pc.is_in(cached[key], value_set=pa.array(self.fetch_keys(client, table), key_type)))
+            else:
+                deleted = pa.array(np.zeros(len(cached), dtype=bool))
+            n_deleted = pc.sum(deleted).as_py() or 0
+            synced[table] = len(delta) + n_deleted
+            if not synced[table]:
+                continue
+
+            rows = len(cached) - n_deleted + len(delta) - (pc.sum(replaced).as_py() or 0)
+            segments = self.segments(table)
+            if n_deleted or len(segments) + 1 >= MAX_SEGMENTS:
+                # Merge the segments and the delta into a new base, leaving out deleted and replaced keys
+                kept = cached.filter(pc.invert(pc.or_(deleted, replaced)))
+                merged = pd.concat([kept.to_pandas(), delta], ignore_index=True).sort_values(spec['key'], ignore_index=True)
+                self.write_table(table, merged, schema=cached.schema)
+                self.update_manifest(table, [f"{table}.arrow"], watermark, rows)
+                self.remove_segments(table, keep=[f"{table}.arrow"], segments=segments)
+            else:
+                sequence = self.manifest[table].get('sequence', 0) + 1
+                segment = f"{table}.{sequence}.arrow"
+                self.write_table(table, delta, segment=segment, schema=cached.schema)
+                self.update_manifest(table, segments + [segment], watermark, rows, sequence)
+        return synced
+
+    def update_manifest(self, table, segments, watermark, rows, sequence=0):
+        self.manifest[table] = {
+            'watermark': watermark,
+            'rows': int(rows),
+            'segments': segments,
+            'sequence': sequence,
+            'synced_at': datetime.now().isoformat()
+        }
+        self.save_manifest()
+
+    def remove_segments(self, table, keep, segments=None):
+        for segment in segments or self.segments(table):
+            if segment not in keep and os.path.exists(self.table_path(table, segment)):
+                os.remove(self.table_path(table, segment))
+
+    def write_table(self, table, df, segment=None, schema=None):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        arrow_table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+        # Write beside the live file and swap, so readers never see a partial file
+        path = self.table_path(table, segment)
+        tmp_path = path + ".tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, arrow_table.schema) as writer:
+                writer.write_table(arrow_table)
+        os.replace(tmp_path, path)
+
+    def save_manifest(self):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def load_table(self, table, columns=None):
+        """Memory-map a cached table as a pyarrow.Table (zero-copy when it is a single segment)."""
+        key = CACHE_TABLES[table]['key'][0]
+        parts = [pa.ipc.open_file(pa.memory_map(self.table_path(table, segment), "r")).read_all()
+                 for segment in self.segments(table)]
+        arrow_table = parts[-1]
+        for part in reversed(parts[:-1]):
+            # Rows of earlier segments are superseded by later rows with the same key
+            part = part.filter(pc.invert(pc.is_in(part[key], value_set=arrow_table[key].combine_chunks())))
+            arrow_table = pa.concat_tables([part, arrow_table])
+        return arrow_table.select(columns) if columns else arrow_table
+
+    def load_frame(self, table, columns):
+        if not os.path.exists(self.table_path(table)):
+            return pd.DataFrame(columns=columns)
+        return self.load_table(table, columns).to_pandas()
+
+    def load_timeseries(self, columns, countries=None, indicators=None, start_date=None, end_date=None, as_of=None):
+        """Filter the cached timeseries in Arrow before converting the matching rows to pandas.
+
+        With as_of (a date or 'latest') only the vintage known at that date is kept
+        for each point, also chosen in Arrow; for many as-of queries over the same
+        rows use as_of_index().
+        """
+        if not os.path.exists(self.table_path('canonical_timeseries')):
+            return pd.DataFrame(columns=columns)
+        arrow_table = self.load_table('canonical_timeseries')
+        if as_of is not None:
+            arrow_table = arrow_table.select(list(dict.fromkeys(columns + SERIES_KEY + ['vintage_date'])))
+        mask = None
+        conditions = []
+        if countries is not None:
+            conditions.append(pc.is_in(arrow_table['country_code'], value_set=pa.array(list(countries), pa.string())))
+        if indicators is not None:
+            conditions.append(pc.is_in(arrow_table['indicator_id'], value_set=pa.array([int(i) for i in indicators], pa.int64())))
+        if start_date is not None:
+            conditions.append(pc.greater_equal(arrow_table['date_value'], pa.scalar(pd.Timestamp(start_date), arrow_table.schema.field('date_value').type)))
+        if end_date is not None:
+            conditions.append(pc.less_equal(arrow_table['date_value'], pa.scalar(pd.Timestamp(end_date), arrow_table.schema.field('date_value').type)))
+        for condition in conditions:
+            mask = condition if mask is None else pc.and_(mask, condition)
+        if mask is not None:
+            arrow_table = arrow_table.filter(mask)
+        if as_of is not None:
+            arrow_table = latest_vintages(arrow_table, as_of)
+        return arrow_table.select(columns).to_pandas()
+
+    def as_of_index(self, columns=None, **filters):
+        """Build an AsOfIndex over the cached timeseries (optionally filtered) for repeated as-of queries."""
+        columns = columns or CACHE_TABLES['canonical_timeseries']['columns']
+        return AsOfIndex(self.load_timeseries(list(dict.fromkeys(list(columns) + SERIES_KEY + ['vintage_date'])), **filters))
+
+def latest_vintages(arrow_table, as_of='latest'):
+    """The latest vintage at or before as_of of every point, as AsOfIndex.select picks it, but in Arrow."""
+    vintage = arrow_table['vintage_date']
+    if as_of != 'latest':
+        # Undated rows are always visible, as the oldest vintage
+        cutoff = pa.scalar(pd.Timestamp(as_of), vintage.type)
+        arrow_table = arrow_table.filter(pc.or_(pc.is_null(vintage), pc.fill_null(pc.less_equal(vintage, cutoff), False)))
+    order = pc.sort_indices(arrow_table, sort_keys=[(column, 'ascending') for column in SERIES_KEY + ['vintage_date']],
+                            null_placement='at_start')
+    arrow_table = arrow_table.take(order)
+    if len(arrow_table) < 2:
+        return arrow_table
+    # After the sort each key is a contiguous run; keep the last row of each run. Comparing
+    # neighbours is a group-by-last over sorted rows without the cost of hashing the keys.
+    last = None
+    for column in SERIES_KEY:
+        values = arrow_table[column]
+        changed = pc.not_equal(values.slice(1), values.slice(0, len(values) - 1))
+        last = changed if last is None else pc.or_(last, changed)
+    return arrow_table.filter(pa.concat_arrays([last.combine_chunks(), pa.array([True])]))
+
+def normalize_types(df):
+    # Keep a stable Arrow schema across syncs regardless of how JSON typed each page
+    for column in ("release_date", "vintage_date"):
+        if column in df:
+            df[column] = pd.to_datetime(df[column])
+    for column in ("updated_at", "ingested_at"):
+        if column in df:
+            df[column] = pd.to_datetime(df[column], utc=True, format='ISO8601')
+    if 'indicator_id' in df:
+        df['indicator_id'] = df['indicator_id'].astype('int64')
+    if 'date_value' in df:
+        df['date_value'] = pd.to_datetime(df['date_value'])
+    if 'value' in df:
+        df['value'] = pd.to_numeric(df['value']).astype('float64')
+    if 'id' in df:
+        df['id'] = df['id'].astype('int64')
+    return df
+
+if __name__ == "__main__":
+    import argparse
+    from supabase_client import get_client
+
+    parser = argparse.ArgumentParser(description="Sync the local canonical table cache")
+    parser.add_argument("--full", action="store_true", help="discard watermarks and resync every table")
+    parser.add_argument("--reconcile", action="store_true", help="also page through upstream keys to drop deleted rows")
+    args = parser.parse_args()
+
+    synced = CanonicalCache().sync(get_client(), full=args.full, reconcile=args.reconcile)
+    for table, rows in synced.items():
+        print(f"Synced {rows} rows for {table}")
\ No newline at end of file
@@ -0,0 +1,386 @@
+from bisect import bisect_right
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from as_of import SERIES_KEY, AsOfIndex
+
+# Columns PostgREST returns as 'YYYY-MM-DD'; other datetime columns are timestamptz
+DATE_COLUMNS = {'date_value', 'release_date', 'vintage_date', 'forecast_date'}
+TIMESTAMP_COLUMNS = {'created_at', 'updated_at', 'ingested_at', 'mapping_date', 'validated_at', 'started_at', 'completed_at'}
+# Per table: the serial key filled in on insert, and the columns defaulting to NOW()
+TABLE_DEFAULTS = {
+    'canonical_countries': (None, ['created_at', 'updated_at']),
+    'canonical_indicators': ('indicator_id', ['created_at', 'updated_at']),
+    'canonical_timeseries': ('id', ['ingested_at']),
+    'categories': ('category_id', []),
+    'forecast_results': ('forecast_id', ['created_at']),
+    'taxonomy_mapping': ('mapping_id', ['mapping_date']),
+    'validation_log': ('id', ['validated_at']),
+    'ingestion_log': ('id', [])
+}
+# Supabase's default cap on rows per response
+DEFAULT_MAX_ROWS = 1000
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+def split_top_level(expression):
+    # 'a.eq.1,and(b.eq.2,c.gt.3)' -> ['a.eq.1', 'and(b.eq.2,c.gt.3)']
+    parts, depth, start = [], 0, 0
+    for i, char in enumerate(expression):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(expression[start:i])
+            start = i + 1
+    parts.append(expression[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+class FakeSupabase:
+    """In-process stand-in for the Supabase client over pandas frames.
+
+    Supports what the pipeline uses: table().select/insert/upsert/update/delete
+    with eq, neq, gt, gte, lt, lte, in_, is_ and PostgREST or_ filters
+    (nested and()/or()), order, limit and range, plus rpc('timeseries_as_of').
+    Values go in and come out the way PostgREST would send them (dates as ISO
+    strings), responses are capped at max_rows like the hosted API, and every
+    request is counted in `requests` by table. Column arrays and sort orders are
+    cached per table until its next write, so keyset paging over a large table
+    costs one vectorized filter per page rather than a sort.
+    """
+
+    def __init__(self, tables=None, max_rows=DEFAULT_MAX_ROWS):
+        self.tables = {}
+        self.max_rows = max_rows
+        self.requests = {}
+        self.cache = {}
+        for name, frame in (tables or {}).items():
+            self.tables[name] = normalize_frame(frame.reset_index(drop=True))
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params):
+        if name != 'timeseries_as_of':
+            raise ValueError(f"Unknown function: {name}")
+        return FakeRpc(self, params)
+
+    def count(self, name):
+        self.requests[name] = self.requests.get(name, 0) + 1
+
+    def frame(self, name):
+        if name not in self.tables:
+            self.tables[name] = pd.DataFrame()
+        return self.tables[name]
+
+    def replace(self, name, frame):
+        self.tables[name] = frame.reset_index(drop=True)
+        self.cache = {key: value for key, value in self.cache.items() if key[0] != name}
+
+    def cached(self, key, build):
+        if key not in self.cache:
+            self.cache[key] = build()
+        return self.cache[key]
+
+    def column(self, name, column):
+        """Column values as a NumPy array: timestamps as naive UTC, and text without nulls as
+        fixed-width unicode, which compares in C."""
+        def build():
+            series = self.frame(name)[column]
+            if isinstance(series.dtype, pd.DatetimeTZDtype):
+                return series.dt.tz_convert('UTC').dt.tz_localize(None).to_numpy()
+            if series.dtype == object and series.notna().all() and series.map(type).eq(str).all():
+                return series.to_numpy().astype(str)
+            return series.to_numpy()
+        return self.cached((name, 'column', column), build)
+
+    def order(self, name, orders):
+        def build():
+            frame = self.frame(name)
+            by = [column for column, _ in orders]
+            ascending = [not desc for _, desc in orders]
+            return frame.sort_values(by, ascending=ascending, na_position='last', kind='stable').index.to_numpy()
+        return self.cached((name, 'order', tuple(orders)), build)
+
+class FlakyClient:
+    """Passes through to a client until the forecast_results write fail_after + 1."""
+
+    def __init__(self, client, fail_after):
+        self.client = client
+        self.fail_after = fail_after
+        self.writes = 0
+
+    def table(self, name):
+        if name == "forecast_results":
+            self.writes += 1
+            if self.writes > self.fail_after:
+                raise ConnectionError("connection reset by peer")
+        return self.client.table(name)
+
+    def rpc(self, name, params):
+        return self.client.rpc(name, params)
+
+def normalize_frame(frame):
+    # Store dates and timestamps as datetimes so filters compare them as such
+    for column in frame.columns:
+        if column in DATE_COLUMNS:
+            frame[column] = pd.to_datetime(frame[column])
+        elif column in TIMESTAMP_COLUMNS:
+            frame[column] = pd.to_datetime(frame[column], utc=True, format='ISO8601')
+    return frame
+
+def coerce(values, value):
+    """A filter value (as PostgREST would receive it, usually a string) in the type of the column."""
+    if value is None:
+        return None
+    if np.issubdtype(values.dtype, np.datetime64):
+        stamp = pd.Timestamp(value)
+        if stamp.tzinfo is not None:
+            stamp = stamp.tz_convert('UTC').tz_localize(None)
+        return np.datetime64(stamp.to_datetime64(), 'ns')
+    if np.issubdtype(values.dtype, np.bool_):
+        return value in (True, 'true')
+    if np.issubdtype(values.dtype, np.integer):
+        return int(value)
+    if np.issubdtype(values.dtype, np.floating):
+        return float(value)
+    return str(value)
+
+OPERATORS = {
+    'eq': lambda a, b: a == b,
+    'neq': lambda a, b: a != b,
+    'gt': lambda a, b: a > b,
+    'gte': lambda a, b: a >= b,
+    'lt': lambda a, b: a < b,
+    'lte': lambda a, b: a <= b
+}
+
+class FakeQuery:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.columns = None
+        self.filters = []
+        self.orders = []
+        self.offset = 0
+        self.row_limit = None
+        self.action = 'select'
+        self.payload = None
+        self.on_conflict = None
+
+    # Filters are kept as functions of the table, evaluated at execute()
+    def where(self, column, op, value):
+        self.filters.append(lambda: self.compare(column, op, value))
+        return self
+
+    def compare(self, column, op, value):
+        values = self.client.column(self.name, column)
+        if op == 'in':
+            return np.isin(values, np.array([coerce(values, v) for v in value]))
+        if op == 'is':
+            return pd.isna(values) if value in (None, 'null') else values == coerce(values, value)
+        return OPERATORS[op](values, coerce(values, value))
+
+    def eq(self, column, value):
+        return self.where(column, 'eq', value)
+
+    def neq(self, column, value):
+        return self.where(column, 'neq', value)
+
+    def gt(self, column, value):
+        return self.where(column, 'gt', value)
+
+    def gte(self, column, value):
+        return self.where(column, 'gte', value)
+
+    def lt(self, column, value):
+        return self.where(column, 'lt', value)
+
+    def lte(self, column, value):
+        return self.where(column, 'lte', value)
+
+    def in_(self, column, values):
+        return self.where(column, 'in', list(values))
+
+    def is_(self, column, value):
+        return self.where(column, 'is', value)
+
+    def or_(self, expression):
+        self.filters.append(lambda: self.logical('or', expression))
+        return self
+
+    def logical(self, kind, expression):
+        masks = []
+        for part in split_top_level(expression):
+            if part.startswith(('and(', 'or(')):
+                inner_kind, _, rest = part.partition('(')
+                masks.append(self.logical(inner_kind, rest[:-1]))
+            else:
+                column, op, value = part.split('.', 2)
+                if op == 'in':
+                    # 'indicator_id.in.(1,2)'
+                    value = [v.strip() for v in value.strip('()').split(',')]
+                masks.append(self.compare(column, op, value))
+        combine = np.logical_or if kind == 'or' else np.logical_and
+        return combine.reduce(masks)
+
+    def select(self, columns='*'):
+        self.columns = None if columns.strip() == '*' else [c.strip() for c in columns.split(',')]
+        return self
+
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, n):
+        self.row_limit = n
+        return self
+
+    def range(self, start, end):
+        self.offset = start
+        self.row_limit = end - start + 1
+        return self
+
+    def insert(self, rows):
+        self.action, self.payload = 'insert', rows
+        return self
+
+    def upsert(self, rows, on_conflict=''):
+        self.action, self.payload = 'upsert', rows
+        self.on_conflict = [c.strip() for c in on_conflict.split(',') if c.strip()]
+        return self
+
+    def update(self, values):
+        self.action, self.payload = 'update', values
+        return self
+
+    def delete(self):
+        self.action = 'delete'
+        return self
+
+    def mask(self):
+        mask = np.ones(len(self.client.frame(self.name)), dtype=bool)
+        for condition in self.filters:
+            mask &= np.asarray(condition(), dtype=bool)
+        return mask
+
+    def execute(self):
+        self.client.count(self.name)
+        if self.action == 'select':
+            return FakeResponse(self.run_select())
+        if self.action in ('insert', 'upsert'):
+            return FakeResponse(self.run_write())
+        frame = self.client.frame(self.name)
+        mask = self.mask()
+        if self.action == 'delete':
+            self.client.replace(self.name, frame[~mask])
+            return FakeResponse(to_records(frame[mask]))
+        frame = frame.copy()
+        for column, value in normalize_frame(pd.DataFrame([self.payload])).iloc[0].items():
+            frame.loc[mask, column] = value
+        self.client.replace(self.name, frame)
+        return FakeResponse(to_records(frame[mask]))
+
+    def run_select(self):
+        frame = self.client.frame(self.name)
+        if frame.columns.empty:
+            # A table nothing has been written to yet reads as empty
+            return []
+        missing = [c for c in (self.columns or []) if c not in frame.columns]
+        if missing:
+            raise ValueError(f"column {self.name}.{missing[0]} does not exist")
+        mask = self.mask()
+        if self.orders:
+            positions = self.client.order(self.name, self.orders)
+            positions = positions[mask[positions]]
+        else:
+            positions = np.flatnonzero(mask)
+        limit = self.client.max_rows if self.row_limit is None else min(self.row_limit, self.client.max_rows)
+        positions = positions[self.offset:self.offset + limit]
+        return to_records(frame.iloc[positions], self.columns)
+
+    def run_write(self):
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        if not rows:
+            return []
+        new = normalize_frame(pd.DataFrame(rows))
+        frame = self.client.frame(self.name)
+        serial, now_columns = TABLE_DEFAULTS.get(self.name, (None, []))
+        now = pd.Timestamp(datetime.now(timezone.utc))
+
+        updated = np.zeros(len(new), dtype=bool)
+        if self.action == 'upsert' and self.on_conflict and len(frame):
+            # Rows whose conflict key is already stored update it in place
+            existing = pd.MultiIndex.from_frame(frame[self.on_conflict].astype(object))
+            incoming = pd.MultiIndex.from_frame(new[self.on_conflict].astype(object))
+            position = existing.get_indexer(incoming)
+            updated = position >= 0
+            if updated.any():
+                frame = frame.copy()
+                for column in new.columns:
+                    frame.loc[position[updated], column] = new.loc[updated, column].to_numpy()
+
+        inserted = new[~updated].copy()
+        if serial is not None and serial not in inserted:
+            start = int(frame[serial].max()) + 1 if len(frame) and serial in frame else 1
+            inserted[serial] = np.arange(start, start + len(inserted))
+        for column in now_columns:
+            if column not in inserted:
+                inserted[column] = now
+        combined = pd.concat([frame, inserted], ignore_index=True) if len(frame) else inserted
+        self.client.replace(self.name, combined)
+        return to_records(inserted)
+
+class FakeRpc:
+    """timeseries_as_of (migration 011) over the stored canonical_timeseries."""
+
+    def __init__(self, client, params):
+        self.client = client
+        self.params = params
+
+    def execute(self):
+        self.client.count('rpc/timeseries_as_of')
+        params = self.params
+        filters = tuple((key, str(params.get(key))) for key in ('p_as_of', 'p_countries', 'p_indicators', 'p_start_date', 'p_end_date'))
+        rows, keys = self.client.cached(('canonical_timeseries', 'as_of', filters), lambda: self.select(params))
+        if params.get('p_after_country') is not None:
+            # Rows are in key order, so the cursor is a binary search away
+            after = (params['p_after_country'], int(params['p_after_indicator']), pd.Timestamp(params['p_after_date']))
+            rows = rows.iloc[bisect_right(keys, after):]
+        limit = params.get('p_limit')
+        limit = self.client.max_rows if limit is None else min(limit, self.client.max_rows)
+        return FakeResponse(to_records(rows.iloc[:limit]))
+
+    def select(self, params):
+        frame = self.client.frame('canonical_timeseries')
+        mask = np.ones(len(frame), dtype=bool)
+        if params.get('p_countries') is not None:
+            mask &= frame['country_code'].isin(params['p_countries']).to_numpy()
+        if params.get('p_indicators') is not None:
+            mask &= frame['indicator_id'].isin(params['p_indicators']).to_numpy()
+        if params.get('p_start_date') is not None:
+            mask &= (frame['date_value'] >= pd.Timestamp(params['p_start_date'])).to_numpy()
+        if params.get('p_end_date') is not None:
+            mask &= (frame['date_value'] <= pd.Timestamp(params['p_end_date'])).to_numpy()
+        columns = SERIES_KEY + ['value', 'unit', 'vintage_date']
+        rows = AsOfIndex(frame.loc[mask, columns]).select(params.get('p_as_of') or 'latest', columns)
+        keys = list(zip(rows['country_code'], rows['indicator_id'].astype(int), rows['date_value']))
+        return rows, keys
+
+def to_records(frame, columns=None):
+    """Rows as PostgREST returns them: dates and timestamps as ISO strings, NULLs as None."""
+    if columns is not None:
+        frame = frame[columns]
+    out = {}
+    for column in frame.columns:
+        values = frame[column]
+        if column in DATE_COLUMNS:
+            values = values.dt.strftime('%Y-%m-%d')
+        elif column in TIMESTAMP_COLUMNS and len(values):
+            values = pd.to_datetime(values, utc=True).map(lambda t: None if pd.isna(t) else t.isoformat())
+        values = values.astype(object)
+        out[column] = values.where(values.notna(), None).tolist()
+    return [dict(zip(out, row)) for row in zip(*out.values())]
\ No newline at end of file
@@ -1,37 +1,91 @@
 import os
-from supabase import create_client, Client
-from dotenv import load_dotenv
 import pandas as pd
+from timeseries_stream import DEFAULT_PAGE_SIZE, TIMESERIES_COLUMNS, fetch_table, read_timeseries
+from supabase_client import get_client
+from telemetry import span
+from validation import StreamingValidator
 
-# Load environment variables
-load_dotenv()
+def fetch_validated_data(countries=None, indicators=None, start_date=None, end_date=None, page_size=DEFAULT_PAGE_SIZE, use_cache=True, cache_dir=None, backend=None, as_of=None, validate=False):
+    # as_of: None reads every vintage; a date or 'latest' reads the vintage known then, one row per point
+    # validate: run StreamingValidator over the data as it arrives and log the results to validation_log
+    try:
+        with span("fetch_validated_data") as stage:
+            backend = backend or os.getenv("PIPELINE_BACKEND", "rest")
+            validator = StreamingValidator() if validate else None
+            # Duplicates are judged per vintage, so the validator needs vintage_date
+            columns = TIMESERIES_COLUMNS + ['vintage_date'] if validate else TIMESERIES_COLUMNS
+            if backend == "postgres":
+                # Bulk COPY straight from Postgres; no cache needed at this speed
+                import pg_bulk
+                countries_df = pg_bulk.load_table("canonical_countries", ["country_code", "country_name"])
+                indicators_df = pg_bulk.load_table("canonical_indicators", ["indicator_id", "indicator_name"])
+                timeseries = pg_bulk.load_timeseries(
+                    columns, countries=countries, indicators=indicators,
+                    start_date=start_date, end_date=end_date, as_of=as_of
+                )
+            elif use_cache:
+                from canonical_cache import CanonicalCache
+                supabase = get_client()
+                # Bring the local columnar cache up to date (only rows newer than its watermark), then read from it
+                cache = CanonicalCache(cache_dir)
+                synced = cache.sync(supabase)
+                print(f"Synced cache deltas: {synced}")
+                countries_df = cache.load_frame("canonical_countries", ["country_code", "country_name"])
+                indicators_df = cache.load_frame("canonical_indicators", ["indicator_id", "indicator_name"])
+                timeseries = cache.load_timeseries(
+                    columns, countries=countries, indicators=indicators,
+                    start_date=start_date, end_date=end_date, as_of=as_of
+                )
+            else:
+                supabase = get_client()
+                # Fetch canonical_countries
+                countries_df = fetch_table(supabase, "canonical_countries", ["country_code", "country_name"], key="country_code")
 
-# Initialize Supabase client
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-supabase = create_client(supabase_url, supabase_key)
+                # Fetch canonical_indicators (no 'unit' column needed here)
+                indicators_df = fetch_table(supabase, "canonical_indicators", ["indicator_id", "indicator_name"], key="indicator_id")
 
-def fetch_validated_data():
-    try:
-        # Fetch canonical_countries
-        countries_response = supabase.table("canonical_countries").select("country_code, country_name").execute()
-        countries = pd.DataFrame(countries_response.data)
-        print(f"Fetched {len(countries)} countries")
-
-        # Fetch canonical_indicators (no 'unit' column needed here)
-        indicators_response = supabase.table("canonical_indicators").select("indicator_id, indicator_name").execute()
-        indicators = pd.DataFrame(indicators_response.data)
-        print(f"Fetched {len(indicators)} indicators")
-
-        # Fetch canonical_timeseries (this table already has the 'unit' column)
-        timeseries_response = supabase.table("canonical_timeseries").select("country_code, indicator_id, date_value, value, unit").execute()
-        timeseries = pd.DataFrame(timeseries_response.data)
+                if validate:
+                    # Before the timeseries, so its chunks can be checked against them as they arrive
+                    validator.check_countries(countries_df)
+                    validator.check_indicators(indicators_df)
+
+                # Fetch canonical_timeseries page by page (this table already has the 'unit' column)
+                timeseries = read_timeseries(
+                    supabase, columns=columns, countries=countries, indicators=indicators,
+                    start_date=start_date, end_date=end_date, page_size=page_size, as_of=as_of,
+                    on_chunk=validator.update if validate else None
+                )
+
+            if validate:
+                with span("fetch_validated_data.validate", detail=True) as step:
+                    if backend == "postgres" or use_cache:
+                        # These paths load the frame in one piece; REST chunks were checked as they arrived
+                        validator.check_countries(countries_df)
+                        validator.check_indicators(indicators_df)
+                        validator.update_frame(timeseries)
+                    results = validator.write(backend)
+                    failed = [r for r in results if not r['is_valid']]
+                    for r in failed:
+                        print(f"Validation failed: {r['table_name']}.{r['validation_rule']}: {r['error_message']}")
+                    step.set(rows_in=len(timeseries), rows_out=len(results), failed=len(failed))
+                timeseries = timeseries[TIMESERIES_COLUMNS]
+
+            stage.set(rows_out=len(timeseries), backend=backend, as_of=str(as_of), countries=len(countries_df), indicators=len(indicators_df))
+
+        print(f"Fetched {len(countries_df)} countries")
+        print(f"Fetched {len(indicators_df)} indicators")
         print(f"Fetched {len(timeseries)} timeseries records")
 
-        return countries, indicators, timeseries
+        return countries_df, indicators_df, timeseries
     except Exception as e:
         print(f"Error fetching data: {str(e)}")
         raise
 
 if __name__ == "__main__":
-    countries, indicators, timeseries = fetch_validated_data()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fetch the canonical tables")
+    parser.add_argument("--validate", action="store_true", help="validate the data as it is fetched and log to validation_log")
+    args = parser.parse_args()
+
+    countries, indicators, timeseries = fetch_validated_data(validate=args.validate)
\ No newline at end of file
@@ -1,119 +1,174 @@
 import pandas as pd
 import numpy as np
-from statsmodels.tsa.arima.model import ARIMA
-from supabase import create_client, Client
-from datetime import datetime
-from dotenv import load_dotenv
 import os
+import argparse
+from panel import FREQUENCIES, Panel
 from preprocess_data import preprocess_data
 from fetch_data import fetch_validated_data
+from forecast_engine import ENGINES, run_forecasts
+from model_registry import DEFAULT_MODEL
+from forecast_state import FingerprintStore, series_fingerprint
+from model_store import ModelStore
+from forecast_sink import DEFAULT_BATCH_SIZE, ForecastResultSink, default_run_id
+from run_ledger import RunLedger
+from supabase_client import get_client
+from telemetry import level as telemetry_level, record, span
 
-# Load environment variables
-load_dotenv()
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-supabase = create_client(supabase_url, supabase_key)
+def regular_series(preprocessed_data, countries, indicators):
+    """Yield (column, country_code, indicator_id, frequency, series) on each series' native grid.
 
-def forecast_data(preprocessed_data, countries, indicators, horizons=['1M', '3M', '6M']):
+    Accepts either a Panel (see preprocess_panel) or the wide frame built by
+    preprocess_data; column is the 'COUNTRY_Indicator name' label either way.
+    Series come from Panel.regular(), already resampled to period ends and
+    gap-filled, grouped by frequency.
+    """
+    panel = preprocessed_data if isinstance(preprocessed_data, Panel) else Panel.from_wide(preprocessed_data, countries, indicators)
+    for frequency, group in panel.regular().items():
+        for k, position in enumerate(group.positions):
+            country_code, indicator_id = panel.key(position)
+            yield panel.label(position), country_code, indicator_id, frequency, group.series(k)
+
+def build_tasks(preprocessed_data, countries, indicators):
+    """Yield one fit task per series long enough to forecast, each carrying only its own series."""
+    for column, country_code, indicator_id, frequency, series_regular in regular_series(preprocessed_data, countries, indicators):
+        spec = FREQUENCIES[frequency]
+        if len(series_regular) < spec['min_points']:
+            print(f"Skipping {column}: Insufficient data ({len(series_regular)} {spec['name']} points)")
+            continue
+        yield {
+            'column': column,
+            'country_code': country_code,
+            'indicator_id': indicator_id,
+            'series': series_regular,
+            'period_months': spec['months']
+        }
+
+def forecast_data(preprocessed_data, countries, indicators, horizons=['1M', '3M', '6M'], workers=None, chunksize=None, incremental=False, state_dir=None, run_id=None, batch_size=DEFAULT_BATCH_SIZE, backend=None, model=DEFAULT_MODEL, criterion='cv', warm_start=False, engine='statsmodels', resume=False):
+    """Fit every series and upsert the forecasts to forecast_results, checkpointing as it goes.
+
+    Each fitted series is recorded in the run's RunLedger before its rows are
+    sent, so with resume=True a run that died part way carries on: series
+    already fitted under this run_id are not refitted, and only rows that may
+    not have been written are sent again.
+    """
     try:
-        start_time = datetime.now()
-        forecast_results = []
+        with span("forecast_data") as stage, RunLedger(run_id or default_run_id(), state_dir, spec={
+                'model': model, 'criterion': criterion, 'horizons': list(horizons), 'incremental': incremental,
+                'warm_start': warm_start, 'engine': engine}, resume=resume) as ledger:
+            run_id = ledger.run_id
+            # Rows this run already wrote before it was interrupted
+            forecast_results = ledger.results()
+            fingerprint_spec = {'model': model, 'criterion': criterion, 'horizons': list(horizons)}
+            fingerprint_store = FingerprintStore(state_dir) if incremental else None
+            # Stored per-series fits let routine updates extend or warm-start instead of refitting
+            model_store = ModelStore(state_dir) if warm_start else None
+            fingerprints = {}
+            skipped_unchanged = 0
+            done = ledger.done()
 
-        # Iterate over each country-indicator pair
-        for column in preprocessed_data.columns:
-            if column == 'date_value':
-                continue
-            country_code, indicator_name = column.split('_', 1)
-            
-            indicator_id_match = indicators[indicators['indicator_name'] == indicator_name]['indicator_id']
-            if indicator_id_match.empty:
-                print(f"Skipping {column}: Indicator name not found in indicators table.")
-                continue
-            
-            # Explicitly convert the indicator_id to a standard Python int
-            indicator_id = int(indicator_id_match.iloc[0])
+            # Build one task per country-indicator pair
+            with span("forecast_data.build_tasks", detail=True) as step:
+                tasks = []
+                for task in build_tasks(preprocessed_data, countries, indicators):
+                    column = task['column']
+                    # In incremental mode, skip series whose input has not changed since the last write
+                    if incremental:
+                        fingerprint = series_fingerprint(task['series'], fingerprint_spec)
+                        if fingerprint_store.is_unchanged(column, fingerprint):
+                            skipped_unchanged += 1
+                            continue
+                        fingerprints[column] = fingerprint
 
-            # Extract and prepare time series for the column
-            series = preprocessed_data[['date_value', column]]
-            series.set_index('date_value', inplace=True)
-            series = series.dropna()
+                    if column in done:
+                        continue
+                    tasks.append(task)
+                step.set(rows_out=len(tasks), skipped_unchanged=skipped_unchanged, resumed=len(done))
 
-            # Resample to a consistent monthly frequency and fill gaps
-            series_monthly = series.resample('ME').mean().interpolate(method='linear')
-            
-            if len(series_monthly) < 12:
-                print(f"Skipping {column}: Insufficient data ({len(series_monthly)} monthly points)")
-                continue
+            if incremental:
+                print(f"Incremental run: {len(tasks)} changed series, {skipped_unchanged} unchanged")
+            unwritten = ledger.unwritten()
+            if done:
+                print(f"Resuming run {run_id} (attempt {ledger.attempt}): {len(done)} series already fitted, "
+                      f"{len(unwritten)} of them to send again, {len(tasks)} left to fit")
 
-            # Fit ARIMA model
-            try:
-                # Ensure the index is a datetime index and use the resampled series
-                model = ARIMA(series_monthly, order=(1,1,1), freq='ME')
-                model_fit = model.fit()
+            # Fit models, in parallel when more than one worker is available,
+            # upserting results in batches while fitting continues
+            completed = []
+            backend = backend or os.getenv("PIPELINE_BACKEND", "rest")
+            if backend == "postgres":
+                import pg_bulk
+                sink = pg_bulk.PgForecastSink(run_id=run_id, batch_size=batch_size, on_write=ledger.written)
+            else:
+                sink = ForecastResultSink(get_client(), run_id=run_id, batch_size=batch_size, on_write=ledger.written)
+            timed = telemetry_level() >= 2
+            with span("forecast_data.fit", detail=True) as step, sink:
+                # Rows fitted before the interruption go first; upserts make resending them harmless
+                for column, results in unwritten:
+                    ledger.requeue(column, len(results))
+                    forecast_results.extend(results)
+                    sink.add(results)
+                for outcome in run_forecasts(tasks, horizons, workers=workers, chunksize=chunksize, model=model, criterion=criterion, timed=timed, model_store=model_store, engine=engine):
+                    if timed:
+                        # Per-series spans are measured in the worker and recorded here
+                        timing = outcome['timing']
+                        record("forecast_data.fit_series", timing['wall_s'], cpu_s=timing['cpu_s'], rows_in=timing['points'],
+                               rows_out=len(outcome['results']), error=outcome['error'], series=outcome['column'],
+                               fit_kind=outcome.get('model_state', {}).get('fit_kind'))
+                    if outcome['error'] is not None:
+                        print(f"Forecast failed for {outcome['column']}: {outcome['error']}")
+                        ledger.failed(outcome['column'], outcome['error'])
+                        continue
+                    # Checkpoint before sending, so a crash in the sink loses no fitted work
+                    ledger.fitted(outcome['column'], outcome['results'], fingerprints.get(outcome['column']), outcome.get('model_state'))
+                    forecast_results.extend(outcome['results'])
+                    sink.add(outcome['results'])
+                    completed.append(outcome['column'])
+                step.set(rows_in=len(tasks), rows_out=len(forecast_results), failed=len(tasks) - len(completed))
 
-                # Generate forecasts for each horizon
-                for horizon in horizons:
-                    steps = {'1M': 1, '3M': 3, '6M': 6}[horizon]
-                    
-                    # Use get_forecast to get forecast values and confidence intervals at once
-                    forecast_obj = model_fit.get_forecast(steps=steps)
-                    forecast_value = forecast_obj.predicted_mean.iloc[-1]
-                    conf_int = forecast_obj.conf_int(alpha=0.05)
-                    conf_lower = conf_int.iloc[-1, 0]
-                    conf_upper = conf_int.iloc[-1, 1]
-                    forecast_date = forecast_obj.predicted_mean.index[-1].strftime('%Y-%m-%d')
-                    
-                    forecast_results.append({
-                        'country_code': country_code,
-                        'indicator_id': indicator_id,
-                        'forecast_date': forecast_date,
-                        'forecast_value': float(forecast_value),
-                        'forecast_horizon': horizon,
-                        'model_name': 'ARIMA(1,1,1)',
-                        'confidence_interval_lower': float(conf_lower),
-                        'confidence_interval_upper': float(conf_upper)
-                    })
-            except Exception as e:
-                print(f"Forecast failed for {column}: {str(e)}")
-                continue
+            if forecast_results:
+                print(f"Stored {sink.written} forecast results for run {sink.run_id}")
 
-        # Store results in Supabase
-        if forecast_results:
-            supabase.table("forecast_results").insert(forecast_results).execute()
-            print(f"Stored {len(forecast_results)} forecast results")
+            # Only remember fingerprints and fitted state once their results are safely written,
+            # including those of series fitted before a resume
+            states = ledger.states()
+            if incremental:
+                fingerprint_store.update({column: fingerprint for column, (fingerprint, _) in states.items() if fingerprint})
+                fingerprint_store.save()
+            if warm_start:
+                model_states = {column: entry for column, (_, entry) in states.items() if entry is not None}
+                for column, entry in model_states.items():
+                    model_store.save(column, entry)
+                fit_kinds = pd.Series([entry['fit_kind'] for entry in model_states.values()]).value_counts().to_dict()
+                print(f"Warm start: {fit_kinds}")
 
-        # Log forecasting run
-        end_time = datetime.now()
-        execution_time_ms = int((end_time - start_time).total_seconds() * 1000)
-        log_entry = {
-            "endpoint": "forecast_data",
-            "status": "success",
-            "records_processed": len(forecast_results),
-            "error_message": None,
-            "started_at": start_time.isoformat(),
-            "completed_at": end_time.isoformat(),
-            "execution_time_ms": execution_time_ms
-        }
-        supabase.table("ingestion_log").insert(log_entry).execute()
+            ledger.finish()
+            stage.set(rows_in=len(tasks), rows_out=len(forecast_results), resumed=len(done))
 
         return forecast_results
     except Exception as e:
         print(f"Error forecasting data: {str(e)}")
-        end_time = datetime.now()
-        execution_time_ms = int((end_time - start_time).total_seconds() * 1000)
-        log_entry = {
-            "endpoint": "forecast_data",
-            "status": "failed",
-            "records_processed": 0,
-            "error_message": str(e),
-            "started_at": start_time.isoformat(),
-            "completed_at": end_time.isoformat(),
-            "execution_time_ms": execution_time_ms
-        }
-        supabase.table("ingestion_log").insert(log_entry).execute()
         raise
 
 if __name__ == "__main__":
-    countries, indicators, timeseries = fetch_validated_data()
+    parser = argparse.ArgumentParser(description="Fit forecasts for every country/indicator series")
+    parser.add_argument("--incremental", action="store_true", help="only refit series whose input changed since the last run")
+    parser.add_argument("--workers", type=int, default=None, help="number of fitting processes")
+    parser.add_argument("--run-id", default=None, help="run identifier used as part of the forecast_results key (default: today's date)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows per forecast_results upsert")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="registry model name, or 'auto' to select per series")
+    parser.add_argument("--criterion", choices=["cv", "aic"], default="cv", help="selection criterion for --model auto ('aic' picks among ARIMA orders only)")
+    parser.add_argument("--backend", choices=["rest", "postgres"], default=None, help="I/O backend (default: PIPELINE_BACKEND or rest)")
+    parser.add_argument("--warm-start", action="store_true", help="extend or warm-start each series from its stored fit")
+    parser.add_argument("--engine", choices=ENGINES, default="statsmodels", help="'batched' fits every ARIMA(1,1,1) together in NumPy")
+    parser.add_argument("--resume", metavar="RUN_ID", default=None, help="carry on an interrupted run from its last checkpoint")
+    parser.add_argument("--as-of", default=None, help="forecast from the data as known on this date, or 'latest' (default: every vintage)")
+    args = parser.parse_args()
+
+    countries, indicators, timeseries = fetch_validated_data(backend=args.backend, as_of=args.as_of)
     preprocessed_data = preprocess_data(countries, indicators, timeseries)
-    forecast_results = forecast_data(preprocessed_data, countries, indicators)
\ No newline at end of file
+    forecast_results = forecast_data(
+        preprocessed_data, countries, indicators, workers=args.workers, incremental=args.incremental,
+        run_id=args.resume or args.run_id, batch_size=args.batch_size, backend=args.backend,
+        model=args.model, criterion=args.criterion, warm_start=args.warm_start, engine=args.engine,
+        resume=args.resume is not None
+    )
\ No newline at end of file
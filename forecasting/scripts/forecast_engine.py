@@ -0,0 +1,172 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from batched_arima import Z_95, fit_forecast_arima111
+from model_registry import DEFAULT_MODEL, as_series, fit_model, future_index, select_model
+from model_store import fit_with_store
+from process_pool import default_chunksize, default_workers
+
+# 'batched' fits ARIMA(1,1,1) for many series at once in NumPy (see batched_arima.py)
+ENGINES = ('statsmodels', 'batched')
+BATCHED_CHUNK_SIZE = 2000
+
+def horizon_steps(horizon):
+    """Turn a horizon such as '6M', '24M' or a plain month count into (label, steps)."""
+    if isinstance(horizon, str):
+        label = horizon.strip().upper()
+        if not label.endswith('M') or not label[:-1].isdigit():
+            raise ValueError(f"Unsupported forecast horizon: {horizon}")
+        steps = int(label[:-1])
+    else:
+        steps = int(horizon)
+        label = f'{steps}M'
+    if steps < 1:
+        raise ValueError(f"Forecast horizon must be at least one month: {horizon}")
+    return label, steps
+
+def horizon_periods(horizon, period_months=1):
+    """(label, steps) for a series whose periods span period_months months.
+
+    Horizons are given in months; a horizon that falls inside a period is
+    forecast to the end of that period, so '1M' and '3M' are both one step
+    for a quarterly series.
+    """
+    label, months = horizon_steps(horizon)
+    return label, -(-months // period_months)
+
+def forecast_horizons(model_fit, horizons, alpha=0.05, period_months=1):
+    """Forecast once out to the longest horizon and slice every horizon from that path."""
+    parsed = [horizon_periods(horizon, period_months) for horizon in horizons]
+    max_steps = max(steps for _, steps in parsed)
+
+    forecast_obj = model_fit.get_forecast(steps=max_steps)
+    predicted_mean = forecast_obj.predicted_mean
+    conf_int = forecast_obj.conf_int(alpha=alpha)
+
+    forecasts = []
+    for label, steps in parsed:
+        forecasts.append({
+            'forecast_horizon': label,
+            'forecast_date': predicted_mean.index[steps - 1].strftime('%Y-%m-%d'),
+            'forecast_value': float(predicted_mean.iloc[steps - 1]),
+            'confidence_interval_lower': float(conf_int.iloc[steps - 1, 0]),
+            'confidence_interval_upper': float(conf_int.iloc[steps - 1, 1])
+        })
+    return forecasts
+
+def timed_fit_series(task, horizons, model=DEFAULT_MODEL, criterion='cv', model_store=None):
+    """fit_series plus its wall and CPU time, measured inside the (possibly worker) process."""
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    outcome = fit_series(task, horizons, model=model, criterion=criterion, model_store=model_store)
+    outcome['timing'] = {'wall_s': time.perf_counter() - wall_start, 'cpu_s': time.process_time() - cpu_start,
+                         'points': len(task['series'])}
+    return outcome
+
+def fit_series(task, horizons, model=DEFAULT_MODEL, criterion='cv', model_store=None):
+    """Fit one series and return its forecast rows (or the error that stopped it).
+
+    model is a registry name such as 'ARIMA(1,1,1)' or 'ETS(A,A,N)', or 'auto'
+    to pick the best candidate for this series with select_model. Given a
+    ModelStore, the series' stored fit is extended or warm-started (see
+    model_store.py) and the updated entry is returned as 'model_state' for
+    the caller to save once the results are written.
+    """
+    series_regular = task['series']
+    model_state = None
+    try:
+        if model_store is not None:
+            entry = model_store.load(task['column'])
+            model_name, model_fit, model_state = fit_with_store(series_regular, entry, model, criterion=criterion)
+        elif model == 'auto':
+            model_name, model_fit = select_model(series_regular, criterion=criterion)
+        else:
+            model_name, model_fit = model, fit_model(model, series_regular)
+
+        # One forecast pass covers every horizon
+        results = forecast_rows(task, model_name, forecast_horizons(model_fit, horizons, period_months=task.get('period_months', 1)))
+    except Exception as e:
+        return {'column': task['column'], 'results': [], 'error': str(e)}
+
+    outcome = {'column': task['column'], 'results': results, 'error': None}
+    if model_state is not None:
+        outcome['model_state'] = model_state
+    return outcome
+
+def forecast_rows(task, model_name, forecasts):
+    return [{
+        'country_code': task['country_code'],
+        'indicator_id': task['indicator_id'],
+        'forecast_date': forecast['forecast_date'],
+        'forecast_value': forecast['forecast_value'],
+        'forecast_horizon': forecast['forecast_horizon'],
+        'model_name': model_name,
+        'confidence_interval_lower': forecast['confidence_interval_lower'],
+        'confidence_interval_upper': forecast['confidence_interval_upper']
+    } for forecast in forecasts]
+
+def run_batched_forecasts(tasks, horizons, chunk_size=BATCHED_CHUNK_SIZE, timed=False):
+    """Yield fit_series-shaped outputs for ARIMA(1,1,1), fitting chunk_size series per NumPy batch.
+
+    Rows match what fit_series writes for the same model (same model_name,
+    dates and 95% intervals). Series the batch cannot fit (constant, too
+    short) fall back to fit_series. With timed=True each output carries its
+    share of the chunk's time.
+    """
+    # Months bound the steps from above: no series has periods shorter than a month
+    max_steps = max(steps for _, steps in map(horizon_steps, horizons))
+    for start in range(0, len(tasks), chunk_size):
+        chunk = tasks[start:start + chunk_size]
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        series_list = [as_series(task['series']) for task in chunk]
+        means, sd, params = fit_forecast_arima111([s.to_numpy() for s in series_list], max_steps)
+        share = {'wall_s': (time.perf_counter() - wall_start) / len(chunk), 'cpu_s': (time.process_time() - cpu_start) / len(chunk)}
+
+        for i, (task, series) in enumerate(zip(chunk, series_list)):
+            try:
+                if not params['ok'][i]:
+                    raise ValueError("batched fit failed")
+                parsed = [horizon_periods(horizon, task.get('period_months', 1)) for horizon in horizons]
+                index = future_index(series, max_steps)
+                forecasts = [{
+                    'forecast_horizon': label,
+                    'forecast_date': index[steps - 1].strftime('%Y-%m-%d'),
+                    'forecast_value': float(means[i, steps - 1]),
+                    'confidence_interval_lower': float(means[i, steps - 1] - Z_95 * sd[i, steps - 1]),
+                    'confidence_interval_upper': float(means[i, steps - 1] + Z_95 * sd[i, steps - 1])
+                } for label, steps in parsed]
+            except Exception:
+                # Let the per-series path fit it, or report its error the usual way
+                yield (timed_fit_series if timed else fit_series)(task, horizons)
+                continue
+            outcome = {'column': task['column'], 'results': forecast_rows(task, DEFAULT_MODEL, forecasts), 'error': None}
+            if timed:
+                outcome['timing'] = {**share, 'points': len(series)}
+            yield outcome
+
+def run_forecasts(tasks, horizons, workers=None, chunksize=None, model=DEFAULT_MODEL, criterion='cv', timed=False, model_store=None, engine='statsmodels'):
+    """Yield fit_series outputs in task order, serially or across a process pool.
+
+    Each task carries only its own resampled series, so workers never receive
+    the full pivoted frame. Errors are caught per series inside the worker.
+    With timed=True each output also carries a 'timing' dict. engine='batched'
+    fits every ARIMA(1,1,1) together in one process instead.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown forecast engine: {engine}")
+    if engine == 'batched':
+        if model != DEFAULT_MODEL or model_store is not None:
+            raise ValueError(f"The batched engine only fits {DEFAULT_MODEL}, without warm starts")
+        yield from run_batched_forecasts(tasks, horizons, timed=timed)
+        return
+
+    workers = default_workers(workers, len(tasks))
+    fit = partial(timed_fit_series if timed else fit_series, horizons=horizons, model=model, criterion=criterion, model_store=model_store)
+
+    if workers == 1:
+        yield from map(fit, tasks)
+        return
+
+    if chunksize is None:
+        chunksize = default_chunksize(len(tasks), workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(fit, tasks, chunksize=chunksize)
\ No newline at end of file
@@ -0,0 +1,294 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from supabase_client import get_client
+from telemetry import span
+
+LATEST_COLUMNS = ["country_code", "indicator_id", "forecast_horizon", "model_name", "forecast_id", "forecast_date",
+                  "forecast_value", "confidence_interval_lower", "confidence_interval_upper", "run_id",
+                  "created_at", "updated_at"]
+DEFAULT_TTL_S = float(os.getenv("FORECAST_READER_TTL", "60"))
+# Reads query the database version at most this often
+DEFAULT_CHECK_S = float(os.getenv("FORECAST_READER_CHECK_INTERVAL", "1"))
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_PAGE_SIZE = 1000
+# Delta reads start this far before the newest updated_at seen, so rows from a
+# transaction that committed after a later one are not skipped
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+class TTLCache:
+    """Least-recently-used mapping whose entries also expire ttl seconds after they were stored."""
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE, ttl=DEFAULT_TTL_S, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if self.clock() >= expires_at:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = (value, self.clock() + self.ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+def parse_timestamp(value):
+    # PostgREST returns ISO 8601, COPY returns '2024-01-31 10:00:00.5+00'
+    return datetime.fromisoformat(str(value).replace(' ', 'T'))
+
+def normalize_row(row):
+    row = {column: row.get(column) for column in LATEST_COLUMNS}
+    row['indicator_id'] = int(row['indicator_id'])
+    row['forecast_id'] = int(row['forecast_id'])
+    for column in ("forecast_value", "confidence_interval_lower", "confidence_interval_upper"):
+        value = row[column]
+        # COPY reads NULL intervals back as NaN
+        row[column] = None if value is None or value != value else float(value)
+    row['forecast_date'] = str(row['forecast_date'])[:10]
+    row['created_at'] = str(row['created_at'])
+    row['updated_at'] = str(row['updated_at'])
+    return row
+
+def fetch_latest(client, updated_after=None, page_size=DEFAULT_PAGE_SIZE):
+    """Rows of latest_forecasts (only those changed after updated_after, if given), paging on forecast_id."""
+    rows = []
+    last_id = None
+    while True:
+        query = client.table("latest_forecasts").select(", ".join(LATEST_COLUMNS))
+        if updated_after is not None:
+            query = query.gt("updated_at", updated_after.isoformat())
+        if last_id is not None:
+            query = query.gt("forecast_id", last_id)
+        page = query.order("forecast_id").limit(page_size).execute().data
+        if not page:
+            break
+        last_id = page[-1]['forecast_id']
+        rows.extend(page)
+    return rows
+
+class ForecastReader:
+    """Latest forecast per (country, indicator, horizon, model), served from memory.
+
+    The index mirrors latest_forecasts (migration 012), which the database keeps
+    current, so a read never touches the forecast history. After the first full
+    load only entries changed since the last refresh are pulled. Reads compare
+    the database-side version of latest_forecasts (migration 014) at most every
+    check_interval seconds and refresh when any writer has moved it; a refresh
+    also runs after ttl seconds regardless. Serialized responses are kept in an
+    LRU cache with the same ttl and cleared whenever the index changes.
+    """
+
+    def __init__(self, client=None, backend=None, ttl=DEFAULT_TTL_S, check_interval=DEFAULT_CHECK_S,
+                 cache_size=DEFAULT_CACHE_SIZE, page_size=DEFAULT_PAGE_SIZE, clock=time.monotonic):
+        self.client = client
+        self.backend = backend or os.getenv("PIPELINE_BACKEND", "rest")
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self.page_size = page_size
+        self.clock = clock
+        self.cache = TTLCache(cache_size, ttl, clock)
+        self.lock = threading.RLock()
+        # (country_code, indicator_id) -> {(forecast_horizon, model_name): row}
+        self.series = {}
+        self.watermark = None
+        self.version = None
+        self.refreshed_at = None
+        self.checked_at = None
+
+    def current_version(self):
+        """(newest updated_at, entry count) of latest_forecasts, which every write to forecast_results moves."""
+        if self.backend == "postgres":
+            import pg_bulk
+            updated_at, entries = pg_bulk.latest_forecasts_version()
+        else:
+            row = (self.client or get_client()).rpc("latest_forecasts_version", {}).execute().data[0]
+            updated_at, entries = row['updated_at'], row['entries']
+        return (None if updated_at is None else parse_timestamp(updated_at), int(entries))
+
+    def fetch(self, updated_after):
+        if self.backend == "postgres":
+            import pg_bulk
+            frame = pg_bulk.load_latest_forecasts(LATEST_COLUMNS, updated_after=updated_after)
+            return frame.to_dict('records')
+        return fetch_latest(self.client or get_client(), updated_after, self.page_size)
+
+    def refresh(self):
+        """Pull new and changed entries into the index, and drop deleted ones; returns how many changed."""
+        with self.lock, span("forecast_reader.refresh", detail=True) as step:
+            # Read before the delta, so a write landing in between shows up as a new version
+            version = self.current_version()
+            since = self.watermark - REFRESH_OVERLAP if self.watermark is not None else None
+            changed = 0
+            for row in map(normalize_row, self.fetch(since)):
+                entries = self.series.setdefault((row['country_code'], row['indicator_id']), {})
+                key = (row['forecast_horizon'], row['model_name'])
+                if entries.get(key) != row:
+                    entries[key] = row
+                    changed += 1
+                updated_at = parse_timestamp(row['updated_at'])
+                if self.watermark is None or updated_at > self.watermark:
+                    self.watermark = updated_at
+            if sum(map(len, self.series.values())) > version[1]:
+                # Deletes leave no updated_at behind; only a full read of the keys shows which went
+                changed += self.evict()
+            if changed:
+                self.cache.clear()
+            self.version = version
+            self.refreshed_at = self.checked_at = self.clock()
+            step.set(rows_out=changed)
+            return changed
+
+    def evict(self):
+        present = {(row['country_code'], int(row['indicator_id']), row['forecast_horizon'], row['model_name'])
+                   for row in self.fetch(None)}
+        evicted = 0
+        for pair, entries in list(self.series.items()):
+            for key in [key for key in entries if (*pair, *key) not in present]:
+                del entries[key]
+                evicted += 1
+            if not entries:
+                del self.series[pair]
+        return evicted
+
+    def ensure_fresh(self):
+        now = self.clock()
+        if self.refreshed_at is None or now - self.refreshed_at >= self.ttl:
+            self.refresh()
+        elif now - self.checked_at >= self.check_interval:
+            self.checked_at = now
+            if self.current_version() != self.version:
+                self.refresh()
+
+    def get(self, country_code, indicator_id, horizon=None, model_name=None):
+        """Latest forecasts of one series, one row per (horizon, model), optionally filtered."""
+        with self.lock:
+            self.ensure_fresh()
+            return self.lookup(country_code, int(indicator_id), horizon, model_name)
+
+    def lookup(self, country_code, indicator_id, horizon, model_name):
+        entries = self.series.get((country_code, indicator_id), {})
+        return [row for (row_horizon, row_model), row in sorted(entries.items())
+                if (horizon is None or row_horizon == horizon) and (model_name is None or row_model == model_name)]
+
+    def get_many(self, series, horizon=None, model_name=None):
+        """Latest forecasts for a batch of (country_code, indicator_id) pairs, keyed by pair."""
+        with self.lock:
+            self.ensure_fresh()
+            return {(country_code, int(indicator_id)): self.lookup(country_code, int(indicator_id), horizon, model_name)
+                    for country_code, indicator_id in series}
+
+    def response(self, series, horizon=None, model_name=None, if_none_match=None):
+        """JSON body and ETag for a batch lookup, as (status, etag, body); status is 304 when if_none_match matches."""
+        key = (tuple(sorted((c, int(i)) for c, i in series)), horizon, model_name)
+        with self.lock:
+            self.ensure_fresh()
+            cached = self.cache.get(key)
+            if cached is None:
+                rows = [row for pair in key[0] for row in self.lookup(*pair, horizon, model_name)]
+                body = json.dumps({'forecasts': rows}, separators=(',', ':')).encode()
+                cached = (f'"{hashlib.sha1(body).hexdigest()}"', body)
+                self.cache.put(key, cached)
+        etag, body = cached
+        if if_none_match is not None and etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return 304, etag, b''
+        return 200, etag, body
+
+def parse_series(values):
+    # 'MEX:1,USA:2' -> [('MEX', 1), ('USA', 2)]
+    pairs = []
+    for value in values:
+        for item in value.split(','):
+            if item:
+                country_code, indicator_id = item.split(':')
+                pairs.append((country_code, int(indicator_id)))
+    return pairs
+
+def make_handler(reader):
+    class LatestForecastHandler(BaseHTTPRequestHandler):
+        """GET /latest?series=MEX:1,USA:2[&horizon=3M][&model=ARIMA(1,1,1)]"""
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/latest":
+                self.send_error(404)
+                return
+            params = parse_qs(url.query)
+            try:
+                series = parse_series(params.get('series', []))
+            except ValueError:
+                self.send_error(400, "series must look like MEX:1,USA:2")
+                return
+            status, etag, body = reader.response(
+                series, horizon=params.get('horizon', [None])[0], model_name=params.get('model', [None])[0],
+                if_none_match=self.headers.get('If-None-Match')
+            )
+            self.send_response(status)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            if status == 200:
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return LatestForecastHandler
+
+def make_server(reader, host="127.0.0.1", port=8765):
+    return ThreadingHTTPServer((host, port), make_handler(reader))
+
+def serve(reader, host="127.0.0.1", port=8765):
+    """Serve reader over HTTP until interrupted."""
+    server = make_server(reader, host, port)
+    print(f"Serving latest forecasts on http://{host}:{server.server_port}/latest")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Latest forecast per series, from memory with delta refreshes")
+    parser.add_argument("series", nargs="*", help="COUNTRY:INDICATOR_ID pairs to print, e.g. MEX:1")
+    parser.add_argument("--horizon", default=None, help="only this horizon, e.g. 3M")
+    parser.add_argument("--model", default=None, help="only this model name")
+    parser.add_argument("--backend", choices=["rest", "postgres"], default=None, help="I/O backend (default: PIPELINE_BACKEND or rest)")
+    parser.add_argument("--serve", action="store_true", help="serve GET /latest over HTTP instead of printing")
+    parser.add_argument("--port", type=int, default=8765, help="HTTP port for --serve")
+    args = parser.parse_args()
+
+    reader = ForecastReader(backend=args.backend)
+    if args.serve:
+        serve(reader, port=args.port)
+    else:
+        for pair, rows in reader.get_many(parse_series(args.series), args.horizon, args.model).items():
+            for row in rows:
+                print(f"{pair[0]} {pair[1]} {row['forecast_horizon']} {row['model_name']}: "
+                      f"{row['forecast_value']:.4f} on {row['forecast_date']} (run {row['run_id']})")
\ No newline at end of file
@@ -0,0 +1,59 @@
+from datetime import datetime
+
+# Matches the forecast_results_natural_key constraint (migration 009)
+FORECAST_RESULT_KEY = "country_code,indicator_id,forecast_date,forecast_horizon,model_name,run_id"
+DEFAULT_BATCH_SIZE = 500
+
+def default_run_id():
+    # One run per day, so a retried daily job overwrites its own rows instead of appending
+    return datetime.now().strftime('%Y-%m-%d')
+
+class ForecastResultSink:
+    """Buffer forecast rows and upsert them to forecast_results in fixed-size batches.
+
+    Rows are written as soon as a batch fills, so a long run makes progress while
+    it is still fitting. Upserting on the natural key makes re-runs idempotent.
+    on_write, if given, is called with each batch once it is stored.
+    """
+
+    def __init__(self, client, run_id=None, batch_size=DEFAULT_BATCH_SIZE, on_write=None):
+        self.client = client
+        self.run_id = run_id or default_run_id()
+        self.batch_size = batch_size
+        self.on_write = on_write
+        self.buffer = []
+        self.written = 0
+
+    def add(self, rows):
+        self.buffer.extend({**row, 'run_id': self.run_id} for row in rows)
+        while len(self.buffer) >= self.batch_size:
+            self.write_batch(self.buffer[:self.batch_size])
+            self.buffer = self.buffer[self.batch_size:]
+
+    def write_batch(self, batch):
+        self.write(batch)
+        if self.on_write is not None:
+            self.on_write(batch)
+
+    def write(self, batch):
+        self.client.table("forecast_results").upsert(batch, on_conflict=FORECAST_RESULT_KEY).execute()
+        self.written += len(batch)
+
+    def flush(self):
+        if self.buffer:
+            self.write_batch(self.buffer)
+            self.buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+            return False
+        # Keep whatever was fitted before a failure, but never let a write error replace that failure
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Error flushing {len(self.buffer)} forecast rows after a failed run: {str(e)}")
+        return False
\ No newline at end of file
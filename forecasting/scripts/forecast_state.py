@@ -0,0 +1,37 @@
+import hashlib
+import json
+import os
+
+DEFAULT_STATE_DIR = os.getenv("FORECAST_STATE_DIR", ".forecast_state")
+
+def series_fingerprint(series, spec):
+    """Hash a resampled series together with everything that shapes its forecast."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(spec, sort_keys=True).encode())
+    digest.update(series.index.asi8.tobytes())
+    digest.update(series.to_numpy(dtype='float64').tobytes())
+    return digest.hexdigest()
+
+class FingerprintStore:
+    """Last successfully written fingerprint per series, kept as one JSON file."""
+
+    def __init__(self, state_dir=None, filename="fingerprints.json"):
+        self.path = os.path.join(state_dir or DEFAULT_STATE_DIR, filename)
+        self.fingerprints = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.fingerprints = json.load(f)
+
+    def is_unchanged(self, key, fingerprint):
+        return self.fingerprints.get(key) == fingerprint
+
+    def update(self, fingerprints):
+        self.fingerprints.update(fingerprints)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Write to a temp file first so a crash never leaves a truncated state file
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.fingerprints, f)
+        os.replace(tmp_path, self.path)
\ No newline at end of file
@@ -1,106 +1,169 @@
+import re
 import pandas as pd
-from supabase import create_client, Client
-from datetime import datetime
-from dotenv import load_dotenv
 import os
 from fetch_data import fetch_validated_data
+from supabase_client import get_client
+from telemetry import span
+from timeseries_stream import fetch_table
 
-# Load environment variables
-load_dotenv()
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-supabase = create_client(supabase_url, supabase_key)
+# Keyword-based mapping rules, in priority order: the first category with a
+# keyword anywhere in the indicator name wins
+CATEGORY_KEYWORDS = {
+    'Growth': ['gdp', 'industrial production', 'economic growth'],
+    'Prices': ['cpi', 'ppi', 'inflation', 'price index'],
+    'Labor': ['unemployment', 'employment', 'labor force'],
+    'Trade': ['trade balance', 'export', 'import'],
+    'Sentiment': ['consumer confidence', 'business confidence', 'sentiment']
+}
 
-def map_taxonomy(countries, indicators):
+MAPPING_KEY = ["country_code", "category_id", "rank"]
+MAPPING_VALUES = ["indicator_id", "is_primary", "fallback_reason", "coverage_ratio", "provenance"]
+WRITE_BATCH_SIZE = 500
+
+def keyword_matcher(category_keywords=CATEGORY_KEYWORDS):
+    """Compile every keyword into one pattern with a capture group per keyword.
+
+    Alternatives are tried in priority order at the start of the name, each as a
+    lookahead over the whole name, so the first matching keyword in rule order
+    wins (not the leftmost one in the name), exactly like the nested scan did.
+    """
+    keywords = [(category, keyword) for category, words in category_keywords.items() for keyword in words]
+    pattern = "^(?:" + "|".join(f"(?=.*?({re.escape(keyword)}))" for _, keyword in keywords) + ")"
+    return re.compile(pattern), keywords
+
+def label_indicators(indicators, category_keywords=CATEGORY_KEYWORDS):
+    """Return indicator_id, category_name and keyword for every indicator matching a rule."""
+    matcher, keywords = keyword_matcher(category_keywords)
+    groups = indicators['indicator_name'].str.lower().str.extract(matcher)
+    # Exactly one group is set per matching name; its position identifies the keyword
+    matched = groups.notna()
+    has_match = matched.any(axis=1)
+    position = matched[has_match].to_numpy().argmax(axis=1)
+    return pd.DataFrame({
+        'indicator_id': indicators.loc[has_match, 'indicator_id'].astype('int64').to_numpy(),
+        'category_name': [keywords[i][0] for i in position],
+        'keyword': [keywords[i][1] for i in position]
+    })
+
+def coverage_ratios(timeseries):
+    """Share of an indicator's observed dates that each country has, keyed by (country_code, indicator_id)."""
+    observed = timeseries[['country_code', 'indicator_id', 'date_value']].drop_duplicates()
+    per_series = observed.groupby(['country_code', 'indicator_id']).size()
+    per_indicator = observed.drop_duplicates(['indicator_id', 'date_value']).groupby('indicator_id').size()
+    ratios = per_series / per_indicator.reindex(per_series.index.get_level_values('indicator_id')).to_numpy()
+    return ratios.round(4).rename('coverage_ratio')
+
+def build_mappings(countries, indicators, category_map, timeseries=None):
+    """Map every country x matched indicator pair, ranked within (country, category) by coverage."""
+    labelled = label_indicators(indicators)
+    labelled['category_id'] = labelled['category_name'].map(category_map)
+    labelled = labelled.dropna(subset=['category_id'])
+    mappings = countries[['country_code']].drop_duplicates().merge(labelled, how='cross')
+    if mappings.empty:
+        return mappings
+
+    if timeseries is None:
+        # Without observations every pair is assumed fully covered, as before
+        mappings['coverage_ratio'] = 1.0
+    else:
+        mappings = mappings.join(coverage_ratios(timeseries), on=['country_code', 'indicator_id'])
+        mappings['coverage_ratio'] = mappings['coverage_ratio'].fillna(0.0)
+
+    # rank is part of the UNIQUE(country_code, category_id, rank) key, so indicators
+    # sharing a category get 1, 2, ... with the best-covered one as the primary
+    mappings = mappings.sort_values(['country_code', 'category_id', 'coverage_ratio', 'indicator_id'],
+                                    ascending=[True, True, False, True], ignore_index=True)
+    mappings['rank'] = mappings.groupby(['country_code', 'category_id']).cumcount() + 1
+    mappings['is_primary'] = mappings['rank'] == 1
+    mappings['fallback_reason'] = None
+    mappings['category_id'] = mappings['category_id'].astype('int64')
+    mappings['provenance'] = [{'source': 'keyword_mapping', 'rule': f"Matched keyword: {keyword}"} for keyword in mappings['keyword']]
+    return mappings[MAPPING_KEY + MAPPING_VALUES]
+
+def comparable(mappings):
+    # Normalise the columns that come back from the database in a different shape
+    df = mappings[MAPPING_KEY + MAPPING_VALUES].copy()
+    df['category_id'] = df['category_id'].astype('int64')
+    df['rank'] = df['rank'].astype('int64')
+    df['indicator_id'] = df['indicator_id'].astype('int64')
+    df['is_primary'] = df['is_primary'].astype(bool)
+    df['coverage_ratio'] = pd.to_numeric(df['coverage_ratio']).astype('float64').round(4)
+    df['fallback_reason'] = df['fallback_reason'].astype(object).where(df['fallback_reason'].notna(), None)
+    # Key order is not preserved by JSONB, so compare provenance as sorted items
+    df['provenance'] = [tuple(sorted(p.items())) if isinstance(p, dict) else p for p in df['provenance']]
+    return df
+
+def diff_mappings(desired, existing):
+    """Compare the desired mapping with what is stored.
+
+    Returns the desired rows that are new or changed (to upsert on the unique key)
+    and the mapping_ids of stored rows whose key is no longer produced.
+    """
+    wanted = comparable(desired)
+    if existing.empty:
+        return desired.to_dict('records'), []
+    stored = comparable(existing)
+    stored['mapping_id'] = existing['mapping_id'].to_numpy()
+
+    merged = wanted.merge(stored, on=MAPPING_KEY, how='outer', suffixes=('', '_stored'), indicator=True)
+    present = merged['_merge'] == 'both'
+    unchanged = present.copy()
+    for column in MAPPING_VALUES:
+        unchanged &= merged[column].eq(merged[f'{column}_stored']) | (merged[column].isna() & merged[f'{column}_stored'].isna())
+
+    changed_keys = merged.loc[(merged['_merge'] == 'left_only') | (present & ~unchanged), MAPPING_KEY]
+    upserts = desired.merge(changed_keys, on=MAPPING_KEY).to_dict('records')
+    stale_ids = merged.loc[merged['_merge'] == 'right_only', 'mapping_id'].astype('int64').tolist()
+    return upserts, stale_ids
+
+def write_mapping_delta(supabase, mappings):
+    """Upsert changed rows and delete stale ones over REST; returns (upserted, deleted)."""
+    existing = fetch_table(supabase, "taxonomy_mapping", ["mapping_id"] + MAPPING_KEY + MAPPING_VALUES, key="mapping_id")
+    upserts, stale_ids = diff_mappings(mappings, existing)
+    records = [{**row, 'rank': int(row['rank']), 'category_id': int(row['category_id']),
+                'indicator_id': int(row['indicator_id']), 'is_primary': bool(row['is_primary']),
+                'coverage_ratio': float(row['coverage_ratio'])} for row in upserts]
+    for start in range(0, len(records), WRITE_BATCH_SIZE):
+        supabase.table("taxonomy_mapping").upsert(records[start:start + WRITE_BATCH_SIZE], on_conflict=",".join(MAPPING_KEY)).execute()
+    for start in range(0, len(stale_ids), WRITE_BATCH_SIZE):
+        supabase.table("taxonomy_mapping").delete().in_("mapping_id", stale_ids[start:start + WRITE_BATCH_SIZE]).execute()
+    return len(records), len(stale_ids)
+
+def map_taxonomy(countries, indicators, backend=None, timeseries=None):
     try:
-        start_time = datetime.now()
-        mappings = []
-
-        # Fetch categories
-        categories_response = supabase.table("categories").select("category_id, category_name").execute()
-        categories = pd.DataFrame(categories_response.data)
-        category_map = categories.set_index('category_name')['category_id'].to_dict()
-
-        # Define keyword-based mapping rules
-        category_keywords = {
-            'Growth': ['gdp', 'industrial production', 'economic growth'],
-            'Prices': ['cpi', 'ppi', 'inflation', 'price index'],
-            'Labor': ['unemployment', 'employment', 'labor force'],
-            'Trade': ['trade balance', 'export', 'import'],
-            'Sentiment': ['consumer confidence', 'business confidence', 'sentiment']
-        }
-
-        # Map indicators to categories
-        for _, indicator in indicators.iterrows():
-            indicator_name = indicator['indicator_name'].lower()
-            indicator_id = int(indicator['indicator_id'])
-            matched_category_name = None
-            provenance_rule = None
-
-            # Try primary mapping
-            for category_name, keywords in category_keywords.items():
-                for keyword in keywords: # 🎯 FIX: Iterate through each keyword to find a match
-                    if keyword in indicator_name:
-                        matched_category_name = category_name
-                        provenance_rule = f"Matched keyword: {keyword}" # 🎯 FIX: 'keyword' is now defined
-                        break # Break out of the inner loop
-                if matched_category_name:
-                    break # Break out of the outer loop once a match is found
-            
-            # If a primary mapping is found, add it to the mappings list for all countries
-            if matched_category_name:
-                category_id = category_map.get(matched_category_name)
-                for _, country in countries.iterrows():
-                    country_code = country['country_code']
-                    mappings.append({
-                        'country_code': country_code,
-                        'indicator_id': indicator_id,
-                        'category_id': category_id,
-                        'rank': 1,
-                        'is_primary': True,
-                        'fallback_reason': None,
-                        'coverage_ratio': 1.0,
-                        'provenance': {'source': 'keyword_mapping', 'rule': provenance_rule}
-                    })
-
-        # Store mappings in Supabase
-        if mappings:
-            # 🎯 FIX: Delete existing mappings using a valid column name
-            supabase.table("taxonomy_mapping").delete().not_.is_('country_code', 'null').execute()
-            supabase.table("taxonomy_mapping").insert(mappings).execute()
-            print(f"Stored {len(mappings)} taxonomy mappings")
-
-        # Log mapping run
-        end_time = datetime.now()
-        execution_time_ms = int((end_time - start_time).total_seconds() * 1000)
-        log_entry = {
-            "endpoint": "map_taxonomy",
-            "status": "success",
-            "records_processed": len(mappings),
-            "error_message": None,
-            "started_at": start_time.isoformat(),
-            "completed_at": end_time.isoformat(),
-            "execution_time_ms": execution_time_ms
-        }
-        supabase.table("ingestion_log").insert(log_entry).execute()
+        with span("map_taxonomy") as stage:
+            supabase = get_client()
+
+            # Fetch categories
+            categories_response = supabase.table("categories").select("category_id, category_name").execute()
+            categories = pd.DataFrame(categories_response.data)
+            category_map = categories.set_index('category_name')['category_id'].to_dict()
+
+            # Label all indicators in one pass, then pair them with every country
+            with span("map_taxonomy.build", detail=True) as step:
+                mapping_frame = build_mappings(countries, indicators, category_map, timeseries)
+                mappings = mapping_frame.to_dict('records')
+                step.set(rows_in=len(indicators), rows_out=len(mappings))
+
+            # Store only the rows that changed since the last run
+            if mappings:
+                with span("map_taxonomy.write", detail=True) as step:
+                    backend = backend or os.getenv("PIPELINE_BACKEND", "rest")
+                    if backend == "postgres":
+                        import pg_bulk
+                        upserted, deleted = pg_bulk.write_taxonomy_mappings(mappings)
+                    else:
+                        upserted, deleted = write_mapping_delta(supabase, mapping_frame)
+                    step.set(rows_in=len(mappings), rows_out=upserted, deleted=deleted)
+                print(f"Stored {len(mappings)} taxonomy mappings ({upserted} upserted, {deleted} removed)")
+
+            stage.set(rows_in=len(indicators), rows_out=len(mappings))
 
         return mappings
     except Exception as e:
         print(f"Error mapping taxonomy: {str(e)}")
-        end_time = datetime.now()
-        execution_time_ms = int((end_time - start_time).total_seconds() * 1000)
-        log_entry = {
-            "endpoint": "map_taxonomy",
-            "status": "failed",
-            "records_processed": 0,
-            "error_message": str(e),
-            "started_at": start_time.isoformat(),
-            "completed_at": end_time.isoformat(),
-            "execution_time_ms": execution_time_ms
-        }
-        supabase.table("ingestion_log").insert(log_entry).execute()
         raise
 
 if __name__ == "__main__":
-    countries, indicators, _ = fetch_validated_data()
-    mappings = map_taxonomy(countries, indicators)
\ No newline at end of file
+    countries, indicators, timeseries = fetch_validated_data()
+    mappings = map_taxonomy(countries, indicators, timeseries=timeseries)
\ No newline at end of file
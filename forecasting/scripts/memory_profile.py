@@ -0,0 +1,160 @@
+import contextvars
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from telemetry import peak_rss_mb
+
+_active = contextvars.ContextVar('memory_profiler', default=None)
+
+def rss_mb():
+    # Current resident set size; falls back to the high-water mark off Linux
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+class MemoryProfiler:
+    """Per-step Python allocations (tracemalloc) and process RSS, with an optional budget.
+
+    Use as a context manager around the work to measure; code under it reports
+    steps through profile_step(name), which costs nothing when no profiler is
+    active. Each step records its net allocation, its traced peak above the
+    step's start (nested steps included) and RSS on exit. With budget_mb, a step
+    whose traced peak since the profiler started exceeds the budget raises
+    MemoryError when it ends.
+    """
+
+    def __init__(self, budget_mb=None):
+        self.budget_mb = budget_mb
+        self.steps = []
+        self.stack = []
+        self.peak_mb = 0.0
+
+    def __enter__(self):
+        self.started_tracing = not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self.baseline = tracemalloc.get_traced_memory()[0]
+        self.token = _active.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.fold_peak()
+        _active.reset(self.token)
+        if self.started_tracing:
+            tracemalloc.stop()
+        return False
+
+    def fold_peak(self):
+        # tracemalloc keeps one peak, so credit it to every open step before resetting it
+        peak = tracemalloc.get_traced_memory()[1]
+        for frame in self.stack:
+            frame['peak'] = max(frame['peak'], peak)
+        self.peak_mb = max(self.peak_mb, (peak - self.baseline) / 2 ** 20)
+        tracemalloc.reset_peak()
+
+    @contextmanager
+    def step(self, name):
+        self.fold_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        frame = {'peak': start}
+        self.stack.append(frame)
+        depth = len(self.stack) - 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.fold_peak()
+            self.stack.pop()
+            current = tracemalloc.get_traced_memory()[0]
+            self.steps.append({
+                'step': name,
+                'depth': depth,
+                'seconds': time.perf_counter() - started,
+                'allocated_mb': (current - start) / 2 ** 20,
+                'peak_mb': (frame['peak'] - start) / 2 ** 20,
+                'total_peak_mb': (frame['peak'] - self.baseline) / 2 ** 20,
+                'rss_mb': rss_mb(),
+                'peak_rss_mb': peak_rss_mb()
+            })
+        if self.budget_mb is not None and self.steps[-1]['total_peak_mb'] > self.budget_mb:
+            raise MemoryError(f"{name} peaked at {self.steps[-1]['total_peak_mb']:.1f} MB traced, "
+                              f"over the {self.budget_mb:g} MB budget")
+
+    def report(self):
+        """Steps in the order they finished, as a fixed-width table."""
+        lines = [f"{'step':<40} {'seconds':>8} {'alloc MB':>9} {'peak MB':>9} {'total MB':>9} {'rss MB':>8} {'max rss':>8}"]
+        for s in self.steps:
+            name = "  " * s['depth'] + s['step']
+            lines.append(f"{name:<40} {s['seconds']:>8.3f} {s['allocated_mb']:>9.1f} {s['peak_mb']:>9.1f} "
+                         f"{s['total_peak_mb']:>9.1f} {s['rss_mb']:>8.1f} {s['peak_rss_mb']:>8.1f}")
+        return "\n".join(lines)
+
+@contextmanager
+def _no_step():
+    yield
+
+def profile_step(name):
+    """Measure the enclosed block as a step of the active MemoryProfiler, if any."""
+    profiler = _active.get()
+    if profiler is None:
+        return _no_step()
+    return profiler.step(name)
+
+def make_timeseries(rows, countries=50, indicators=20, seed=0):
+    """Random long rows shaped like canonical_timeseries, for sizing runs."""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    codes = [chr(65 + i // 676) + chr(65 + i // 26 % 26) + chr(65 + i % 26) for i in range(countries)]
+    periods = max(1, rows // (countries * indicators))
+    dates = pd.date_range("1990-01-31", periods=periods, freq="ME")
+    index = np.arange(rows)
+    timeseries = pd.DataFrame({
+        'country_code': np.array(codes, dtype=object)[index // (indicators * periods) % countries],
+        'indicator_id': index // periods % indicators + 1,
+        'date_value': dates[index % periods],
+        'value': rng.normal(100, 10, rows),
+        'unit': rng.choice(['Percent', 'USD Billion', 'USD Million'], rows)
+    })
+    timeseries.loc[rng.random(rows) < 0.02, 'value'] = np.nan
+    return (pd.DataFrame({'country_code': codes}),
+            pd.DataFrame({'indicator_id': np.arange(1, indicators + 1),
+                          'indicator_name': [f'Indicator {i}' for i in range(1, indicators + 1)]}),
+            timeseries)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Per-step memory report for preprocessing a synthetic pull")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="timeseries rows to generate")
+    parser.add_argument("--countries", type=int, default=200)
+    parser.add_argument("--indicators", type=int, default=50)
+    parser.add_argument("--lean", action="store_true", help="use the lean preprocessing mode")
+    parser.add_argument("--float32", action="store_true", help="store values as float32 (with --lean)")
+    parser.add_argument("--panel", action="store_true", help="build a Panel instead of the wide frame")
+    parser.add_argument("--budget-mb", type=float, default=None, help="fail if any step's traced peak exceeds this")
+    args = parser.parse_args()
+
+    # Spans would otherwise be shipped to ingestion_log
+    os.environ.setdefault("TELEMETRY_LEVEL", "off")
+    # Run as a script this file is __main__; steps report to the imported module's profiler
+    from memory_profile import MemoryProfiler, make_timeseries
+    from preprocess_data import preprocess_data, preprocess_panel
+
+    countries, indicators, timeseries = make_timeseries(args.rows, args.countries, args.indicators)
+    profiler = MemoryProfiler(budget_mb=args.budget_mb)
+    try:
+        with profiler:
+            if args.panel:
+                preprocess_panel(countries, indicators, timeseries, lean=args.lean)
+            else:
+                preprocess_data(countries, indicators, timeseries, lean=args.lean,
+                                float_dtype='float32' if args.float32 else 'float64')
+    finally:
+        print(profiler.report())
+        print(f"Traced peak {profiler.peak_mb:.1f} MB for {args.rows} rows ({profiler.peak_mb * 2 ** 20 / args.rows:.0f} bytes/row)")
\ No newline at end of file
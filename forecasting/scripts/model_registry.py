@@ -0,0 +1,254 @@
+import re
+import warnings
+from functools import partial
+import numpy as np
+import pandas as pd
+
+SEASONAL_PERIOD = 12
+DEFAULT_MODEL = 'ARIMA(1,1,1)'
+
+def as_series(series):
+    # forecast_data passes single-column frames; the models want a plain Series
+    if isinstance(series, pd.DataFrame):
+        series = series.iloc[:, 0]
+    return series.astype('float64')
+
+def is_monthly(series):
+    return series.index.freq is None or series.index.freqstr == 'ME'
+
+def future_index(series, steps):
+    freq = series.index.freq or pd.tseries.frequencies.to_offset('ME')
+    return pd.date_range(series.index[-1] + freq, periods=steps, freq=freq)
+
+def gaussian_aic(residuals, n_params):
+    # -2 log L + 2k for i.i.d. normal residuals at the MLE variance
+    n = len(residuals)
+    sigma2 = np.mean(residuals ** 2)
+    log_likelihood = -0.5 * n * (np.log(2 * np.pi * sigma2) + 1)
+    return -2 * log_likelihood + 2 * n_params
+
+class SimpleForecast:
+    """Point forecasts plus standard errors, shaped like statsmodels' PredictionResults."""
+
+    def __init__(self, predicted_mean, std_errors):
+        self.predicted_mean = predicted_mean
+        self.std_errors = std_errors
+
+    def conf_int(self, alpha=0.05):
+        from scipy.stats import norm
+        z = norm.ppf(1 - alpha / 2)
+        return pd.DataFrame({
+            'lower': self.predicted_mean - z * self.std_errors,
+            'upper': self.predicted_mean + z * self.std_errors
+        }, index=self.predicted_mean.index)
+
+class SeasonalNaiveFit:
+    """Repeat the value from one season ago."""
+
+    def __init__(self, series, period=SEASONAL_PERIOD):
+        self.series = series
+        self.period = period
+        values = series.to_numpy()
+        residuals = values[period:] - values[:-period]
+        self.sigma = np.sqrt(np.mean(residuals ** 2))
+        self.aic = gaussian_aic(residuals, 1)
+
+    def get_forecast(self, steps):
+        h = np.arange(1, steps + 1)
+        last_season = self.series.to_numpy()[-self.period:]
+        mean = last_season[(h - 1) % self.period]
+        std_errors = self.sigma * np.sqrt((h - 1) // self.period + 1)
+        index = future_index(self.series, steps)
+        return SimpleForecast(pd.Series(mean, index=index), pd.Series(std_errors, index=index))
+
+class DriftFit:
+    """Random walk with drift: extend the line from the first to the last observation."""
+
+    def __init__(self, series):
+        self.series = series
+        values = series.to_numpy()
+        self.n = len(values)
+        self.drift = (values[-1] - values[0]) / (self.n - 1)
+        residuals = np.diff(values) - self.drift
+        self.sigma = np.sqrt(np.sum(residuals ** 2) / (len(residuals) - 1))
+        self.aic = gaussian_aic(residuals, 2)
+
+    def get_forecast(self, steps):
+        h = np.arange(1, steps + 1)
+        mean = self.series.iloc[-1] + h * self.drift
+        std_errors = self.sigma * np.sqrt(h * (1 + h / (self.n - 1)))
+        index = future_index(self.series, steps)
+        return SimpleForecast(pd.Series(mean, index=index), pd.Series(std_errors, index=index))
+
+def arima_model(series, order):
+    from statsmodels.tsa.arima.model import ARIMA
+    # Series arrive on their native grid (monthly, quarterly or annual)
+    return ARIMA(series, order=order, freq=series.index.freq or 'ME')
+
+def ets_model(series, trend, damped):
+    from statsmodels.tsa.statespace.exponential_smoothing import ExponentialSmoothing
+    return ExponentialSmoothing(series, trend=trend, damped_trend=damped)
+
+def fit_arima(series, order, start_params=None):
+    return arima_model(series, order).fit(start_params=start_params)
+
+def fit_ets(series, trend, damped, start_params=None):
+    return ets_model(series, trend, damped).fit(start_params=start_params, disp=False)
+
+# (trend, damped) for each state-space exponential smoothing model
+ETS_SPECS = {
+    'ETS(A,N,N)': (False, False),
+    'ETS(A,A,N)': (True, False),
+    'ETS(A,Ad,N)': (True, True)
+}
+
+# Non-ARIMA models by name; ARIMA orders are parsed from names like 'ARIMA(2,1,0)'
+MODEL_REGISTRY = {
+    **{name: partial(fit_ets, trend=trend, damped=damped) for name, (trend, damped) in ETS_SPECS.items()},
+    f'SNAIVE({SEASONAL_PERIOD})': partial(SeasonalNaiveFit, period=SEASONAL_PERIOD),
+    'DRIFT': DriftFit
+}
+
+ARIMA_NAME = re.compile(r'^ARIMA\((\d+),(\d+),(\d+)\)$')
+
+def register_model(name, fit):
+    """Add a model: fit(series) must return an object with get_forecast(steps) and aic."""
+    MODEL_REGISTRY[name] = fit
+
+def arima_name(order):
+    return f'ARIMA({order[0]},{order[1]},{order[2]})'
+
+def state_space_model(name, series):
+    """The unfitted statsmodels model behind name, or None for models without one (naive, custom)."""
+    match = ARIMA_NAME.match(name)
+    if match:
+        return arima_model(series, tuple(int(g) for g in match.groups()))
+    if name in ETS_SPECS:
+        return ets_model(series, *ETS_SPECS[name])
+    return None
+
+def fit_model(name, series, start_params=None):
+    """Fit the named model to series and return its results object.
+
+    start_params warm-starts the optimizer of state-space models (ARIMA, ETS).
+    """
+    series = as_series(series)
+    match = ARIMA_NAME.match(name)
+    if match:
+        return fit_arima(series, tuple(int(g) for g in match.groups()), start_params=start_params)
+    if name not in MODEL_REGISTRY:
+        raise ValueError(f"Unknown model: {name}")
+    if start_params is not None and name in ETS_SPECS:
+        return fit_ets(series, *ETS_SPECS[name], start_params=start_params)
+    return MODEL_REGISTRY[name](series)
+
+def arima_grid(d=1, max_p=1, max_q=1):
+    return [arima_name((p, d, q)) for p in range(max_p + 1) for q in range(max_q + 1)]
+
+def default_candidates(series, d=1):
+    # Kept small on purpose: higher ARIMA orders and undamped ETS cost 2-6x an ARIMA(1,1,1)
+    # fit and rarely win on short macro series; pass candidates= to widen the search
+    candidates = arima_grid(d) + ['ETS(A,N,N)', 'ETS(A,Ad,N)', 'DRIFT']
+    if len(series) >= 2 * SEASONAL_PERIOD and is_monthly(series):
+        candidates.append(f'SNAIVE({SEASONAL_PERIOD})')
+    return candidates
+
+def try_fit(name, series):
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return fit_model(name, series)
+    except Exception:
+        return None
+
+def fit_aic(name, series):
+    model_fit = try_fit(name, series)
+    return np.inf if model_fit is None or not np.isfinite(model_fit.aic) else model_fit.aic
+
+def origin_error(name, series, origin, horizon):
+    """Mean absolute error of a fit on series[:origin] over the next horizon points."""
+    model_fit = try_fit(name, series.iloc[:origin])
+    if model_fit is None:
+        return np.inf
+    forecast = model_fit.get_forecast(steps=horizon).predicted_mean.to_numpy()
+    actual = series.iloc[origin:origin + horizon].to_numpy()
+    return float(np.mean(np.abs(forecast - actual)))
+
+def stepwise_arima(series, d=1, max_p=2, max_q=2):
+    """Hill-climb over (p, q) by AIC from (1, d, 1), only visiting neighbours of the current best."""
+    scores = {}
+    current = (1, d, 1)
+    frontier = [current, (0, d, 0)]
+    while frontier:
+        names = [arima_name(order) for order in frontier]
+        for order, aic in zip(frontier, map(partial(fit_aic, series=series), names)):
+            scores[order] = aic
+        best = min(scores, key=scores.get)
+        if best == current and len(scores) > 2:
+            break
+        current = best
+        p, _, q = current
+        neighbours = [(p + dp, d, q + dq) for dp, dq in ((1, 0), (-1, 0), (0, 1), (0, -1))]
+        frontier = [o for o in neighbours if 0 <= o[0] <= max_p and 0 <= o[2] <= max_q and o not in scores]
+    return {arima_name(order): aic for order, aic in scores.items()}
+
+def score_candidates(series, candidates, criterion, horizon, folds, prune_ratio):
+    if criterion == 'aic':
+        # AICs are only comparable on the same data: ARIMA orders sharing d all score the
+        # likelihood of the same differenced series, while ETS (levels), SNAIVE (n - 12
+        # residuals) and DRIFT (n - 1) each score a different sample
+        if candidates is None:
+            return stepwise_arima(series)
+        orders = [ARIMA_NAME.match(name) for name in candidates]
+        if not all(orders) or len({int(order.group(2)) for order in orders}) > 1:
+            raise ValueError("criterion='aic' only compares ARIMA orders with the same d; use criterion='cv' across model families")
+        names = list(candidates)
+        return dict(zip(names, map(partial(fit_aic, series=series), names)))
+
+    if criterion == 'cv':
+        candidates = list(candidates or default_candidates(series))
+        # Every fold trains on at least a year of months (or as many points of a coarser series)
+        origins = [origin for origin in (len(series) - horizon - k for k in range(folds)) if origin >= SEASONAL_PERIOD]
+        if not origins:
+            # Too short to hold anything out, as short quarterly and annual series are: rank ARIMA orders by AIC
+            return stepwise_arima(series)
+
+        # First pass on the most recent origin prunes clearly worse candidates
+        first = list(map(partial(origin_error, series=series, origin=origins[0], horizon=horizon), candidates))
+        best_first = min(first)
+        survivors = [(name, [error]) for name, error in zip(candidates, first) if error <= best_first * prune_ratio]
+
+        for origin in origins[1:]:
+            names = [name for name, _ in survivors]
+            errors = list(map(partial(origin_error, series=series, origin=origin, horizon=horizon), names))
+            for (_, history), error in zip(survivors, errors):
+                history.append(error)
+        return {name: float(np.mean(errors)) for name, errors in survivors}
+
+    raise ValueError(f"Unknown selection criterion: {criterion}")
+
+def select_model(series, candidates=None, criterion='cv', horizon=1, folds=3, prune_ratio=1.25):
+    """Choose a model for one series and return (model_name, fitted_model).
+
+    criterion='aic' searches ARIMA orders stepwise (pruning orders that are not
+    neighbours of the running best); it only ranks ARIMA orders with the same
+    d, since AICs of other families are computed on different samples.
+    criterion='cv' compares across families: it scores every candidate on the most recent
+    rolling origin first, drops those worse than prune_ratio times the best, and
+    only scores the survivors on the remaining folds. Folds that would train on
+    fewer than SEASONAL_PERIOD points are dropped, and a series too short for
+    any fold falls back to the AIC search. Fits run serially; run_forecasts
+    already spreads series across processes.
+    """
+    series = as_series(series)
+    scores = score_candidates(series, candidates, criterion, horizon, folds, prune_ratio)
+
+    ranked = sorted((score, name) for name, score in scores.items() if np.isfinite(score))
+    if not ranked:
+        raise ValueError("No candidate model could be fit")
+    # Refit the winner on the full series; fall back down the ranking if it fails there
+    for _, name in ranked:
+        model_fit = try_fit(name, series)
+        if model_fit is not None:
+            return name, model_fit
+    raise ValueError("No candidate model could be fit on the full series")
\ No newline at end of file
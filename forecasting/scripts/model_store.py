@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import warnings
+from datetime import datetime
+import numpy as np
+from forecast_state import DEFAULT_STATE_DIR, series_fingerprint
+from model_registry import ARIMA_NAME, as_series, fit_model, select_model, state_space_model
+
+# Full re-estimation after this many observations have been added by extension
+DEFAULT_REFIT_EVERY = 12
+
+class ModelStore:
+    """Fitted state per series, one small JSON file each under <state_dir>/models.
+
+    An entry holds the model name, its estimated parameters, the filter state
+    after the last observation, the number of observations it has seen and a
+    fingerprint of those observations, so the next run can tell whether the
+    series only gained new points or was revised.
+    """
+
+    def __init__(self, state_dir=None):
+        self.model_dir = os.path.join(state_dir or DEFAULT_STATE_DIR, "models")
+
+    def path(self, key):
+        # Series labels contain spaces and punctuation; hash them into file names
+        return os.path.join(self.model_dir, hashlib.sha1(key.encode()).hexdigest()[:20] + ".json")
+
+    def load(self, key):
+        try:
+            with open(self.path(key)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def save(self, key, entry):
+        os.makedirs(self.model_dir, exist_ok=True)
+        tmp_path = self.path(key) + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({**entry, 'key': key}, f)
+        os.replace(tmp_path, self.path(key))
+
+def prefix_fingerprint(series, nobs):
+    return series_fingerprint(series.iloc[:nobs], {})
+
+def capture_entry(model_name, series, model_fit, kind, since_refit):
+    """Serializable state of a fit on the whole of series."""
+    entry = {
+        'model_name': model_name,
+        'nobs': len(series),
+        'fingerprint': prefix_fingerprint(series, len(series)),
+        'since_refit': since_refit,
+        'fit_kind': kind,
+        'updated_at': datetime.now().isoformat(),
+        'params': None,
+        'state': None,
+        'state_cov': None
+    }
+    if hasattr(model_fit, 'params') and hasattr(model_fit, 'predicted_state'):
+        entry['params'] = np.asarray(model_fit.params, dtype='float64').tolist()
+        # One-step-ahead state after the last observation: the starting point for new data
+        entry['state'] = model_fit.predicted_state[:, -1].tolist()
+        entry['state_cov'] = model_fit.predicted_state_cov[:, :, -1].tolist()
+    return entry
+
+def extend_fit(model_name, series, entry):
+    """Apply stored parameters to series without re-estimating them.
+
+    ARIMA filters only the new observations, starting from the stored filter
+    state. ETS carries its initial states among the parameters, so it is
+    re-filtered over the whole series, which is still a single pass.
+    """
+    params = np.asarray(entry['params'])
+    if ARIMA_NAME.match(model_name) and entry['state'] is not None and len(series) > entry['nobs']:
+        model = state_space_model(model_name, series.iloc[entry['nobs']:])
+        model.initialize_known(np.asarray(entry['state']), np.asarray(entry['state_cov']))
+        return model.filter(params)
+    return state_space_model(model_name, series).filter(params)
+
+def fit_with_store(series, entry, model, criterion='cv', refit_every=DEFAULT_REFIT_EVERY):
+    """Fit series reusing a stored entry where possible.
+
+    Returns (model_name, model_fit, new_entry). fit_kind in the entry is
+    'extend' (stored parameters, no optimization), 'warm' (re-estimated from the
+    stored parameters) or 'cold' (fit or model selection from scratch).
+    """
+    series = as_series(series)
+    usable = (
+        entry is not None
+        and (model == 'auto' or entry['model_name'] == model)
+        and entry['params'] is not None
+        and len(series) >= entry['nobs']
+    )
+    appended_only = usable and prefix_fingerprint(series, entry['nobs']) == entry['fingerprint']
+    added = len(series) - entry['nobs'] if usable else 0
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        if appended_only and entry['since_refit'] + added < refit_every:
+            try:
+                model_fit = extend_fit(entry['model_name'], series, entry)
+                return entry['model_name'], model_fit, capture_entry(entry['model_name'], series, model_fit, 'extend', entry['since_refit'] + added)
+            except Exception:
+                pass
+        if usable and model != 'auto':
+            # Revised history or a scheduled re-estimation: start the optimizer where it ended last time
+            model_fit = fit_model(entry['model_name'], series, start_params=np.asarray(entry['params']))
+            return entry['model_name'], model_fit, capture_entry(entry['model_name'], series, model_fit, 'warm', 0)
+
+    if model == 'auto':
+        model_name, model_fit = select_model(series, criterion=criterion)
+    else:
+        model_name, model_fit = model, fit_model(model, series)
+    return model_name, model_fit, capture_entry(model_name, series, model_fit, 'cold', 0)
\ No newline at end of file
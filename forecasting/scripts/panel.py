@@ -0,0 +1,226 @@
+import numpy as np
+import pandas as pd
+
+# Native frequencies: period-end offset, months per period and the fewest periods
+# a series needs before it is forecast
+FREQUENCIES = {
+    'M': {'name': 'monthly', 'offset': 'ME', 'months': 1, 'min_points': 12},
+    'Q': {'name': 'quarterly', 'offset': 'QE', 'months': 3, 'min_points': 8},
+    'A': {'name': 'annual', 'offset': 'YE', 'months': 12, 'min_points': 6}
+}
+# Median gap between observations, in days, up to which a series is monthly, then quarterly; sparser is annual
+MONTHLY_MAX_GAP_DAYS = 45
+QUARTERLY_MAX_GAP_DAYS = 135
+
+class RegularGroup:
+    """Series of one native frequency on regular period-end grids, ready to fit.
+
+    Series k is panel series positions[k]; its values are
+    values[offsets[k]:offsets[k + 1]] and its dates index[starts[k]:] for as
+    many periods. The group shares one DatetimeIndex, so a series' index is a
+    slice that keeps the frequency.
+    """
+
+    def __init__(self, frequency, positions, offsets, starts, values, index):
+        self.frequency = frequency
+        self.positions = positions
+        self.offsets = offsets
+        self.starts = starts
+        self.values = values
+        self.index = index
+
+    def __len__(self):
+        return len(self.positions)
+
+    def series(self, k):
+        start, end = self.offsets[k], self.offsets[k + 1]
+        first = self.starts[k]
+        return pd.Series(self.values[start:end], index=self.index[first:first + end - start])
+
+class Panel:
+    """Observations of many (country, indicator) series in one ragged, integer-coded layout.
+
+    All values sit in one contiguous float64 array (dates alongside), grouped by
+    series and sorted by date within each; series i spans
+    values[offsets[i]:offsets[i + 1]]. Countries and indicators are stored as
+    integer codes into the country and indicator axes, and only series with at
+    least one observation are stored, so memory follows the number of
+    observations rather than countries x indicators. slot maps
+    (country_code, indicator_id) to a series position in O(1).
+    """
+
+    def __init__(self, countries, indicator_ids, indicator_names, series_country, series_indicator, offsets, dates, values):
+        self.countries = np.asarray(countries, dtype=object)
+        self.indicator_ids = np.asarray(indicator_ids, dtype='int64')
+        self.indicator_names = np.asarray(indicator_names, dtype=object)
+        self.series_country = np.asarray(series_country, dtype='int32')
+        self.series_indicator = np.asarray(series_indicator, dtype='int32')
+        self.offsets = np.asarray(offsets, dtype='int64')
+        self.dates = np.asarray(dates, dtype='datetime64[ns]')
+        self.values = np.asarray(values, dtype='float64')
+        self.indicator_name_by_id = dict(zip(self.indicator_ids.tolist(), self.indicator_names.tolist()))
+        self.slot = {
+            (self.countries[c], int(self.indicator_ids[i])): position
+            for position, (c, i) in enumerate(zip(self.series_country, self.series_indicator))
+        }
+        self.regular_groups = None
+
+    @classmethod
+    def from_long(cls, frame, countries, indicators, value_column='value'):
+        """Build a panel from long rows (country_code, indicator_id, date_value, value_column).
+
+        Several rows for the same series and date are averaged, as pivot_table did.
+        Rows for countries or indicators missing from the axes, and missing values,
+        are dropped.
+        """
+        country_axis = pd.Index(countries['country_code'].unique())
+        indicator_axis = pd.Index(indicators['indicator_id'].astype('int64').unique())
+        names = indicators.drop_duplicates('indicator_id').set_index('indicator_id')['indicator_name']
+        indicator_names = names.reindex(indicator_axis).to_numpy(dtype=object)
+
+        country_code = country_axis.get_indexer(frame['country_code'])
+        indicator_code = indicator_axis.get_indexer(frame['indicator_id'].astype('int64'))
+        dates = pd.to_datetime(frame['date_value']).to_numpy('datetime64[ns]')
+        values = frame[value_column].to_numpy(dtype='float64')
+        keep = (country_code >= 0) & (indicator_code >= 0) & ~np.isnan(values)
+        key = country_code[keep].astype('int64') * len(indicator_axis) + indicator_code[keep]
+        dates, values = dates[keep], values[keep]
+
+        order = np.lexsort((dates, key))
+        key, dates, values = key[order], dates[order], values[order]
+
+        # Average duplicate (series, date) rows
+        if len(key):
+            starts = np.flatnonzero(np.r_[True, (key[1:] != key[:-1]) | (dates[1:] != dates[:-1])])
+            counts = np.diff(np.r_[starts, len(key)])
+            key, dates = key[starts], dates[starts]
+            values = np.add.reduceat(values, starts) / counts
+
+        series_starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]]) if len(key) else np.array([], dtype='int64')
+        series_key = key[series_starts]
+        return cls(
+            country_axis.to_numpy(dtype=object), indicator_axis.to_numpy(), indicator_names,
+            series_key // len(indicator_axis), series_key % len(indicator_axis),
+            np.r_[series_starts, len(key)], dates, values
+        )
+
+    @classmethod
+    def from_wide(cls, wide, countries, indicators):
+        """Build a panel from the wide frame of preprocess_data ('COUNTRY_Indicator name' columns)."""
+        long = wide.melt(id_vars='date_value', var_name='column', value_name='value').dropna(subset=['value'])
+        labels = pd.Categorical(long['column'])
+        indicator_ids = dict(zip(indicators['indicator_name'], indicators['indicator_id'].astype('int64')))
+        label_country, label_indicator = [], []
+        for label in labels.categories:
+            country_code, indicator_name = label.split('_', 1)
+            if indicator_name not in indicator_ids:
+                print(f"Skipping {label}: Indicator name not found in indicators table.")
+            label_country.append(country_code)
+            label_indicator.append(indicator_ids.get(indicator_name, -1))
+        long['country_code'] = np.asarray(label_country, dtype=object)[labels.codes]
+        long['indicator_id'] = np.asarray(label_indicator, dtype='int64')[labels.codes]
+        return cls.from_long(long, countries, indicators)
+
+    def __len__(self):
+        return len(self.series_country)
+
+    def series_ids(self):
+        # Series position of every observation
+        return np.repeat(np.arange(len(self)), np.diff(self.offsets))
+
+    def frequencies(self):
+        """Native frequency of every series ('M', 'Q' or 'A'), from the median gap between its dates."""
+        ids = self.series_ids()
+        same = ids[1:] == ids[:-1]
+        gap_ids = ids[1:][same]
+        gaps = ((self.dates[1:] - self.dates[:-1]) / np.timedelta64(1, 'D'))[same]
+        order = np.lexsort((gaps, gap_ids))
+        gaps = gaps[order]
+        counts = np.bincount(gap_ids, minlength=len(self))
+        starts = np.r_[0, np.cumsum(counts)[:-1]].astype('int64')
+        has_gaps = counts > 0
+        # Series with a single observation count as monthly, as the resample used to treat them
+        median = np.zeros(len(self))
+        median[has_gaps] = (gaps[(starts + (counts - 1) // 2)[has_gaps]] + gaps[(starts + counts // 2)[has_gaps]]) / 2
+        return np.where(median <= MONTHLY_MAX_GAP_DAYS, 'M', np.where(median <= QUARTERLY_MAX_GAP_DAYS, 'Q', 'A'))
+
+    def regular(self):
+        """Every series on the grid of its native frequency, as {frequency: RegularGroup}.
+
+        Matches resample(<period end>).mean().interpolate() per series:
+        observations in one period are averaged and empty periods are linearly
+        interpolated. Each frequency is done in one vectorized pass over all its
+        series, and the result is kept for later calls.
+        """
+        if self.regular_groups is not None:
+            return self.regular_groups
+        ids = self.series_ids()
+        frequencies = self.frequencies()
+        months = self.dates.astype('datetime64[M]').astype('int64')
+        groups = {}
+        for frequency, spec in FREQUENCIES.items():
+            positions = np.flatnonzero(frequencies == frequency)
+            if not len(positions):
+                continue
+            observed = np.isin(ids, positions)
+            series = np.searchsorted(positions, ids[observed])
+            # Periods since 1970 in this frequency; non-decreasing within each series
+            period = months[observed] // spec['months']
+            values = self.values[observed]
+
+            # Average observations sharing a period
+            starts = np.flatnonzero(np.r_[True, (series[1:] != series[:-1]) | (period[1:] != period[:-1])])
+            values = np.add.reduceat(values, starts) / np.diff(np.r_[starts, len(series)])
+            series, period = series[starts], period[starts]
+
+            bounds = np.flatnonzero(np.r_[True, series[1:] != series[:-1]])
+            first = period[bounds]
+            last = period[np.r_[bounds[1:], len(series)] - 1]
+            offsets = np.r_[0, np.cumsum(last - first + 1)].astype('int64')
+            grid = np.full(offsets[-1], np.nan)
+            grid[offsets[series] + period - first[series]] = values
+            # Every series starts and ends on an observed period, so interpolating over the
+            # concatenated grids never reaches across a series boundary
+            missing = np.isnan(grid)
+            if missing.any():
+                x = np.arange(len(grid))
+                grid[missing] = np.interp(x[missing], x[~missing], grid[~missing])
+
+            base = first.min()
+            first_end = (np.datetime64('1970-01', 'M') + (base + 1) * spec['months']).astype('datetime64[D]') - np.timedelta64(1, 'D')
+            index = pd.date_range(first_end, periods=int(last.max() - base + 1), freq=spec['offset'], name='date_value')
+            groups[frequency] = RegularGroup(frequency, positions, offsets, first - base, grid, index)
+        self.regular_groups = groups
+        return groups
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.dates.nbytes + self.offsets.nbytes + self.series_country.nbytes + self.series_indicator.nbytes
+
+    def key(self, position):
+        return self.countries[self.series_country[position]], int(self.indicator_ids[self.series_indicator[position]])
+
+    def label(self, position):
+        """The legacy wide-column name, e.g. 'MEX_GDP'."""
+        country_code, indicator_id = self.key(position)
+        return f'{country_code}_{self.indicator_name_by_id[indicator_id]}'
+
+    def series(self, position):
+        start, end = self.offsets[position], self.offsets[position + 1]
+        return pd.Series(self.values[start:end], index=pd.DatetimeIndex(self.dates[start:end], name='date_value'))
+
+    def get(self, country_code, indicator_id):
+        """The series for one pair, or None when it has no observations."""
+        position = self.slot.get((country_code, int(indicator_id)))
+        return None if position is None else self.series(position)
+
+    def to_wide(self):
+        """The mostly-NaN wide frame preprocess_data returns, for callers that still need it."""
+        columns = {}
+        for position in range(len(self)):
+            columns[self.label(position)] = self.series(position)
+        wide = pd.DataFrame(columns)
+        all_columns = [f'{c}_{name}' for c in self.countries for name in self.indicator_names]
+        wide = wide.reindex(columns=all_columns)
+        wide.index.name = 'date_value'
+        return wide.reset_index()
\ No newline at end of file
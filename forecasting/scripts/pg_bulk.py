@@ -0,0 +1,205 @@
+import io
+import json
+import pandas as pd
+# db_connect lives at the repository root, which must be on PYTHONPATH (pytest.ini adds it for the tests)
+from db_connect import get_pooled_connection
+from as_of import as_of_param
+from forecast_sink import ForecastResultSink
+from timeseries_stream import TIMESERIES_COLUMNS
+
+FORECAST_COLUMNS = ["country_code", "indicator_id", "forecast_date", "forecast_value", "forecast_horizon",
+                    "model_name", "confidence_interval_lower", "confidence_interval_upper", "run_id"]
+VALIDATION_LOG_COLUMNS = ["table_name", "validation_rule", "validation_type", "is_valid", "error_message",
+                          "record_count", "validated_at", "execution_time_ms"]
+FORECAST_TASK_COLUMNS = ["run_id", "task_key", "payload", "max_attempts"]
+TAXONOMY_COLUMNS = ["country_code", "indicator_id", "category_id", "rank", "is_primary",
+                    "fallback_reason", "coverage_ratio", "provenance"]
+
+# Types applied when parsing COPY output, so frames match the REST path
+COLUMN_DTYPES = {'country_code': str, 'country_name': str, 'indicator_name': str, 'unit': str,
+                 'indicator_id': 'int64', 'value': 'float64'}
+DATE_COLUMNS = ['date_value', 'release_date', 'vintage_date']
+
+def copy_out(cur, sql, params=None):
+    """Run COPY (query) TO STDOUT as CSV and return the buffer."""
+    query = cur.mogrify(sql, params).decode() if params else sql
+    buffer = io.StringIO()
+    cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER true)", buffer)
+    buffer.seek(0)
+    return buffer
+
+def copy_in(cur, table, columns, rows):
+    """Stream rows into table with COPY FROM STDIN; empty CSV fields become NULL."""
+    frame = pd.DataFrame(rows, columns=columns)
+    buffer = io.StringIO()
+    frame.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+def read_copy(sql, columns, params=None):
+    with get_pooled_connection() as conn, conn.cursor() as cur:
+        buffer = copy_out(cur, sql, params)
+    return pd.read_csv(
+        buffer,
+        dtype={c: t for c, t in COLUMN_DTYPES.items() if c in columns},
+        parse_dates=[c for c in DATE_COLUMNS if c in columns]
+    )
+
+def load_table(table, columns):
+    return read_copy(f"SELECT {', '.join(columns)} FROM {table}", columns)
+
+def load_timeseries(columns=None, countries=None, indicators=None, start_date=None, end_date=None, as_of=None):
+    """Load canonical_timeseries through COPY TO STDOUT, with filters applied in SQL.
+
+    With as_of (a date or 'latest') the timeseries_as_of function picks one vintage per point.
+    """
+    columns = list(columns or TIMESERIES_COLUMNS)
+    if as_of is not None:
+        sql = f"SELECT {', '.join(columns)} FROM timeseries_as_of(%s::date, %s::text[], %s::integer[], %s::date, %s::date)"
+        params = [
+            as_of_param(as_of),
+            list(countries) if countries is not None else None,
+            [int(i) for i in indicators] if indicators is not None else None,
+            pd.Timestamp(start_date).date() if start_date is not None else None,
+            pd.Timestamp(end_date).date() if end_date is not None else None
+        ]
+        return read_copy(sql, columns, params)
+
+    conditions, params = [], []
+    if countries is not None:
+        conditions.append("country_code = ANY(%s)")
+        params.append(list(countries))
+    if indicators is not None:
+        conditions.append("indicator_id = ANY(%s)")
+        params.append([int(i) for i in indicators])
+    if start_date is not None:
+        conditions.append("date_value >= %s")
+        params.append(pd.Timestamp(start_date).date())
+    if end_date is not None:
+        conditions.append("date_value <= %s")
+        params.append(pd.Timestamp(end_date).date())
+
+    sql = f"SELECT {', '.join(columns)} FROM canonical_timeseries"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    return read_copy(sql, columns, params)
+
+def load_latest_forecasts(columns, updated_after=None):
+    """Read latest_forecasts (migration 012), optionally only entries changed after updated_after."""
+    sql = f"SELECT {', '.join(columns)} FROM latest_forecasts"
+    if updated_after is None:
+        return read_copy(sql, columns)
+    return read_copy(sql + " WHERE updated_at > %s", columns, [updated_after])
+
+def latest_forecasts_version():
+    """(newest updated_at, entry count) of latest_forecasts (migration 014)."""
+    with get_pooled_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT updated_at, entries FROM latest_forecasts_version()")
+        return cur.fetchone()
+
+def write_forecasts(rows):
+    """COPY forecast rows into a staging table, then upsert them on the natural key."""
+    column_list = ", ".join(FORECAST_COLUMNS)
+    with get_pooled_connection() as conn, conn.cursor() as cur:
+        cur.execute(f"CREATE TEMP TABLE forecast_results_stage ON COMMIT DROP AS SELECT {column_list} FROM forecast_results WITH NO DATA")
+        copy_in(cur, "forecast_results_stage", FORECAST_COLUMNS, rows)
+        cur.execute(f"""
+            INSERT INTO forecast_results ({column_list})
+            SELECT {column_list} FROM forecast_results_stage
+            ON CONFLICT ON CONSTRAINT forecast_results_natural_key DO UPDATE SET
+                forecast_value = EXCLUDED.forecast_value,
+                confidence_interval_lower = EXCLUDED.confidence_interval_lower,
+                confidence_interval_upper = EXCLUDED.confidence_interval_upper,
+                created_at = NOW()
+        """)
+
+def delete_forecast_run(run_id):
+    """Delete a run's forecast_results and restore latest_forecasts for its keys from the remaining history.
+
+    Returns the number of forecast rows deleted.
+    """
+    key = "country_code, indicator_id, forecast_horizon, model_name"
+    with get_pooled_connection() as conn, conn.cursor() as cur:
+        cur.execute(f"CREATE TEMP TABLE deleted_forecast_keys ON COMMIT DROP AS SELECT DISTINCT {key} FROM forecast_results WHERE run_id = %s", (run_id,))
+        cur.execute("DELETE FROM latest_forecasts WHERE run_id = %s", (run_id,))
+        cur.execute("DELETE FROM forecast_results WHERE run_id = %s", (run_id,))
+        deleted = cur.rowcount
+        # Same selection as the migration 012 backfill, limited to the keys the run touched
+        cur.execute(f"""
+            INSERT INTO latest_forecasts (
+                {key}, forecast_id, forecast_date, forecast_value,
+                confidence_interval_lower, confidence_interval_upper, run_id, created_at
+            )
+            SELECT DISTINCT ON ({key})
+                   {key}, forecast_id, forecast_date, forecast_value,
+                   confidence_interval_lower, confidence_interval_upper, run_id, COALESCE(created_at, NOW())
+            FROM forecast_results JOIN deleted_forecast_keys USING ({key})
+            ORDER BY {key}, created_at DESC NULLS LAST, forecast_id DESC
+            ON CONFLICT DO NOTHING
+        """)
+    return deleted
+
+def write_forecast_tasks(tasks):
+    """COPY work queue tasks (migration 013) into a staging table, then insert the ones
+    not already queued for their run. Returns the number inserted."""
+    rows = [{**task, 'payload': json.dumps(task['payload'])} for task in tasks]
+    column_list = ", ".join(FORECAST_TASK_COLUMNS)
+    with get_pooled_connection() as conn, conn.cursor() as cur:
+        cur.execute(f"CREATE TEMP TABLE forecast_tasks_stage ON COMMIT DROP AS SELECT {column_list} FROM forecast_tasks WITH NO DATA")
+        copy_in(cur, "forecast_tasks_stage", FORECAST_TASK_COLUMNS, rows)
+        cur.execute(f"""
+            INSERT INTO forecast_tasks ({column_list})
+            SELECT {column_list} FROM forecast_tasks_stage
+            ON CONFLICT ON CONSTRAINT forecast_tasks_run_key DO NOTHING
+        """)
+        return cur.rowcount
+
+def write_taxonomy_mappings(mappings):
+    """Apply the mapping set as a delta: COPY it into a staging table, upsert only
+    changed rows on the unique key and delete keys that are no longer produced.
+
+    Returns (upserted, deleted) row counts.
+    """
+    rows = [{**m, 'provenance': json.dumps(m['provenance'])} for m in mappings]
+    column_list = ", ".join(TAXONOMY_COLUMNS)
+    with get_pooled_connection() as conn, conn.cursor() as cur:
+        cur.execute(f"CREATE TEMP TABLE taxonomy_mapping_stage ON COMMIT DROP AS SELECT {column_list} FROM taxonomy_mapping WITH NO DATA")
+        copy_in(cur, "taxonomy_mapping_stage", TAXONOMY_COLUMNS, rows)
+        cur.execute(f"""
+            INSERT INTO taxonomy_mapping AS t ({column_list})
+            SELECT {column_list} FROM taxonomy_mapping_stage
+            ON CONFLICT (country_code, category_id, rank) DO UPDATE SET
+                indicator_id = EXCLUDED.indicator_id,
+                is_primary = EXCLUDED.is_primary,
+                fallback_reason = EXCLUDED.fallback_reason,
+                coverage_ratio = EXCLUDED.coverage_ratio,
+                provenance = EXCLUDED.provenance,
+                mapping_date = NOW()
+            WHERE (t.indicator_id, t.is_primary, t.fallback_reason, t.coverage_ratio, t.provenance)
+                IS DISTINCT FROM (EXCLUDED.indicator_id, EXCLUDED.is_primary, EXCLUDED.fallback_reason, EXCLUDED.coverage_ratio, EXCLUDED.provenance)
+        """)
+        upserted = cur.rowcount
+        cur.execute("""
+            DELETE FROM taxonomy_mapping t
+            WHERE NOT EXISTS (
+                SELECT 1 FROM taxonomy_mapping_stage s
+                WHERE s.country_code = t.country_code AND s.category_id = t.category_id AND s.rank = t.rank
+            )
+        """)
+        deleted = cur.rowcount
+    return upserted, deleted
+
+def write_validation_log(rows):
+    """COPY validation results into validation_log in one statement."""
+    with get_pooled_connection() as conn, conn.cursor() as cur:
+        copy_in(cur, "validation_log", VALIDATION_LOG_COLUMNS, rows)
+
+class PgForecastSink(ForecastResultSink):
+    """ForecastResultSink that writes each batch over COPY instead of the REST API."""
+
+    def __init__(self, run_id=None, batch_size=5000, on_write=None):
+        super().__init__(None, run_id=run_id, batch_size=batch_size, on_write=on_write)
+
+    def write(self, batch):
+        write_forecasts(batch)
+        self.written += len(batch)
\ No newline at end of file
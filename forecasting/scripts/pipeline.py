@@ -0,0 +1,141 @@
+import argparse
+import time
+
+# Each stage names the stages whose outputs it consumes (requires, always pulled
+# into the run) and the stages it must merely follow when both are selected
+# (after). Stage functions import their module on first call, so a fetch-only or
+# taxonomy-only job never loads statsmodels or matplotlib.
+STAGES = {
+    'fetch': {'requires': (), 'after': ()},
+    'preprocess': {'requires': ('fetch',), 'after': ()},
+    'forecast': {'requires': ('fetch', 'preprocess'), 'after': ()},
+    'taxonomy': {'requires': ('fetch',), 'after': ()},
+    'visualize': {'requires': (), 'after': ('forecast', 'taxonomy')}
+}
+
+def run_fetch(context, args):
+    from fetch_data import fetch_validated_data
+    return fetch_validated_data(
+        countries=args.countries, indicators=args.indicators,
+        use_cache=not args.no_cache, backend=args.backend, as_of=args.as_of, validate=args.validate
+    )
+
+def run_preprocess(context, args):
+    from preprocess_data import preprocess_panel
+    return preprocess_panel(*context['fetch'], lean=args.lean)
+
+def run_forecast(context, args):
+    from forecast_data import forecast_data
+    from model_registry import DEFAULT_MODEL
+    countries, indicators, _ = context['fetch']
+    return forecast_data(
+        context['preprocess'], countries, indicators, workers=args.workers,
+        incremental=args.incremental, run_id=args.run_id, backend=args.backend,
+        model=args.model or DEFAULT_MODEL, criterion=args.criterion, warm_start=args.warm_start,
+        engine=args.engine, resume=args.resume is not None
+    )
+
+def run_taxonomy(context, args):
+    from map_taxonomy import map_taxonomy
+    countries, indicators, timeseries = context['fetch']
+    return map_taxonomy(countries, indicators, backend=args.backend, timeseries=timeseries)
+
+def run_visualize(context, args):
+    import matplotlib
+    matplotlib.use('Agg')
+    from forecast_sink import default_run_id
+    from visualize_forecasts import render_forecasts
+    from visualize_taxonomy import visualize_taxonomy
+
+    visualize_taxonomy()
+    # Chart the series forecast in this run; a visualize-only run has none to chart
+    if 'forecast' in context and 'fetch' in context:
+        indicator_names = context['fetch'][1].set_index('indicator_id')['indicator_name'].to_dict()
+        series = sorted({(row['country_code'], indicator_names[row['indicator_id']]) for row in context['forecast']})
+        render_forecasts(series, run_id=args.run_id or default_run_id(), workers=args.workers)
+
+STAGE_FUNCTIONS = {
+    'fetch': run_fetch,
+    'preprocess': run_preprocess,
+    'forecast': run_forecast,
+    'taxonomy': run_taxonomy,
+    'visualize': run_visualize
+}
+
+def plan(targets):
+    """Order the target stages and everything they require, dependencies first."""
+    selected = set()
+
+    def add(stage):
+        if stage not in selected:
+            selected.add(stage)
+            for dependency in STAGES[stage]['requires']:
+                add(dependency)
+
+    for target in targets:
+        add(target)
+
+    order, done = [], set()
+
+    def visit(stage):
+        if stage in done:
+            return
+        done.add(stage)
+        spec = STAGES[stage]
+        for dependency in spec['requires'] + tuple(s for s in spec['after'] if s in selected):
+            visit(dependency)
+        order.append(stage)
+
+    # STAGES is listed in pipeline order, which keeps independent stages stable
+    for stage in STAGES:
+        if stage in selected:
+            visit(stage)
+    return order
+
+def run_pipeline(targets, args):
+    """Run the planned stages in one process, handing each stage's output to the next in memory."""
+    from telemetry import flush, span
+
+    context = {}
+    # One root span, so every stage's ingestion_log rows share a run_id
+    with span("pipeline") as root:
+        for stage in plan(targets):
+            start = time.perf_counter()
+            context[stage] = STAGE_FUNCTIONS[stage](context, args)
+            print(f"Stage {stage} finished in {time.perf_counter() - start:.2f}s")
+        root.set(stages=",".join(context))
+    flush()
+    return context
+
+def parse_list(value, cast=str):
+    return [cast(v) for v in value.split(',')] if value else None
+
+if __name__ == "__main__":
+    # Only the CLI needs the engine names; forecast_engine itself does not load statsmodels
+    from forecast_engine import ENGINES
+
+    parser = argparse.ArgumentParser(description="Run pipeline stages in a single process")
+    parser.add_argument("command", choices=list(STAGES) + ["all"], help="stage to run, with the stages it depends on")
+    parser.add_argument("--backend", choices=["rest", "postgres"], default=None, help="I/O backend (default: PIPELINE_BACKEND or rest)")
+    parser.add_argument("--no-cache", action="store_true", help="fetch over REST instead of the local canonical cache")
+    parser.add_argument("--countries", default=None, help="comma-separated country codes to fetch")
+    parser.add_argument("--indicators", default=None, help="comma-separated indicator ids to fetch")
+    parser.add_argument("--validate", action="store_true", help="validate the data as it is fetched and log to validation_log")
+    parser.add_argument("--as-of", default=None, help="read the data as known on this date, or 'latest' (default: every vintage)")
+    parser.add_argument("--lean", action="store_true", help="preprocess with categoricals and a single sort to cut peak memory")
+    parser.add_argument("--workers", type=int, default=None, help="number of fitting processes")
+    parser.add_argument("--model", default=None, help="registry model name, or 'auto' to select per series (default: ARIMA(1,1,1))")
+    parser.add_argument("--criterion", choices=["cv", "aic"], default="cv", help="selection criterion for --model auto ('aic' picks among ARIMA orders only)")
+    parser.add_argument("--engine", choices=ENGINES, default="statsmodels", help="'batched' fits every ARIMA(1,1,1) together in NumPy")
+    parser.add_argument("--incremental", action="store_true", help="only refit series whose input changed since the last run")
+    parser.add_argument("--warm-start", action="store_true", help="extend or warm-start each series from its stored fit")
+    parser.add_argument("--run-id", default=None, help="run identifier for forecast_results (default: today's date)")
+    parser.add_argument("--resume", metavar="RUN_ID", default=None, help="carry on an interrupted forecast run from its last checkpoint")
+    args = parser.parse_args()
+    if args.resume:
+        args.run_id = args.resume
+    args.countries = parse_list(args.countries)
+    args.indicators = parse_list(args.indicators, int)
+
+    targets = list(STAGES) if args.command == "all" else [args.command]
+    run_pipeline(targets, args)
\ No newline at end of file
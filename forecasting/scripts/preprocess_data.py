@@ -1,89 +1,223 @@
 import pandas as pd
 import numpy as np
-from supabase import create_client, Client
-from datetime import datetime
-from dotenv import load_dotenv
-import os
-
-# Load environment variables
-load_dotenv()
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-supabase = create_client(supabase_url, supabase_key)
-
-def preprocess_data(countries, indicators, timeseries):
-    try:
-        start_time = datetime.now()
-        
+from memory_profile import profile_step
+from panel import FREQUENCIES, Panel
+from telemetry import span
+from units import standardize_units, unit_multipliers
+
+def standardize_timeseries(timeseries, indicators, lean=False, float_dtype='float64'):
+    """Merge, gap-fill and unit-standardize the long timeseries rows (value_standardized column)."""
+    if lean:
+        return standardize_timeseries_lean(timeseries, indicators, float_dtype)
+    with span("preprocess_data.merge", detail=True) as step, profile_step("preprocess_data.merge"):
         # Merge timeseries and indicators dataframes
         timeseries_merged = pd.merge(timeseries, indicators, on='indicator_id')
-        
+
         # Convert date_value to datetime
         timeseries_merged['date_value'] = pd.to_datetime(timeseries_merged['date_value'])
+        step.set(rows_in=len(timeseries), rows_out=len(timeseries_merged))
 
+    with span("preprocess_data.fill", detail=True) as step, profile_step("preprocess_data.fill"):
         # Handle missing values (forward fill, then backward fill)
         timeseries_merged = timeseries_merged.sort_values(['country_code', 'indicator_name', 'date_value'])
         timeseries_merged['value'] = timeseries_merged.groupby(['country_code', 'indicator_name'])['value'].ffill().bfill()
+        step.set(rows_out=len(timeseries_merged))
 
-        # Standardize units
-        unit_map = {
-            'USD Billion': 1e9,
-            'Percent': 1,
-            'USD Million': 1e6
-        }
-        timeseries_merged['value_standardized'] = timeseries_merged.apply(
-            lambda row: row['value'] * unit_map.get(row['unit'], 1), axis=1
+    with span("preprocess_data.standardize_units", detail=True) as step, profile_step("preprocess_data.standardize_units"):
+        # Standardize units (vectorized: unit categories mapped to a multiplier array)
+        timeseries_merged['value_standardized'], unknown_units = standardize_units(
+            timeseries_merged['value'], timeseries_merged['unit']
         )
+        if unknown_units:
+            print(f"Warning: no unit multiplier for {unknown_units}; values left unscaled")
+        step.set(rows_out=len(timeseries_merged), unknown_units=sum(unknown_units.values()))
+    return timeseries_merged
 
-        # Pivot data for forecasting
-        pivoted_data = timeseries_merged.pivot_table(
-            index='date_value',
-            columns=['country_code', 'indicator_name'],
-            values='value_standardized',
-            aggfunc='mean'
-        )
-        
-        # 🎯 FIX: Create a complete MultiIndex and reindex the pivoted data
-        all_columns = pd.MultiIndex.from_product(
-            [countries['country_code'].unique(), indicators['indicator_name'].unique()],
-            names=['country_code', 'indicator_name']
-        )
-        pivoted_data = pivoted_data.reindex(columns=all_columns)
-
-        # Flatten the MultiIndex columns
-        pivoted_data.columns = [f'{col[0]}_{col[1]}' for col in pivoted_data.columns]
-        pivoted_data = pivoted_data.reset_index()
-
-        # Log preprocessing run
-        end_time = datetime.now()
-        execution_time_ms = int((end_time - start_time).total_seconds() * 1000)
-        log_entry = {
-            "endpoint": "preprocess_data",
-            "status": "success",
-            "records_processed": len(timeseries_merged),
-            "error_message": None,
-            "started_at": start_time.isoformat(),
-            "completed_at": end_time.isoformat(),
-            "execution_time_ms": execution_time_ms
-        }
-        supabase.table("ingestion_log").insert(log_entry).execute()
+def as_datetime64(column):
+    # Skip the parse (and its copy) when the column already holds datetimes
+    if pd.api.types.is_datetime64_dtype(column.dtype):
+        return column.to_numpy('datetime64[ns]')
+    return pd.to_datetime(column).to_numpy('datetime64[ns]')
+
+def fill_gaps(values, group_starts):
+    """Forward fill within groups, then backward fill the whole array, in index arithmetic.
+
+    Same result as the groupby(...).ffill().bfill() of the default path on rows
+    sorted by group, without materializing a groupby.
+    """
+    n = len(values)
+    positions = np.arange(n)
+    valid = ~np.isnan(values)
+    # Index of the last valid value in the group (or the group's first row)
+    last = np.maximum.accumulate(np.where(valid | group_starts, positions, 0))
+    values = values[last]
+    valid = ~np.isnan(values)
+    # Index of the next valid value, across groups like the plain bfill
+    following = np.minimum.accumulate(np.where(valid, positions, n)[::-1])[::-1]
+    return np.append(values, np.nan)[following]
+
+def standardize_timeseries_lean(timeseries, indicators, float_dtype='float64'):
+    """standardize_timeseries with less memory: one sort-and-take instead of merge, sort and groupby copies.
+
+    Countries, indicator names and units come back as categoricals and the
+    standardized values as float_dtype; the raw value column is not kept.
+    """
+    with span("preprocess_data.merge", detail=True) as step, profile_step("preprocess_data.merge"):
+        # Indicator lookup by position instead of a merge; rows with unknown indicators drop out as before
+        indicators = indicators.drop_duplicates('indicator_id')
+        indicator_position = pd.Index(indicators['indicator_id'].astype('int64')).get_indexer(timeseries['indicator_id'].astype('int64'))
+        names = pd.Categorical(indicators['indicator_name'])
+        countries = pd.Categorical(timeseries['country_code'])
+        dates = as_datetime64(timeseries['date_value'])
+        step.set(rows_in=len(timeseries), rows_out=int((indicator_position >= 0).sum()))
+
+    with span("preprocess_data.fill", detail=True) as step, profile_step("preprocess_data.fill"):
+        # Category codes follow sorted order, so this matches sort_values(['country_code', 'indicator_name', 'date_value']);
+        # missing countries (code -1) go last as they do there
+        keep = np.flatnonzero(indicator_position >= 0)
+        name_codes = names.codes[indicator_position[keep]]
+        country_codes = countries.codes[keep].astype('int64')
+        country_codes[country_codes < 0] = len(countries.categories)
+        order = keep[np.lexsort((dates[keep], name_codes, country_codes))]
+        del keep, name_codes, country_codes
+
+        country_codes = countries.codes[order]
+        name_codes = names.codes[indicator_position[order]]
+        group_starts = np.r_[True, (country_codes[1:] != country_codes[:-1]) | (name_codes[1:] != name_codes[:-1])] \
+            if len(order) else np.array([], dtype=bool)
+        values = fill_gaps(pd.to_numeric(timeseries['value']).to_numpy(dtype='float64')[order], group_starts)
+        step.set(rows_out=len(order))
+
+    with span("preprocess_data.standardize_units", detail=True) as step, profile_step("preprocess_data.standardize_units"):
+        multipliers, units = unit_multipliers(timeseries['unit'].to_numpy()[order])
+        unknown_mask = np.isnan(multipliers)
+        unknown_units = {}
+        if unknown_mask.any():
+            unknown_units = pd.Series(units[unknown_mask]).astype(object).fillna('<missing>').value_counts().to_dict()
+            print(f"Warning: no unit multiplier for {unknown_units}; values left unscaled")
+            multipliers[unknown_mask] = 1.0
+        np.multiply(values, multipliers, out=values)
+        del multipliers
+        timeseries_merged = pd.DataFrame({
+            'country_code': pd.Categorical.from_codes(country_codes, countries.categories),
+            'indicator_id': timeseries['indicator_id'].to_numpy()[order].astype('int64'),
+            'indicator_name': pd.Categorical.from_codes(name_codes, names.categories),
+            'date_value': dates[order],
+            'unit': units,
+            'value_standardized': values.astype(float_dtype, copy=False)
+        }, copy=False)
+        step.set(rows_out=len(timeseries_merged), unknown_units=sum(unknown_units.values()))
+    return timeseries_merged
+
+def pivot_lean(timeseries_merged, countries, indicators, float_dtype='float64'):
+    """The wide frame of preprocess_data, written straight into one preallocated array.
+
+    Duplicate (series, date) rows are averaged as pivot_table did.
+    """
+    country_axis = pd.Index(countries['country_code'].unique())
+    name_axis = pd.Index(indicators['indicator_name'].unique())
+    column = country_axis.get_indexer(timeseries_merged['country_code']).astype('int64')
+    name_position = name_axis.get_indexer(timeseries_merged['indicator_name'])
+    values = timeseries_merged['value_standardized'].to_numpy(dtype='float64')
+    dates = timeseries_merged['date_value'].to_numpy('datetime64[ns]')
+    # pivot_table ignores NaN values; its rows are the dates with any value, even
+    # one in a column the reindex then drops
+    observed = ~np.isnan(values)
+    date_axis = np.unique(dates[observed])
+    keep = observed & (column >= 0) & (name_position >= 0)
+    column = column[keep] * len(name_axis) + name_position[keep]
+    cell = column * len(date_axis) + np.searchsorted(date_axis, dates[keep])
+    values = values[keep]
+    del observed, keep, name_position, column
+
+    # Average duplicate (column, date) cells
+    cell, position = np.unique(cell, return_inverse=True)
+    values = np.bincount(position, weights=values, minlength=len(cell)) / np.bincount(position, minlength=len(cell))
+    del position
+
+    # One row per column, which is how pandas lays out a float block, so the frame wraps it without a copy
+    block = np.full((len(country_axis) * len(name_axis), len(date_axis)), np.nan, dtype=float_dtype)
+    block.reshape(-1)[cell] = values
+    labels = [f'{c}_{name}' for c in country_axis for name in name_axis]
+    pivoted_data = pd.DataFrame(block.T, columns=labels, copy=False)
+    pivoted_data.insert(0, 'date_value', date_axis)
+    return pivoted_data
+
+def pivot_wide(timeseries_merged, countries, indicators):
+    # Pivot data for forecasting
+    pivoted_data = timeseries_merged.pivot_table(
+        index='date_value',
+        columns=['country_code', 'indicator_name'],
+        values='value_standardized',
+        aggfunc='mean'
+    )
+
+    # 🎯 FIX: Create a complete MultiIndex and reindex the pivoted data
+    all_columns = pd.MultiIndex.from_product(
+        [countries['country_code'].unique(), indicators['indicator_name'].unique()],
+        names=['country_code', 'indicator_name']
+    )
+    pivoted_data = pivoted_data.reindex(columns=all_columns)
+
+    # Flatten the MultiIndex columns
+    pivoted_data.columns = [f'{col[0]}_{col[1]}' for col in pivoted_data.columns]
+    pivoted_data = pivoted_data.reset_index()
+    return pivoted_data
+
+def preprocess_data(countries, indicators, timeseries, lean=False, float_dtype='float64'):
+    """Wide frame with a date_value column and one 'COUNTRY_Indicator name' column per series.
+
+    lean=True builds the same frame with categoricals, a single sort and no
+    pivot_table intermediates; float_dtype='float32' halves the value columns.
+    """
+    try:
+        with span("preprocess_data") as stage, profile_step("preprocess_data"):
+            stage.set(rows_in=len(timeseries))
+            timeseries_merged = standardize_timeseries(timeseries, indicators, lean=lean, float_dtype=float_dtype)
+
+            with span("preprocess_data.pivot", detail=True) as step, profile_step("preprocess_data.pivot"):
+                if lean:
+                    pivoted_data = pivot_lean(timeseries_merged, countries, indicators, float_dtype)
+                else:
+                    pivoted_data = pivot_wide(timeseries_merged, countries, indicators)
+                step.set(rows_in=len(timeseries_merged), rows_out=len(pivoted_data), columns=pivoted_data.shape[1])
+
+            # Logged to ingestion_log by the stage span
+            stage.set(rows_out=len(timeseries_merged))
 
         print(f"Preprocessed {len(pivoted_data)} records")
         return pivoted_data
     except Exception as e:
         print(f"Error preprocessing data: {str(e)}")
-        end_time = datetime.now()
-        execution_time_ms = int((end_time - start_time).total_seconds() * 1000)
-        log_entry = {
-            "endpoint": "preprocess_data",
-            "status": "failed",
-            "records_processed": 0,
-            "error_message": str(e),
-            "started_at": start_time.isoformat(),
-            "completed_at": end_time.isoformat(),
-            "execution_time_ms": execution_time_ms
-        }
-        supabase.table("ingestion_log").insert(log_entry).execute()
+        raise
+
+def preprocess_panel(countries, indicators, timeseries, lean=False):
+    """Same preprocessing as preprocess_data, returned as a compact Panel instead of a wide frame.
+
+    The panel's series are also resampled onto their native frequency grids
+    here (Panel.regular()), so the forecast stage gets ready-to-fit arrays.
+    """
+    try:
+        with span("preprocess_data") as stage, profile_step("preprocess_data"):
+            stage.set(rows_in=len(timeseries))
+            timeseries_merged = standardize_timeseries(timeseries, indicators, lean=lean)
+
+            with span("preprocess_data.panel", detail=True) as step, profile_step("preprocess_data.panel"):
+                panel = Panel.from_long(timeseries_merged, countries, indicators, value_column='value_standardized')
+                step.set(rows_in=len(timeseries_merged), rows_out=len(panel.values), series=len(panel), nbytes=panel.nbytes)
+
+            with span("preprocess_data.resample", detail=True) as step, profile_step("preprocess_data.resample"):
+                groups = panel.regular()
+                step.set(rows_in=len(panel.values), rows_out=sum(len(group.values) for group in groups.values()),
+                         **{f"series_{frequency}": len(group) for frequency, group in groups.items()})
+
+            stage.set(rows_out=len(timeseries_merged))
+
+        by_frequency = ", ".join(f"{len(group)} {FREQUENCIES[frequency]['name']}" for frequency, group in groups.items())
+        print(f"Preprocessed {len(panel.values)} observations in {len(panel)} series ({by_frequency or 'none'})")
+        return panel
+    except Exception as e:
+        print(f"Error preprocessing data: {str(e)}")
         raise
         
 if __name__ == "__main__":
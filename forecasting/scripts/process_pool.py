@@ -0,0 +1,11 @@
+import os
+
+def default_workers(workers, n_jobs):
+    """Processes for n_jobs: workers if given, else FORECAST_WORKERS or every CPU, never more than there are jobs."""
+    if workers is None:
+        workers = int(os.getenv("FORECAST_WORKERS", os.cpu_count() or 1))
+    return max(1, min(workers, n_jobs))
+
+def default_chunksize(n_jobs, workers):
+    # A few chunks per worker keeps the pool busy without paying IPC per job
+    return max(1, n_jobs // (workers * 4))
\ No newline at end of file
@@ -0,0 +1,119 @@
+import json
+import os
+import sqlite3
+from collections import deque
+from datetime import datetime
+from forecast_state import DEFAULT_STATE_DIR
+
+# Series states: fitted once checkpointed, written once every row reached forecast_results
+FITTED, WRITTEN, FAILED = 'fitted', 'written', 'failed'
+
+class RunLedger:
+    """Durable checkpoint of one forecast run: which series are done, with their result rows.
+
+    One SQLite file per run_id under <state_dir>/runs. A series is recorded
+    as fitted, rows included, as soon as its outcome arrives, and marked
+    written once the sink has upserted all of its rows. A resumed run refits
+    nothing already recorded and only re-sends the rows of fitted series,
+    which may not have reached forecast_results; failed series are retried.
+    Opening a run without resume starts it over.
+    """
+
+    def __init__(self, run_id, state_dir=None, spec=None, resume=False):
+        run_dir = os.path.join(state_dir or DEFAULT_STATE_DIR, "runs")
+        os.makedirs(run_dir, exist_ok=True)
+        self.run_id = run_id
+        self.path = os.path.join(run_dir, f"{run_id}.sqlite")
+        self.db = sqlite3.connect(self.path)
+        # WAL with NORMAL sync keeps a commit per series cheap and survives a crashed process
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS run (key TEXT PRIMARY KEY, value TEXT)")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS series (
+            series_key TEXT PRIMARY KEY, status TEXT NOT NULL, attempt INTEGER NOT NULL, n_rows INTEGER NOT NULL,
+            results TEXT, fingerprint TEXT, model_state TEXT, error TEXT, updated_at TEXT NOT NULL)""")
+
+        meta = dict(self.db.execute("SELECT key, value FROM run"))
+        spec_json = json.dumps(spec or {}, sort_keys=True)
+        if resume and meta:
+            if meta['spec'] != spec_json:
+                self.db.close()
+                raise ValueError(f"Run {run_id} was started with {meta['spec']}, not {spec_json}; start it over without resume")
+            self.attempt = int(meta['attempt']) + 1
+        else:
+            self.db.execute("DELETE FROM series")
+            self.attempt = 1
+        self.db.executemany("INSERT OR REPLACE INTO run VALUES (?, ?)",
+                            [('spec', spec_json), ('attempt', str(self.attempt)), ('finished_at', '')])
+        self.db.commit()
+        # (series_key, rows) handed to the sink and not yet confirmed written, in sink order
+        self.pending = deque()
+
+    def done(self):
+        """Series already fitted in this run, by key."""
+        return {key for key, in self.db.execute("SELECT series_key FROM series WHERE status != ?", (FAILED,))}
+
+    def unwritten(self):
+        """(series_key, rows) of fitted series whose rows may not all be in forecast_results."""
+        return [(key, json.loads(results)) for key, results in
+                self.db.execute("SELECT series_key, results FROM series WHERE status = ? ORDER BY rowid", (FITTED,))]
+
+    def results(self, status=WRITTEN):
+        rows = []
+        for results, in self.db.execute("SELECT results FROM series WHERE status = ? ORDER BY rowid", (status,)):
+            rows.extend(json.loads(results))
+        return rows
+
+    def states(self):
+        """Fingerprint and model state of every done series, by key."""
+        return {key: (fingerprint, json.loads(model_state) if model_state else None) for key, fingerprint, model_state in
+                self.db.execute("SELECT series_key, fingerprint, model_state FROM series WHERE status != ?", (FAILED,))}
+
+    def fitted(self, key, results, fingerprint=None, model_state=None):
+        """Checkpoint a fitted series before its rows go to the sink."""
+        self.db.execute("INSERT OR REPLACE INTO series VALUES (?, ?, ?, ?, ?, ?, ?, NULL, ?)",
+                        (key, FITTED, self.attempt, len(results), json.dumps(results), fingerprint,
+                         json.dumps(model_state) if model_state is not None else None, datetime.now().isoformat()))
+        self.db.commit()
+        self.pending.append((key, len(results)))
+
+    def failed(self, key, error):
+        self.db.execute("INSERT OR REPLACE INTO series VALUES (?, ?, ?, 0, NULL, NULL, NULL, ?, ?)",
+                        (key, FAILED, self.attempt, error, datetime.now().isoformat()))
+        self.db.commit()
+
+    def requeue(self, key, n_rows):
+        # A resumed series whose rows are being sent again
+        self.pending.append((key, n_rows))
+
+    def written(self, batch):
+        """Sink callback: mark series whose rows are now all written, in the order they were added."""
+        remaining = len(batch)
+        keys = []
+        while self.pending and self.pending[0][1] <= remaining:
+            key, n_rows = self.pending.popleft()
+            remaining -= n_rows
+            keys.append(key)
+        if self.pending and remaining:
+            key, n_rows = self.pending[0]
+            self.pending[0] = (key, n_rows - remaining)
+        if keys:
+            self.db.executemany("UPDATE series SET status = ? WHERE series_key = ?", [(WRITTEN, key) for key in keys])
+            self.db.commit()
+
+    def counts(self):
+        return dict(self.db.execute("SELECT status, COUNT(*) FROM series GROUP BY status"))
+
+    def finish(self):
+        self.db.execute("INSERT OR REPLACE INTO run VALUES ('finished_at', ?)", (datetime.now().isoformat(),))
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
\ No newline at end of file
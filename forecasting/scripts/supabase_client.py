@@ -0,0 +1,31 @@
+import os
+
+_client = None
+
+def get_client():
+    """Shared Supabase client, created on first use.
+
+    Every pipeline module goes through here instead of building its own client at
+    import time, so one process holds one client (and its pooled HTTP connections)
+    and scripts that never touch Supabase never pay for it.
+    """
+    global _client
+    if _client is None:
+        from dotenv import load_dotenv
+        from supabase import create_client
+        load_dotenv()
+        _client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_ROLE_KEY"))
+    return _client
+
+def set_client(client):
+    """Use an existing client (or a stand-in with the same table() API) for this process."""
+    global _client
+    _client = client
+
+def is_configured():
+    """Whether get_client() has a client to return: one was set, or SUPABASE_URL is available."""
+    if _client is not None:
+        return True
+    from dotenv import load_dotenv
+    load_dotenv()
+    return bool(os.getenv("SUPABASE_URL"))
\ No newline at end of file
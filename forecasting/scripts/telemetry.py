@@ -0,0 +1,224 @@
+import atexit
+import contextvars
+import json
+import os
+import queue
+import resource
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+# TELEMETRY_LEVEL: 'off' records nothing, 'stage' (default) records one span per
+# pipeline function, i.e. the ingestion_log rows those functions always wrote,
+# and 'detail' adds their nested step and per-series spans.
+# TELEMETRY_SINK: 'ingestion_log' (default) or a path to a JSON-lines file.
+LEVELS = {'off': 0, 'stage': 1, 'detail': 2}
+# Columns migration 010 adds to ingestion_log for spans
+SPAN_COLUMNS = ('span_id', 'parent_span_id', 'metrics')
+FLUSH_BATCH_SIZE = 200
+FLUSH_INTERVAL_S = 2.0
+
+_current = contextvars.ContextVar('telemetry_span', default=None)
+_writer = None
+_writer_lock = threading.Lock()
+
+def level():
+    return LEVELS.get(os.getenv("TELEMETRY_LEVEL", "stage"), 1)
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux; it is the process high-water mark
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+class NullSpan:
+    """Stand-in returned when a span is not recorded; every call is a no-op."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **metrics):
+        pass
+
+NULL_SPAN = NullSpan()
+
+class Span:
+    """One timed step: wall and CPU time, rows in/out, peak RSS and free-form metrics."""
+
+    def __init__(self, name):
+        self.name = name
+        self.span_id = str(uuid.uuid4())
+        self.parent = None
+        self.metrics = {}
+        self.rows_in = None
+        self.rows_out = None
+
+    def set(self, rows_in=None, rows_out=None, **metrics):
+        if rows_in is not None:
+            self.rows_in = rows_in
+        if rows_out is not None:
+            self.rows_out = rows_out
+        self.metrics.update(metrics)
+
+    @property
+    def trace_id(self):
+        # Every span in a tree shares its root's id as the ingestion_log run_id
+        return self.parent.trace_id if self.parent is not None else self.span_id
+
+    def __enter__(self):
+        self.parent = _current.get()
+        self.token = _current.set(self)
+        self.started_at = datetime.now(timezone.utc)
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        _current.reset(self.token)
+        emit(self, wall, cpu, error=None if exc is None else str(exc))
+        return False
+
+def span(name, detail=False):
+    """Context manager timing `name` as a child of the current span.
+
+    Stage spans are recorded unless telemetry is off; detail spans only at
+    TELEMETRY_LEVEL=detail. Unrecorded spans cost one comparison.
+    """
+    if level() < (2 if detail else 1):
+        return NULL_SPAN
+    return Span(name)
+
+def record(name, wall_s, cpu_s=None, rows_in=None, rows_out=None, error=None, **metrics):
+    """Record a detail span measured elsewhere (e.g. inside a worker process) under the current span."""
+    if level() < 2:
+        return
+    item = Span(name)
+    item.parent = _current.get()
+    item.started_at = datetime.now(timezone.utc) - timedelta(seconds=wall_s)
+    item.set(rows_in=rows_in, rows_out=rows_out, **metrics)
+    emit(item, wall_s, cpu_s, error=error, measured_here=False)
+
+def emit(item, wall, cpu, error=None, measured_here=True):
+    metrics = {'cpu_ms': None if cpu is None else round(cpu * 1000, 3), 'wall_ms': round(wall * 1000, 3)}
+    if item.rows_in is not None:
+        metrics['rows_in'] = int(item.rows_in)
+    if item.rows_out is not None:
+        metrics['rows_out'] = int(item.rows_out)
+    if measured_here:
+        # Spans recorded on behalf of a worker carry the worker's own figure in metrics, if any
+        metrics['peak_rss_mb'] = round(peak_rss_mb(), 1)
+    metrics.update(item.metrics)
+    get_writer().put({
+        "run_id": item.trace_id,
+        "span_id": item.span_id,
+        "parent_span_id": item.parent.span_id if item.parent is not None else None,
+        "endpoint": item.name,
+        "status": "failed" if error else "success",
+        "records_processed": int(item.rows_out or 0),
+        "error_message": error,
+        "started_at": item.started_at.isoformat(),
+        "completed_at": datetime.now(timezone.utc).isoformat(),
+        "execution_time_ms": int(wall * 1000),
+        "metrics": metrics
+    })
+
+class LogTableSink:
+    """Insert spans into ingestion_log through the shared client.
+
+    Offline runs (tests, benchmarks) have no client configured, and their spans
+    are dropped without trying to connect. If ingestion_log lacks the span
+    columns of migration 010, that is reported once and spans are written with
+    the original columns only, so every stage still logs its success or failure.
+    """
+
+    def __init__(self):
+        self.missing_columns = False
+
+    def write(self, rows):
+        import supabase_client
+        if not supabase_client.is_configured():
+            return
+        if self.missing_columns:
+            rows = [{k: v for k, v in row.items() if k not in SPAN_COLUMNS} for row in rows]
+        try:
+            supabase_client.get_client().table("ingestion_log").insert(rows).execute()
+        except Exception as e:
+            if self.missing_columns or not any(column in str(e) for column in SPAN_COLUMNS):
+                raise
+            self.missing_columns = True
+            print(f"Telemetry: ingestion_log has no span columns (apply migration 010); logging without span links or metrics. {str(e)}")
+            self.write(rows)
+
+class FileSink:
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, rows):
+        with open(self.path, "a") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+
+class BufferedWriter:
+    """Queue spans and write them in batches from a daemon thread, off the pipeline's critical path."""
+
+    def __init__(self, sink, batch_size=FLUSH_BATCH_SIZE, interval=FLUSH_INTERVAL_S):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.interval = interval
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="telemetry-writer", daemon=True)
+        self.thread.start()
+
+    def put(self, row):
+        self.queue.put(row)
+
+    def run(self):
+        batch = []
+        while True:
+            try:
+                item = self.queue.get(timeout=self.interval)
+            except queue.Empty:
+                item = None
+            if isinstance(item, threading.Event):
+                self.write(batch)
+                batch = []
+                item.set()
+                continue
+            if item is not None:
+                batch.append(item)
+            if batch and (item is None or len(batch) >= self.batch_size):
+                self.write(batch)
+                batch = []
+
+    def write(self, batch):
+        if not batch:
+            return
+        try:
+            self.sink.write(batch)
+        except Exception as e:
+            # Telemetry must never take the pipeline down with it
+            print(f"Telemetry write failed ({len(batch)} spans dropped): {str(e)}")
+
+    def flush(self, timeout=30):
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait(timeout)
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                target = os.getenv("TELEMETRY_SINK", "ingestion_log")
+                _writer = BufferedWriter(LogTableSink() if target == "ingestion_log" else FileSink(target))
+                atexit.register(_writer.flush)
+    return _writer
+
+def flush():
+    """Block until every queued span has been handed to the sink."""
+    if _writer is not None:
+        _writer.flush()
\ No newline at end of file
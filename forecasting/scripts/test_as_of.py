@@ -0,0 +1,65 @@
+import tempfile
+import pandas as pd
+from as_of import AsOfIndex
+from canonical_cache import CanonicalCache
+
+def make_vintages():
+    # Two points of MEX/1 revised once, one undated point, and USA/1 published late
+    return pd.DataFrame({
+        'id': [1, 2, 3, 4, 5, 6],
+        'country_code': ['MEX', 'MEX', 'MEX', 'MEX', 'MEX', 'USA'],
+        'indicator_id': [1, 1, 1, 1, 1, 1],
+        'date_value': pd.to_datetime(['2020-01-01', '2020-01-01', '2020-02-01', '2020-02-01', '2019-12-01', '2020-01-01']),
+        'value': [1.0, 1.5, 2.0, 2.5, 0.5, 9.0],
+        'unit': 'Percent',
+        'vintage_date': pd.to_datetime(['2020-02-15', '2020-05-15', '2020-03-15', '2020-06-15', None, '2020-04-15'])
+    })
+
+def values_by_key(frame):
+    return {(r.country_code, r.date_value.strftime('%Y-%m')): r.value for r in frame.itertuples()}
+
+def test_as_of_selection():
+    try:
+        index = AsOfIndex(make_vintages().sample(frac=1, random_state=0))
+        assert values_by_key(index.select('2020-01-01')) == {('MEX', '2019-12'): 0.5}, "Undated rows should always be visible"
+        assert values_by_key(index.select('2020-04-30')) == {
+            ('MEX', '2019-12'): 0.5, ('MEX', '2020-01'): 1.0, ('MEX', '2020-02'): 2.0, ('USA', '2020-01'): 9.0
+        }, "Wrong vintages as of 2020-04-30"
+        assert values_by_key(index.select('latest')) == {
+            ('MEX', '2019-12'): 0.5, ('MEX', '2020-01'): 1.5, ('MEX', '2020-02'): 2.5, ('USA', '2020-01'): 9.0
+        }, "Wrong latest vintages"
+        assert values_by_key(index.changes('2020-04-30', '2020-05-31')) == {('MEX', '2020-01'): 1.5}, "Wrong revisions"
+        print("As-of selection test passed")
+    except Exception as e:
+        print(f"As-of selection test failed: {str(e)}")
+        raise
+
+def test_cache_as_of():
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = CanonicalCache(cache_dir)
+            cache.write_table('canonical_timeseries', make_vintages())
+            columns = ['country_code', 'indicator_id', 'date_value', 'value']
+            rows = cache.load_timeseries(columns, countries=['MEX'], as_of='2020-05-31')
+            assert list(rows.columns) == columns, f"Unexpected columns {list(rows.columns)}"
+            assert values_by_key(rows) == {('MEX', '2019-12'): 0.5, ('MEX', '2020-01'): 1.5, ('MEX', '2020-02'): 2.0}, \
+                "Cache as-of read returned the wrong vintages"
+            assert len(cache.load_timeseries(columns)) == 6, "Reads without as_of should keep every vintage"
+
+            # The Arrow selection agrees with AsOfIndex, including a latest vintage whose value is missing
+            vintages = make_vintages()
+            vintages.loc[3, 'value'] = None
+            cache.write_table('canonical_timeseries', vintages)
+            index = AsOfIndex(vintages)
+            for as_of in ['2020-01-01', '2020-03-15', '2020-05-31', 'latest']:
+                arrow_rows = cache.load_timeseries(columns, as_of=as_of).sort_values(columns[:3], ignore_index=True)
+                expected = index.select(as_of, columns).sort_values(columns[:3], ignore_index=True)
+                pd.testing.assert_frame_equal(arrow_rows, expected, check_dtype=False)
+        print("Cache as-of test passed")
+    except Exception as e:
+        print(f"Cache as-of test failed: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    test_as_of_selection()
+    test_cache_as_of()
\ No newline at end of file
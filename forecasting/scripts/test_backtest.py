@@ -0,0 +1,41 @@
+import numpy as np
+from backtest import backtest_series, run_backtest, summarize, synthetic_series
+from forecast_engine import forecast_horizons
+from model_registry import fit_model
+
+def test_rolled_forward_folds_match_fresh_filtering():
+    try:
+        name, series = next(iter(synthetic_series(1, n_points=60).items()))
+        folds = backtest_series(name, series, horizons=['1M', '3M'], initial=48, refit_every=6)
+        cutoffs = sorted({f['cutoff'] for f in folds})
+        assert len(cutoffs) == 12, f"Expected 12 cutoffs, found {len(cutoffs)}"
+        assert [f['fit_kind'] for f in folds if f['forecast_horizon'] == '1M'] == (['fit'] + ['update'] * 5) * 2, "Unexpected refit schedule"
+
+        # A rolled-forward fold must equal re-filtering the longer history with the earlier parameters
+        base = fit_model('ARIMA(1,1,1)', series.iloc[:48])
+        refiltered = base.apply(series.iloc[:50])
+        expected = forecast_horizons(refiltered, ['1M'])[0]['forecast_value']
+        fold = next(f for f in folds if f['cutoff'] == series.index[49] and f['forecast_horizon'] == '1M')
+        assert np.isclose(fold['forecast_value'], expected), "Extended fit drifted from the re-filtered forecast"
+        print("Rolled-forward fold test passed")
+    except Exception as e:
+        print(f"Rolled-forward fold test failed: {str(e)}")
+        raise
+
+def test_summary_scores_every_model_and_horizon():
+    try:
+        panel = synthetic_series(2, n_points=54)
+        folds = run_backtest(panel, models=['ARIMA(1,1,1)', 'DRIFT'], horizons=['1M', '6M'], initial=40)
+        accuracy, timing = summarize(folds)
+        assert set(accuracy.index) == {(m, h) for m in ['ARIMA(1,1,1)', 'DRIFT'] for h in ['1M', '6M']}, "Missing model/horizon rows"
+        assert accuracy['coverage'].between(0, 1).all(), "Coverage out of range"
+        assert (accuracy['mae'] > 0).all(), "MAE should be positive on noisy data"
+        assert {'mean_fit_s', 'mean_predict_s', 'total_s'} <= set(timing.columns), "Missing timing columns"
+        print("Backtest summary test passed")
+    except Exception as e:
+        print(f"Backtest summary test failed: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    test_rolled_forward_folds_match_fresh_filtering()
+    test_summary_scores_every_model_and_horizon()
\ No newline at end of file
@@ -0,0 +1,99 @@
+import warnings
+import numpy as np
+import pandas as pd
+from backtest import synthetic_series
+from batched_arima import fit_arma11, fit_forecast_arima111, forecast_arima111, objective, pad_panel
+from forecast_engine import run_forecasts
+from model_registry import fit_model
+
+def make_panel(n_series=12, seed=5):
+    # Ragged: series start up to three years apart
+    panel = list(synthetic_series(n_series, n_points=96, seed=seed).values())
+    return [series.iloc[3 * (i % 12):] for i, series in enumerate(panel)]
+
+def statsmodels_fits(panel):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return [fit_model('ARIMA(1,1,1)', series) for series in panel]
+
+def test_likelihood_and_forecast_match_statsmodels():
+    try:
+        panel = make_panel()
+        fits = statsmodels_fits(panel)
+        levels, lengths = pad_panel(panel)
+        phi = np.array([f.params['ar.L1'] for f in fits])
+        theta = np.array([f.params['ma.L1'] for f in fits])
+
+        # Same parameters: same exact likelihood (statsmodels drops the diffuse first point)
+        x = np.arctanh(np.stack([phi, theta], axis=1))
+        llf = -objective(x, np.diff(levels, axis=1), lengths - 1) * (lengths - 1)
+        assert np.allclose(llf, [f.llf for f in fits], atol=1e-3), "Log-likelihood differs from statsmodels"
+
+        # ... and the same forecast path; the interval only up to statsmodels' separately optimized sigma2
+        means, sd, _ = forecast_arima111(levels, lengths, phi, theta, 6)
+        for i, f in enumerate(fits):
+            forecast = f.get_forecast(6)
+            assert np.allclose(means[i], forecast.predicted_mean, rtol=1e-6), f"Point forecast differs for series {i}"
+            assert np.allclose(sd[i], forecast.se_mean, rtol=1e-2), f"Forecast error differs for series {i}"
+        print("Batched likelihood and forecast test passed")
+    except Exception as e:
+        print(f"Batched likelihood and forecast test failed: {str(e)}")
+        raise
+
+def test_estimates_at_least_as_good_as_statsmodels():
+    try:
+        panel = make_panel(40, seed=11)
+        fits = statsmodels_fits(panel)
+        levels, lengths = pad_panel(panel)
+        w = np.diff(levels, axis=1)
+        phi, theta, _ = fit_arma11(w, lengths - 1)
+        llf = -objective(np.arctanh(np.stack([phi, theta], axis=1)), w, lengths - 1) * (lengths - 1)
+        statsmodels_llf = np.array([f.llf for f in fits])
+        assert (llf >= statsmodels_llf - 1e-3).all(), f"Worse optimum than statsmodels: {np.min(llf - statsmodels_llf)}"
+
+        # Where both reach the same optimum the forecasts agree
+        same = np.abs(llf - statsmodels_llf) < 1e-4
+        means, sd, params = fit_forecast_arima111(panel, 6)
+        assert params['ok'].all(), "Batched fit rejected a valid series"
+        predicted = np.array([f.get_forecast(6).predicted_mean for f in fits])
+        assert same.sum() >= len(panel) // 2, "Too few series reached the statsmodels optimum"
+        assert np.allclose(means[same], predicted[same], rtol=1e-3), "Forecasts differ at the same optimum"
+        print("Batched estimation test passed")
+    except Exception as e:
+        print(f"Batched estimation test failed: {str(e)}")
+        raise
+
+def test_batched_engine_rows():
+    try:
+        index = pd.date_range('2015-01-31', periods=48, freq='ME')
+        rng = np.random.default_rng(2)
+        tasks = [{
+            'column': f'C{i}_Indicator', 'country_code': f'C{i}', 'indicator_id': i,
+            'series': pd.Series(100 + np.cumsum(rng.normal(0.5, 1.0, 48)), index=index)
+        } for i in range(3)]
+        # A constant series has no likelihood optimum; it falls back to the per-series path
+        tasks.append({'column': 'C3_Indicator', 'country_code': 'C3', 'indicator_id': 3, 'series': pd.Series(5.0, index=index)})
+
+        batched = list(run_forecasts(tasks, ['1M', '6M'], engine='batched'))
+        serial = list(run_forecasts(tasks, ['1M', '6M'], workers=1))
+        assert [o['column'] for o in batched] == [t['column'] for t in tasks], "Results out of task order"
+        for b, s in zip(batched, serial):
+            assert b['error'] is None, f"Unexpected error: {b['error']}"
+            for row_b, row_s in zip(b['results'], s['results']):
+                assert {k: v for k, v in row_b.items() if not isinstance(v, float)} == \
+                       {k: v for k, v in row_s.items() if not isinstance(v, float)}, "Row keys differ from fit_series"
+                assert row_b['confidence_interval_lower'] < row_b['forecast_value'] < row_b['confidence_interval_upper'], "Interval does not bracket the forecast"
+        try:
+            list(run_forecasts(tasks, ['1M'], model='ETS(A,N,N)', engine='batched'))
+            raise AssertionError("Batched engine accepted a non-ARIMA(1,1,1) model")
+        except ValueError:
+            pass
+        print("Batched engine rows test passed")
+    except Exception as e:
+        print(f"Batched engine rows test failed: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    test_likelihood_and_forecast_match_statsmodels()
+    test_estimates_at_least_as_good_as_statsmodels()
+    test_batched_engine_rows()
\ No newline at end of file
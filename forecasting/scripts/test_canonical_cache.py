@@ -0,0 +1,99 @@
+import os
+import tempfile
+import pandas as pd
+from canonical_cache import MAX_SEGMENTS, CanonicalCache
+from fake_supabase import FakeSupabase
+from synthetic_data import generate_canonical
+
+def make_client():
+    tables = generate_canonical(countries=3, indicators=2, years=1, vintages=1, seed=4)
+    # Everything ingested ten minutes ago, so the watermark sits well in the past
+    tables['canonical_timeseries']['ingested_at'] = pd.Timestamp.now(tz='UTC') - pd.Timedelta(minutes=10)
+    return FakeSupabase(tables)
+
+def cached_values(cache):
+    frame = cache.load_frame('canonical_timeseries', ['id', 'value'])
+    return dict(zip(frame['id'], frame['value']))
+
+def upstream_values(client):
+    frame = client.frame('canonical_timeseries')
+    return dict(zip(frame['id'], frame['value']))
+
+def test_delta_sync():
+    try:
+        client = make_client()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = CanonicalCache(cache_dir)
+            synced = cache.sync(client)
+            assert synced['canonical_timeseries'] == len(client.frame('canonical_timeseries'))
+            watermark = pd.Timestamp(cache.watermark('canonical_timeseries'))
+
+            # A row from a transaction that committed late, stamped just before the watermark
+            timeseries = client.frame('canonical_timeseries')
+            late = timeseries.iloc[[0]].assign(id=timeseries['id'].max() + 1, value=123.0,
+                                                ingested_at=watermark - pd.Timedelta(seconds=5))
+            client.replace('canonical_timeseries', pd.concat([timeseries, late], ignore_index=True))
+            cache = CanonicalCache(cache_dir)
+            synced = cache.sync(client)
+            assert synced['canonical_timeseries'] == 1, f"Only the late row should sync, got {synced}"
+            assert cached_values(cache) == upstream_values(client), "The late commit was missed"
+
+            # An updated row is replaced through a delta segment rather than a rewrite of the base file
+            base_mtime = os.stat(cache.table_path('canonical_timeseries')).st_mtime_ns
+            timeseries = client.frame('canonical_timeseries').copy()
+            timeseries.loc[1, ['value', 'ingested_at']] = [-1.0, pd.Timestamp.now(tz='UTC')]
+            client.replace('canonical_timeseries', timeseries)
+            cache = CanonicalCache(cache_dir)
+            assert cache.sync(client)['canonical_timeseries'] == 1
+            assert cached_values(cache) == upstream_values(client), "The updated row was not replaced"
+            assert len(cache.segments('canonical_timeseries')) == 3, "Each delta should add one segment"
+            assert os.stat(cache.table_path('canonical_timeseries')).st_mtime_ns == base_mtime, "The base file was rewritten"
+            assert cache.manifest['canonical_timeseries']['rows'] == len(timeseries)
+
+            # Routine syncs do not look for deletes; a reconcile drops them and merges the segments into the base file
+            client.replace('canonical_timeseries', timeseries.drop(index=[2, 3]))
+            cache = CanonicalCache(cache_dir)
+            assert cache.sync(client)['canonical_timeseries'] == 0, "A routine sync scanned for deletes"
+            assert cache.sync(client, reconcile=True)['canonical_timeseries'] == 2
+            assert cached_values(cache) == upstream_values(client), "Deleted rows are still cached"
+            assert cache.segments('canonical_timeseries') == ['canonical_timeseries.arrow']
+            assert sorted(os.listdir(cache_dir)) == sorted(cache.segments(t)[0] for t in cache.manifest) + ['manifest.json']
+
+            # An unchanged source syncs nothing, even though the overlap window re-reads rows,
+            # and costs the overlap page plus the empty page ending it, not a scan of every key
+            client.requests = {}
+            assert not any(cache.sync(client).values()), "Re-read rows were counted as changes"
+            assert client.requests == {table: 2 for table in cache.manifest}, f"Warm sync made {client.requests}"
+        print("Delta sync test passed")
+    except Exception as e:
+        print(f"Delta sync test failed: {str(e)}")
+        raise
+
+def test_segment_compaction_and_full_resync():
+    try:
+        client = make_client()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = CanonicalCache(cache_dir)
+            cache.sync(client)
+            for i in range(MAX_SEGMENTS):
+                timeseries = client.frame('canonical_timeseries').copy()
+                timeseries.loc[i, ['value', 'ingested_at']] = [float(-i), pd.Timestamp.now(tz='UTC')]
+                client.replace('canonical_timeseries', timeseries)
+                cache.sync(client)
+                assert len(cache.segments('canonical_timeseries')) < MAX_SEGMENTS, "Segments were not merged"
+            assert cached_values(cache) == upstream_values(client), "Merging segments lost updates"
+
+            # A full resync starts over from the source, whatever the cache holds
+            cache.write_table('canonical_timeseries', client.frame('canonical_timeseries').head(3))
+            synced = cache.sync(client, full=True)
+            assert synced['canonical_timeseries'] == len(client.frame('canonical_timeseries'))
+            assert cached_values(cache) == upstream_values(client), "Full resync did not rebuild the cache"
+            assert len(os.listdir(cache_dir)) == len(cache.manifest) + 1, "Full resync left old segments behind"
+        print("Segment compaction test passed")
+    except Exception as e:
+        print(f"Segment compaction test failed: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    test_delta_sync()
+    test_segment_compaction_and_full_resync()
\ No newline at end of file
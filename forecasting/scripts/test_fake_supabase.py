@@ -0,0 +1,78 @@
+import copy
+import inspect
+import json
+import math
+import pandas as pd
+from benchmark_pipeline import DEFAULT_BASELINE, compare, run_benchmark
+from fake_supabase import FakeSupabase
+from synthetic_data import generate_canonical
+from timeseries_stream import KEYSET_COLUMNS, fetch_table, read_timeseries
+
+def test_keyset_paging_reads_everything():
+    try:
+        tables = generate_canonical(countries=3, indicators=4, years=2, vintages=3, seed=1)
+        # A server cap below the page size must not truncate or skip pages
+        client = FakeSupabase(tables, max_rows=50)
+        timeseries = read_timeseries(client, columns=["id", "country_code", "indicator_id", "date_value", "value"])
+        expected = tables['canonical_timeseries'].sort_values(KEYSET_COLUMNS)
+        assert timeseries['id'].tolist() == expected['id'].tolist(), "Paged rows differ from the table"
+        # Full pages, then the empty page that ends the scan
+        assert client.requests['canonical_timeseries'] == math.ceil(len(expected) / 50) + 1
+
+        latest = read_timeseries(client, as_of='latest', page_size=40)
+        points = expected.drop_duplicates(['country_code', 'indicator_id', 'date_value'])
+        assert len(latest) == len(points), f"Expected {len(points)} points, got {len(latest)}"
+
+        filtered = read_timeseries(client, countries=['AAB'], indicators=[2], start_date='1996-01-01')
+        assert set(filtered['country_code']) == {'AAB'} and set(filtered['indicator_id']) == {2}
+        assert filtered['date_value'].min() >= pd.Timestamp('1996-01-01'), "Start date filter not applied"
+        print("Keyset paging test passed")
+    except Exception as e:
+        print(f"Keyset paging test failed: {str(e)}")
+        raise
+
+def test_writes():
+    try:
+        client = FakeSupabase()
+        rows = [{'country_code': 'MEX', 'category_id': 1, 'rank': 1, 'indicator_id': 1},
+                {'country_code': 'USA', 'category_id': 1, 'rank': 1, 'indicator_id': 2}]
+        client.table("taxonomy_mapping").upsert(rows, on_conflict="country_code,category_id,rank").execute()
+        client.table("taxonomy_mapping").upsert([{**rows[0], 'indicator_id': 5}], on_conflict="country_code,category_id,rank").execute()
+        stored = fetch_table(client, "taxonomy_mapping", ["mapping_id", "country_code", "indicator_id"], key="mapping_id")
+        assert stored.values.tolist() == [[1, 'MEX', 5], [2, 'USA', 2]], f"Upsert stored {stored.values.tolist()}"
+
+        client.table("taxonomy_mapping").delete().in_("mapping_id", [1]).execute()
+        remaining = client.table("taxonomy_mapping").select("country_code").execute().data
+        assert remaining == [{'country_code': 'USA'}], f"Delete left {remaining}"
+        print("Writes test passed")
+    except Exception as e:
+        print(f"Writes test failed: {str(e)}")
+        raise
+
+def test_benchmark_baseline():
+    try:
+        result = run_benchmark(countries=3, indicators=4, years=3, vintages=2)
+        assert list(result['stages']) == ['fetch', 'preprocess', 'forecast', 'taxonomy'], f"Stages {list(result['stages'])}"
+        assert result['stages']['fetch']['count'] > 0 and result['stages']['forecast']['count'] > 0
+        assert compare(result, result) == [], "A run should not regress against itself"
+
+        faster = copy.deepcopy(result)
+        faster['stages']['fetch']['seconds'] = result['stages']['fetch']['seconds'] / 2
+        regressions = compare(result, faster)
+        assert len(regressions) == 1 and regressions[0].startswith('fetch: seconds'), f"Unexpected {regressions}"
+
+        # The committed baseline must match the default configuration, or the check refuses to compare
+        with open(DEFAULT_BASELINE) as f:
+            baseline = json.load(f)
+        defaults = {name: p.default for name, p in inspect.signature(run_benchmark).parameters.items() if name != 'trace_memory'}
+        assert baseline['config'] == defaults, f"Baseline recorded for {baseline['config']}, defaults are {defaults}"
+        assert list(baseline['stages']) == list(result['stages']), "Baseline is missing stages"
+        print("Benchmark baseline test passed")
+    except Exception as e:
+        print(f"Benchmark baseline test failed: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    test_keyset_paging_reads_everything()
+    test_writes()
+    test_benchmark_baseline()
\ No newline at end of file
@@ -5,6 +5,12 @@ from forecast_data import forecast_data
 from supabase import create_client, Client
 from dotenv import load_dotenv
 import os
+import tempfile
+import supabase_client
+from fake_supabase import FakeSupabase, FlakyClient
+from forecast_state import FingerprintStore
+from preprocess_data import preprocess_panel
+from synthetic_data import generate_canonical
 
 def test_forecast_pipeline():
     try:
@@ -39,5 +45,60 @@ def test_forecast_pipeline():
         print(f"Forecast test failed: {str(e)}")
         raise
 
+def revise_series(client, n=1):
+    # Scale the first n series upstream, so only their fingerprints change
+    timeseries = client.frame("canonical_timeseries").copy()
+    pairs = timeseries[['country_code', 'indicator_id']].drop_duplicates().head(n)
+    revised = timeseries.set_index(['country_code', 'indicator_id']).index.isin(pairs.set_index(['country_code', 'indicator_id']).index)
+    timeseries.loc[revised, 'value'] *= 1.1
+    client.replace("canonical_timeseries", timeseries)
+
+def test_incremental_forecasts():
+    previous = supabase_client._client
+    try:
+        client = FakeSupabase(generate_canonical(countries=2, indicators=3, years=3, vintages=1, seed=3))
+        supabase_client.set_client(client)
+
+        def run(run_id, **options):
+            countries, indicators, timeseries = fetch_validated_data(use_cache=False, backend='rest')
+            panel = preprocess_panel(countries, indicators, timeseries)
+            return forecast_data(panel, countries, indicators, incremental=True, state_dir=state_dir, run_id=run_id,
+                                 backend='rest', engine='batched', **options), len(panel)
+
+        with tempfile.TemporaryDirectory() as state_dir:
+            results, n_series = run('first')
+            assert len(results) == 3 * n_series, f"First run should fit all {n_series} series"
+            fingerprints = dict(FingerprintStore(state_dir).fingerprints)
+            assert len(fingerprints) == n_series, "Every written series should have a fingerprint"
+
+            results, _ = run('unchanged')
+            assert results == [] and client.frame("forecast_results")['run_id'].eq('unchanged').sum() == 0, \
+                "Unchanged series were refitted"
+
+            # A failed write keeps the old fingerprint, so the revised series is retried next time
+            revise_series(client)
+            supabase_client.set_client(FlakyClient(client, fail_after=0))
+            try:
+                run('failed')
+                raise AssertionError("The write should have failed the run")
+            except ConnectionError:
+                pass
+            assert FingerprintStore(state_dir).fingerprints == fingerprints, "Fingerprints were saved before the write"
+            supabase_client.set_client(client)
+            results, _ = run('retried')
+            assert len(results) == 3, f"Only the revised series should be refitted, got {len(results)} rows"
+            assert sum(FingerprintStore(state_dir).fingerprints[k] != v for k, v in fingerprints.items()) == 1
+
+            # Changing what shapes the forecasts refits everything
+            results, _ = run('new-horizons', horizons=['1M', '3M'])
+            assert len(results) == 2 * n_series, "A spec change should refit every series"
+        print("Incremental forecast test passed")
+    except Exception as e:
+        print(f"Incremental forecast test failed: {str(e)}")
+        raise
+    finally:
+        supabase_client.set_client(previous)
+
 if __name__ == "__main__":
-    test_forecast_pipeline()
\ No newline at end of file
+    test_forecast_pipeline()
+    test_incremental_forecasts()
\ No newline at end of file
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.arima.model import ARIMA
+from forecast_engine import run_forecasts, forecast_horizons
+
+def make_tasks(n_series, n_points=48, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2015-01-31', periods=n_points, freq='ME')
+    tasks = []
+    for i in range(n_series):
+        values = 100 + np.cumsum(rng.normal(0.5, 1.0, n_points))
+        tasks.append({
+            'column': f'C{i:02d}_Indicator',
+            'country_code': f'C{i:02d}',
+            'indicator_id': i,
+            'series': pd.DataFrame({f'C{i:02d}_Indicator': values}, index=index)
+        })
+    return tasks
+
+def test_parallel_matches_serial():
+    try:
+        tasks = make_tasks(6)
+        horizons = ['1M', '3M', '6M']
+
+        serial = list(run_forecasts(tasks, horizons, workers=1))
+        parallel = list(run_forecasts(tasks, horizons, workers=3, chunksize=1))
+
+        assert [o['column'] for o in parallel] == [t['column'] for t in tasks], "Results out of task order"
+        assert serial == parallel, "Parallel results differ from the serial path"
+        assert all(len(o['results']) == len(horizons) for o in serial), "Missing horizons"
+        print("Parallel/serial equivalence test passed")
+    except Exception as e:
+        print(f"Parallel/serial equivalence test failed: {str(e)}")
+        raise
+
+def test_failing_series_is_isolated():
+    try:
+        tasks = make_tasks(3)
+        # A series with a non-datetime index cannot be fit at freq='ME'
+        tasks[1]['series'] = tasks[1]['series'].reset_index(drop=True)
+
+        outcomes = list(run_forecasts(tasks, ['1M'], workers=2, chunksize=1))
+        assert outcomes[1]['error'] is not None, "Expected the broken series to report an error"
+        assert outcomes[1]['results'] == [], "Broken series should not produce results"
+        assert outcomes[0]['error'] is None and outcomes[2]['error'] is None, "Healthy series were affected"
+        print("Failure isolation test passed")
+    except Exception as e:
+        print(f"Failure isolation test failed: {str(e)}")
+        raise
+
+def test_single_pass_horizons_match_per_horizon_forecasts():
+    try:
+        series = make_tasks(1, n_points=60)[0]['series']
+        model_fit = ARIMA(series, order=(1,1,1), freq='ME').fit()
+
+        forecasts = forecast_horizons(model_fit, ['1M', '3M', 12, '24M'])
+        assert [f['forecast_horizon'] for f in forecasts] == ['1M', '3M', '12M', '24M'], "Unexpected horizon labels"
+        for forecast in forecasts:
+            steps = int(forecast['forecast_horizon'][:-1])
+            forecast_obj = model_fit.get_forecast(steps=steps)
+            conf_int = forecast_obj.conf_int(alpha=0.05)
+            assert forecast['forecast_value'] == float(forecast_obj.predicted_mean.iloc[-1]), f"Value mismatch at {steps} steps"
+            assert forecast['confidence_interval_lower'] == float(conf_int.iloc[-1, 0]), f"Lower bound mismatch at {steps} steps"
+            assert forecast['confidence_interval_upper'] == float(conf_int.iloc[-1, 1]), f"Upper bound mismatch at {steps} steps"
+        print("Single-pass horizon test passed")
+    except Exception as e:
+        print(f"Single-pass horizon test failed: {str(e)}")
+        raise
+
+def test_quarterly_series_forecast_whole_periods():
+    try:
+        rng = np.random.default_rng(1)
+        index = pd.date_range('2010-03-31', periods=24, freq='QE')
+        task = {'column': 'MEX_GDP', 'country_code': 'MEX', 'indicator_id': 1, 'period_months': 3,
+                'series': pd.Series(100 + np.cumsum(rng.normal(0.5, 1.0, 24)), index=index)}
+        for engine in ('statsmodels', 'batched'):
+            outcome = list(run_forecasts([task], ['1M', '3M', '6M'], engine=engine))[0]
+            assert outcome['error'] is None, f"{engine}: {outcome['error']}"
+            dates = [row['forecast_date'] for row in outcome['results']]
+            # 1M and 3M both land on the next quarter end
+            assert dates == ['2016-03-31', '2016-03-31', '2016-06-30'], f"{engine}: unexpected dates {dates}"
+        print("Quarterly horizon test passed")
+    except Exception as e:
+        print(f"Quarterly horizon test failed: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    test_parallel_matches_serial()
+    test_failing_series_is_isolated()
+    test_single_pass_horizons_match_per_horizon_forecasts()
+    test_quarterly_series_forecast_whole_periods()
\ No newline at end of file
@@ -0,0 +1,164 @@
+import json
+import urllib.request
+import threading
+from urllib.error import HTTPError
+from forecast_reader import ForecastReader, TTLCache, make_server
+
+class FilterQuery:
+    def __init__(self, rows, client):
+        self.rows = rows
+        self.client = client
+
+    def select(self, columns):
+        return self
+
+    def gt(self, column, value):
+        return FilterQuery([r for r in self.rows if r[column] > value], self.client)
+
+    def order(self, column):
+        return FilterQuery(sorted(self.rows, key=lambda r: r[column]), self.client)
+
+    def limit(self, n):
+        return FilterQuery(self.rows[:n], self.client)
+
+    def execute(self):
+        self.client.fetched += len(self.rows)
+        return self
+
+    @property
+    def data(self):
+        return self.rows
+
+class VersionQuery:
+    """latest_forecasts_version (migration 014) over the stored rows."""
+
+    def __init__(self, rows):
+        self.data = [{'updated_at': max((r['updated_at'] for r in rows), default=None), 'entries': len(rows)}]
+
+    def execute(self):
+        return self
+
+class TableClient:
+    def __init__(self, rows):
+        self.rows = rows
+        self.fetched = 0
+        self.checks = 0
+
+    def table(self, name):
+        assert name == "latest_forecasts", f"Reader queried {name}"
+        return FilterQuery(self.rows, self)
+
+    def rpc(self, name, params):
+        assert name == "latest_forecasts_version", f"Reader called {name}"
+        self.checks += 1
+        return VersionQuery(self.rows)
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def latest_row(forecast_id, country_code, indicator_id, horizon, value, updated_at):
+    return {
+        'country_code': country_code, 'indicator_id': indicator_id, 'forecast_horizon': horizon,
+        'model_name': 'ARIMA(1,1,1)', 'forecast_id': forecast_id, 'forecast_date': '2024-06-30',
+        'forecast_value': value, 'confidence_interval_lower': value - 1, 'confidence_interval_upper': value + 1,
+        'run_id': '2024-01-01', 'created_at': updated_at, 'updated_at': updated_at
+    }
+
+def make_rows():
+    # Written two minutes apart, so the refresh overlap only re-reads the newest
+    return [latest_row(i + 1, country_code, indicator_id, horizon, 100.0 + i, f'2024-01-01T00:{2 * i:02d}:00+00:00')
+            for i, (country_code, indicator_id, horizon) in enumerate(
+                [(c, ind, h) for c in ('MEX', 'USA') for ind in (1, 2) for h in ('1M', '3M')])]
+
+def test_lookup_and_delta_refresh():
+    try:
+        client = TableClient(make_rows())
+        clock = Clock()
+        reader = ForecastReader(client, backend="rest", ttl=30, check_interval=1, clock=clock)
+        rows = reader.get('MEX', 1)
+        assert [r['forecast_horizon'] for r in rows] == ['1M', '3M'], f"Unexpected rows: {rows}"
+        assert reader.get('MEX', 1, horizon='3M')[0]['forecast_value'] == 101.0, "Horizon filter failed"
+        batch = reader.get_many([('USA', 2), ('BRA', 1)], horizon='1M')
+        assert len(batch[('USA', 2)]) == 1 and batch[('BRA', 1)] == [], f"Unexpected batch: {batch}"
+        assert client.fetched == 8, f"Initial load read {client.fetched} rows"
+
+        # Reads within the check interval do not query; after it only the version is read
+        reader.get('USA', 1)
+        assert client.checks == 1, "Read within the check interval went to the database"
+        clock.now = 2
+        reader.get('USA', 1)
+        assert client.fetched == 8 and client.checks == 2, "Unchanged version should not refresh"
+
+        # Any writer moves the version; only the changed entry (plus the last entry,
+        # inside the overlap window) is pulled
+        client.rows[0] = latest_row(20, 'MEX', 1, '1M', 555.0, '2024-01-02T00:00:00+00:00')
+        assert reader.get('MEX', 1, horizon='1M')[0]['forecast_value'] == 100.0, "Refreshed within the check interval"
+        clock.now = 4
+        assert reader.get('MEX', 1, horizon='1M')[0]['forecast_value'] == 555.0, "Write not visible after the version moved"
+        assert client.fetched == 10, f"Delta refresh read {client.fetched - 8} rows instead of 2"
+
+        # A deleted entry leaves the count behind and is evicted
+        del client.rows[7]
+        clock.now = 6
+        assert [r['forecast_horizon'] for r in reader.get('USA', 2)] == ['1M'], "Deleted entry still served"
+        client.rows[:] = [r for r in client.rows if (r['country_code'], r['indicator_id']) != ('USA', 2)]
+        clock.now = 8
+        assert reader.get_many([('USA', 2)])[('USA', 2)] == [] and ('USA', 2) not in reader.series, "Deleted series still indexed"
+        print("Forecast reader refresh test passed")
+    except Exception as e:
+        print(f"Forecast reader refresh test failed: {str(e)}")
+        raise
+
+def test_etag_and_cache():
+    try:
+        cache = TTLCache(maxsize=2, ttl=10, clock=Clock())
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        assert cache.get('b') is None and cache.get('a') == 1, "LRU evicted the wrong entry"
+        cache.clock.now = 11
+        assert cache.get('a') is None, "Entry outlived its ttl"
+
+        client = TableClient(make_rows())
+        clock = Clock()
+        reader = ForecastReader(client, backend="rest", check_interval=1, clock=clock)
+        status, etag, body = reader.response([('USA', 1), ('MEX', 2)])
+        assert status == 200 and len(json.loads(body)['forecasts']) == 4, "Unexpected response"
+        assert reader.response([('MEX', 2), ('USA', 1)], if_none_match=etag)[0] == 304, "Matching ETag not honoured"
+
+        client.rows[6] = latest_row(30, 'USA', 2, '1M', 1.0, '2024-01-02T00:00:00+00:00')
+        clock.now = 2
+        assert reader.response([('USA', 1), ('MEX', 2)], if_none_match=etag)[0] == 304, "Unrelated change broke the ETag"
+        client.rows[4] = latest_row(31, 'USA', 1, '1M', 1.0, '2024-01-03T00:00:00+00:00')
+        clock.now = 4
+        status, new_etag, _ = reader.response([('USA', 1), ('MEX', 2)], if_none_match=etag)
+        assert status == 200 and new_etag != etag, "Changed forecast served as not modified"
+
+        server = make_server(reader, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            url = f"http://127.0.0.1:{server.server_port}/latest?series=USA:1,MEX:2&horizon=1M"
+            with urllib.request.urlopen(url) as response:
+                served_etag = response.headers['ETag']
+                assert len(json.loads(response.read())['forecasts']) == 2, "Horizon filter ignored over HTTP"
+            try:
+                urllib.request.urlopen(urllib.request.Request(url, headers={'If-None-Match': served_etag}))
+                raise AssertionError("Expected 304 Not Modified")
+            except HTTPError as e:
+                assert e.code == 304, f"Unexpected status {e.code}"
+        finally:
+            server.shutdown()
+            server.server_close()
+        print("Forecast reader ETag test passed")
+    except Exception as e:
+        print(f"Forecast reader ETag test failed: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    test_lookup_and_delta_refresh()
+    test_etag_and_cache()
\ No newline at end of file
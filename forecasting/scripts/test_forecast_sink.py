@@ -0,0 +1,81 @@
+from forecast_sink import FORECAST_RESULT_KEY, ForecastResultSink
+
+class RecordingTable:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def upsert(self, rows, on_conflict):
+        self.calls.append((list(rows), on_conflict))
+        return self
+
+    def execute(self):
+        return self
+
+class RecordingClient:
+    def __init__(self):
+        self.calls = []
+
+    def table(self, name):
+        assert name == "forecast_results", f"Unexpected table {name}"
+        return RecordingTable(self.calls)
+
+class FailingClient:
+    def table(self, name):
+        raise ConnectionError("connection reset by peer")
+
+def make_rows(n):
+    return [{'country_code': 'MEX', 'indicator_id': i, 'forecast_horizon': '1M'} for i in range(n)]
+
+def test_sink_writes_in_batches():
+    try:
+        client = RecordingClient()
+        with ForecastResultSink(client, run_id='test-run', batch_size=4) as sink:
+            sink.add(make_rows(3))
+            assert client.calls == [], "Sink wrote before a batch was full"
+            sink.add(make_rows(6))
+            assert [len(rows) for rows, _ in client.calls] == [4, 4], "Expected two full batches mid-run"
+
+        assert [len(rows) for rows, _ in client.calls] == [4, 4, 1], "Remainder not flushed on close"
+        assert sink.written == 9, f"Expected 9 written rows, found {sink.written}"
+        assert all(key == FORECAST_RESULT_KEY for _, key in client.calls), "Upsert did not use the natural key"
+        assert all(row['run_id'] == 'test-run' for rows, _ in client.calls for row in rows), "Rows missing run_id"
+        print("Batched sink test passed")
+    except Exception as e:
+        print(f"Batched sink test failed: {str(e)}")
+        raise
+
+def test_sink_exit_keeps_original_error():
+    try:
+        # A failure inside the block still flushes what was fitted before it
+        client = RecordingClient()
+        try:
+            with ForecastResultSink(client, batch_size=4) as sink:
+                sink.add(make_rows(2))
+                raise ValueError("fit crashed")
+        except ValueError:
+            pass
+        assert [len(rows) for rows, _ in client.calls] == [2], "Rows fitted before the failure were not flushed"
+
+        # When that flush fails too, the original error is the one raised
+        try:
+            with ForecastResultSink(FailingClient(), batch_size=4) as sink:
+                sink.add(make_rows(2))
+                raise ValueError("fit crashed")
+        except ValueError as e:
+            assert str(e) == "fit crashed", f"Unexpected error {e}"
+
+        # Without an earlier failure a flush error is raised as usual
+        try:
+            with ForecastResultSink(FailingClient(), batch_size=4) as sink:
+                sink.add(make_rows(2))
+            raise AssertionError("The failed flush was swallowed")
+        except ConnectionError:
+            pass
+        print("Sink exit test passed")
+    except Exception as e:
+        print(f"Sink exit test failed: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    test_sink_writes_in_batches()
+    test_sink_exit_keeps_original_error()
\ No newline at end of file
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+from memory_profile import MemoryProfiler, make_timeseries
+from preprocess_data import preprocess_data, preprocess_panel
+
+def make_messy_rows():
+    rng = np.random.default_rng(1)
+    n = 2000
+    countries = pd.DataFrame({'country_code': ['MEX', 'USA', 'BRA', 'ARG']})
+    indicators = pd.DataFrame({'indicator_id': [1, 2, 3], 'indicator_name': ['GDP', 'CPI', 'Rate']})
+    timeseries = pd.DataFrame({
+        # Unknown countries and indicators, duplicate dates, gaps and unknown or missing units
+        'country_code': rng.choice(['MEX', 'USA', 'BRA', 'ZZZ'], n),
+        'indicator_id': rng.choice([1, 2, 3, 9], n),
+        'date_value': rng.choice(pd.date_range('2000-01-31', periods=40, freq='ME').strftime('%Y-%m-%d'), n),
+        'value': np.where(rng.random(n) < 0.2, np.nan, rng.normal(size=n)),
+        'unit': rng.choice(['Percent', 'USD Billion', 'Odd', None], n)
+    })
+    return countries, indicators, timeseries
+
+def test_lean_matches_default():
+    try:
+        countries, indicators, timeseries = make_messy_rows()
+        default = preprocess_data(countries, indicators, timeseries)
+        lean = preprocess_data(countries, indicators, timeseries, lean=True)
+        pd.testing.assert_frame_equal(default, lean)
+
+        narrow = preprocess_data(countries, indicators, timeseries, lean=True, float_dtype='float32')
+        assert (narrow.dtypes.drop('date_value') == 'float32').all(), "float32 mode left float64 columns"
+        assert np.allclose(narrow.drop(columns='date_value'), default.drop(columns='date_value'), equal_nan=True, atol=1e-6)
+
+        panel, lean_panel = preprocess_panel(countries, indicators, timeseries), preprocess_panel(countries, indicators, timeseries, lean=True)
+        assert (panel.offsets == lean_panel.offsets).all() and np.allclose(panel.values, lean_panel.values), "Lean panel differs"
+        print("Lean preprocessing test passed")
+    except Exception as e:
+        print(f"Lean preprocessing test failed: {str(e)}")
+        raise
+
+def test_memory_budget():
+    try:
+        countries, indicators, timeseries = make_timeseries(20_000, countries=10, indicators=5)
+        with MemoryProfiler() as profiler:
+            preprocess_data(countries, indicators, timeseries, lean=True)
+        steps = [s['step'] for s in profiler.steps]
+        assert steps[-1] == 'preprocess_data' and 'preprocess_data.pivot' in steps, f"Unexpected steps {steps}"
+        # The stage's peak covers its steps'
+        assert profiler.steps[-1]['peak_mb'] >= max(s['peak_mb'] for s in profiler.steps[:-1]) > 0
+
+        try:
+            with MemoryProfiler(budget_mb=0.01):
+                preprocess_data(countries, indicators, timeseries, lean=True)
+            raise AssertionError("Budget was not enforced")
+        except MemoryError as e:
+            assert 'budget' in str(e), f"Unexpected error {e}"
+        print("Memory budget test passed")
+    except Exception as e:
+        print(f"Memory budget test failed: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    test_lean_matches_default()
+    test_memory_budget()
\ No newline at end of file
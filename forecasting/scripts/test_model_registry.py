@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+from forecast_engine import forecast_horizons, fit_series
+from model_registry import ARIMA_NAME, MODEL_REGISTRY, default_candidates, fit_model, select_model
+
+def make_series(n_points=72, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2015-01-31', periods=n_points, freq='ME')
+    seasonal = 3 * np.sin(np.arange(n_points) * 2 * np.pi / 12)
+    return pd.DataFrame({'MEX_GDP': 100 + np.cumsum(rng.normal(0.4, 1.0, n_points)) + seasonal}, index=index)
+
+def test_registry_models_forecast_every_horizon():
+    try:
+        series = make_series()
+        for name in list(MODEL_REGISTRY) + ['ARIMA(0,1,1)']:
+            forecasts = forecast_horizons(fit_model(name, series), ['1M', '3M', '12M'])
+            assert [f['forecast_date'] for f in forecasts] == ['2021-01-31', '2021-03-31', '2021-12-31'], f"{name}: wrong forecast dates"
+            for f in forecasts:
+                assert np.isfinite(f['forecast_value']), f"{name}: non-finite forecast"
+                assert f['confidence_interval_lower'] < f['forecast_value'] < f['confidence_interval_upper'], f"{name}: value outside interval"
+        print("Registry forecast test passed")
+    except Exception as e:
+        print(f"Registry forecast test failed: {str(e)}")
+        raise
+
+def test_auto_selection_records_chosen_model():
+    try:
+        series = make_series()
+        for criterion in ['cv', 'aic']:
+            name, model_fit = select_model(series, criterion=criterion)
+            assert name in MODEL_REGISTRY or name.startswith('ARIMA('), f"Unexpected model {name}"
+            assert model_fit.get_forecast(steps=1).predicted_mean.notna().all(), "Selected model cannot forecast"
+
+        # AIC is not comparable across families, so it only ever picks an ARIMA order
+        name, _ = select_model(series, criterion='aic')
+        assert ARIMA_NAME.match(name) and ARIMA_NAME.match(name).group(2) == '1', f"AIC picked {name}"
+        try:
+            select_model(series, candidates=['ARIMA(1,1,1)', 'SNAIVE(12)'], criterion='aic')
+            raise AssertionError("AIC should refuse to rank different model families")
+        except ValueError:
+            pass
+
+        task = {'column': 'MEX_GDP', 'country_code': 'MEX', 'indicator_id': 1, 'series': series}
+        outcome = fit_series(task, ['1M', '6M'], model='auto')
+        assert outcome['error'] is None, f"Auto fit failed: {outcome['error']}"
+        assert {r['model_name'] for r in outcome['results']} <= set(default_candidates(series)), "model_name not a candidate"
+
+        # The shortest quarterly and annual series preprocessing keeps are too short to hold out a fold
+        for freq, periods, period_months in [('QE', 8, 3), ('YE', 6, 12)]:
+            short = pd.Series(100 + np.arange(periods) * 2.0 + np.tile([0.5, -0.5], periods // 2),
+                              index=pd.date_range('2015-12-31', periods=periods, freq=freq))
+            short_task = {**task, 'series': short, 'period_months': period_months}
+            outcome = fit_series(short_task, ['3M', '12M'], model='auto')
+            assert outcome['error'] is None, f"Auto fit failed on {periods} {freq} points: {outcome['error']}"
+            assert all(ARIMA_NAME.match(r['model_name']) for r in outcome['results']), "Short series should fall back to AIC"
+        print("Auto selection test passed")
+    except Exception as e:
+        print(f"Auto selection test failed: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    test_registry_models_forecast_every_horizon()
+    test_auto_selection_records_chosen_model()
\ No newline at end of file
@@ -0,0 +1,56 @@
+import tempfile
+import numpy as np
+from backtest import synthetic_series
+from model_registry import fit_model, state_space_model
+from model_store import ModelStore, fit_with_store
+
+def make_series():
+    return list(synthetic_series(1, n_points=121, seed=3).values())[0]
+
+def test_extend_and_warm_start():
+    try:
+        series = make_series()
+        with tempfile.TemporaryDirectory() as state_dir:
+            store = ModelStore(state_dir)
+            _, _, entry = fit_with_store(series.iloc[:120], store.load('MEX_GDP'), 'ARIMA(1,1,1)')
+            assert entry['fit_kind'] == 'cold', f"First fit should be cold, got {entry['fit_kind']}"
+            store.save('MEX_GDP', entry)
+
+            # One new point: filter it from the stored state, no re-estimation
+            _, model_fit, extended = fit_with_store(series, store.load('MEX_GDP'), 'ARIMA(1,1,1)')
+            assert extended['fit_kind'] == 'extend' and extended['params'] == entry['params'], "Expected an extension"
+            reference = state_space_model('ARIMA(1,1,1)', series).filter(np.asarray(entry['params']))
+            assert np.allclose(model_fit.get_forecast(6).predicted_mean, reference.get_forecast(6).predicted_mean), \
+                "Extended forecast differs from a full filter with the same parameters"
+
+            # A revised history re-estimates, starting from the stored parameters
+            revised = series.copy()
+            revised.iloc[10] += 5
+            _, _, warm = fit_with_store(revised, store.load('MEX_GDP'), 'ARIMA(1,1,1)')
+            assert warm['fit_kind'] == 'warm', f"Revision should trigger a warm refit, got {warm['fit_kind']}"
+
+            # So does reaching the refit interval, and a different model is fit cold
+            assert fit_with_store(series, entry, 'ARIMA(1,1,1)', refit_every=1)[2]['fit_kind'] == 'warm', "Refit interval ignored"
+            assert fit_with_store(series, entry, 'ETS(A,N,N)')[2]['fit_kind'] == 'cold', "Model change should fit cold"
+        print("Model store test passed")
+    except Exception as e:
+        print(f"Model store test failed: {str(e)}")
+        raise
+
+def test_ets_extension_matches_refilter():
+    try:
+        series = make_series()
+        _, _, entry = fit_with_store(series.iloc[:118], None, 'ETS(A,Ad,N)')
+        _, model_fit, extended = fit_with_store(series, entry, 'ETS(A,Ad,N)')
+        assert extended['fit_kind'] == 'extend', f"Expected an extension, got {extended['fit_kind']}"
+        reference = fit_model('ETS(A,Ad,N)', series.iloc[:118])
+        refiltered = state_space_model('ETS(A,Ad,N)', series).filter(reference.params)
+        assert np.allclose(model_fit.get_forecast(3).predicted_mean, refiltered.get_forecast(3).predicted_mean), "ETS extension mismatch"
+        print("ETS extension test passed")
+    except Exception as e:
+        print(f"ETS extension test failed: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    test_extend_and_warm_start()
+    test_ets_extension_matches_refilter()
\ No newline at end of file
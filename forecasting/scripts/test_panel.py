@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+from panel import Panel
+
+def make_rows():
+    countries = pd.DataFrame({'country_code': ['MEX', 'USA', 'BRA']})
+    indicators = pd.DataFrame({'indicator_id': [1, 2], 'indicator_name': ['GDP', 'CPI']})
+    rows = pd.DataFrame({
+        'country_code': ['USA', 'MEX', 'MEX', 'MEX', 'USA', 'ZZZ'],
+        'indicator_id': [2, 1, 1, 1, 2, 1],
+        'date_value': pd.to_datetime(['2020-02-29', '2020-02-29', '2020-01-31', '2020-01-31', '2020-01-31', '2020-01-31']),
+        'value': [4.0, 3.0, 1.0, 2.0, np.nan, 9.0]
+    })
+    return countries, indicators, rows
+
+def test_panel_layout():
+    try:
+        countries, indicators, rows = make_rows()
+        panel = Panel.from_long(rows, countries, indicators)
+        # Only series with observations are stored; the unknown country and the NaN are dropped
+        assert len(panel) == 2 and len(panel.values) == 3, f"Unexpected layout: {len(panel)} series, {len(panel.values)} values"
+        mex_gdp = panel.get('MEX', 1)
+        assert list(mex_gdp.to_numpy()) == [1.5, 3.0], "Duplicate dates should be averaged and sorted"
+        assert panel.get('BRA', 2) is None, "Empty series should not be stored"
+        assert panel.label(panel.slot[('USA', 2)]) == 'USA_CPI', "Wrong legacy label"
+
+        wide = panel.to_wide()
+        assert list(wide.columns) == ['date_value', 'MEX_GDP', 'MEX_CPI', 'USA_GDP', 'USA_CPI', 'BRA_GDP', 'BRA_CPI'], \
+            f"Unexpected wide columns {list(wide.columns)}"
+        assert wide['USA_CPI'].tolist()[-1] == 4.0 and wide['BRA_GDP'].isna().all(), "Wide frame values wrong"
+        print("Panel layout test passed")
+    except Exception as e:
+        print(f"Panel layout test failed: {str(e)}")
+        raise
+
+def test_panel_regular():
+    try:
+        rng = np.random.default_rng(0)
+        countries = pd.DataFrame({'country_code': ['MEX', 'USA']})
+        indicators = pd.DataFrame({'indicator_id': [1, 2], 'indicator_name': ['GDP', 'CPI']})
+        # Monthly mid-month dates, quarter ends and year ends, each with random gaps
+        dates = {
+            ('MEX', 1): pd.date_range('2000-01-01', periods=40, freq='MS') + pd.Timedelta(days=14),
+            ('MEX', 2): pd.date_range('2001-03-31', periods=20, freq='QE'),
+            ('USA', 1): pd.date_range('1990-12-31', periods=15, freq='YE'),
+            ('USA', 2): pd.date_range('2005-02-28', periods=30, freq='ME')
+        }
+        frames = []
+        for (country_code, indicator_id), index in dates.items():
+            keep = np.r_[True, rng.random(len(index) - 2) > 0.2, True]
+            frames.append(pd.DataFrame({'country_code': country_code, 'indicator_id': indicator_id,
+                                        'date_value': index[keep], 'value': rng.normal(size=keep.sum())}))
+        rows = pd.concat(frames, ignore_index=True)
+        panel = Panel.from_long(rows, countries, indicators)
+        assert list(panel.frequencies()) == ['M', 'Q', 'A', 'M'], f"Wrong frequencies {list(panel.frequencies())}"
+
+        offsets = {'M': 'ME', 'Q': 'QE', 'A': 'YE'}
+        for frequency, group in panel.regular().items():
+            for k, position in enumerate(group.positions):
+                series = group.series(k)
+                expected = panel.series(position).resample(offsets[frequency]).mean().interpolate(method='linear')
+                assert series.index.equals(expected.index) and series.index.freq is not None, \
+                    f"{panel.label(position)}: index differs from resample"
+                assert np.allclose(series.to_numpy(), expected.to_numpy()), f"{panel.label(position)}: values differ from resample"
+        assert panel.regular() is panel.regular(), "Resampled groups should be cached"
+
+        rebuilt = Panel.from_wide(panel.to_wide(), countries, indicators)
+        assert np.array_equal(rebuilt.values, panel.values), "Wide frame should round-trip to the same panel"
+        print("Panel regular test passed")
+    except Exception as e:
+        print(f"Panel regular test failed: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    test_panel_layout()
+    test_panel_regular()
\ No newline at end of file
@@ -0,0 +1,78 @@
+import os
+import uuid
+import numpy as np
+import pandas as pd
+import pytest
+
+# Needs a Postgres with the migrations applied, e.g. DATABASE_URL=postgresql://postgres@/gp?host=/tmp/pgdata
+DATABASE_URL = os.getenv("DATABASE_URL")
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="DATABASE_URL is not set")
+
+def existing_key():
+    # forecast_results references the canonical tables, so reuse a key that exists there
+    from db_connect import get_pooled_connection
+    with get_pooled_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT country_code, indicator_id FROM canonical_timeseries LIMIT 1")
+        return cur.fetchone()
+
+def forecast_rows(country_code, indicator_id, run_id, value=1.0):
+    dates = pd.date_range('2030-01-31', periods=4, freq='ME').strftime('%Y-%m-%d')
+    return [{
+        'country_code': country_code, 'indicator_id': indicator_id, 'forecast_date': date,
+        'forecast_value': value + i, 'forecast_horizon': '1M', 'model_name': 'ARIMA(1,1,1)',
+        # Missing bounds arrive both as None and as NaN, and must both be stored as NULL
+        'confidence_interval_lower': None if i == 0 else value + i - 1,
+        'confidence_interval_upper': np.nan if i == 1 else value + i + 1,
+        'run_id': run_id
+    } for i, date in enumerate(dates)]
+
+def test_staged_upsert_is_idempotent():
+    import pg_bulk
+    run_id = f"test-{uuid.uuid4().hex[:8]}"
+    try:
+        country_code, indicator_id = existing_key()
+        columns = ['forecast_date', 'forecast_value', 'confidence_interval_lower', 'confidence_interval_upper']
+        query = f"SELECT {', '.join(columns)} FROM forecast_results WHERE run_id = %s ORDER BY forecast_date"
+
+        pg_bulk.write_forecasts(forecast_rows(country_code, indicator_id, run_id))
+        pg_bulk.write_forecasts(forecast_rows(country_code, indicator_id, run_id, value=5.0))
+        stored = pg_bulk.read_copy(query, columns, [run_id])
+        assert len(stored) == 4, f"Re-writing the run should update its rows, found {len(stored)}"
+        assert stored['forecast_value'].tolist() == [5.0, 6.0, 7.0, 8.0], "Upsert did not replace the values"
+        assert np.isnan(stored.loc[0, 'confidence_interval_lower']) and np.isnan(stored.loc[1, 'confidence_interval_upper']), \
+            "None and NaN should round-trip as missing"
+        assert stored['confidence_interval_lower'].notna().sum() == 3, "Present bounds were lost"
+
+        # The sink writes in batches and flushes the remainder on exit
+        with pg_bulk.PgForecastSink(run_id=run_id, batch_size=3) as sink:
+            sink.add([{k: v for k, v in row.items() if k != 'run_id'} for row in forecast_rows(country_code, indicator_id, run_id, 9.0)])
+            assert sink.written == 3, f"Expected one full batch written, got {sink.written}"
+        assert sink.written == 4 and len(pg_bulk.read_copy(query, columns, [run_id])) == 4
+        print("Staged upsert test passed")
+    except Exception as e:
+        print(f"Staged upsert test failed: {str(e)}")
+        raise
+    finally:
+        pg_bulk.delete_forecast_run(run_id)
+
+def test_load_timeseries_filters():
+    import pg_bulk
+    try:
+        full = pg_bulk.load_timeseries()
+        assert len(full) and full['date_value'].dtype.kind == 'M' and full['indicator_id'].dtype == 'int64', "Unexpected types"
+        country_code, indicator_id = full.iloc[0][['country_code', 'indicator_id']]
+        start, end = full['date_value'].quantile(0.25), full['date_value'].quantile(0.75)
+        filtered = pg_bulk.load_timeseries(countries=[country_code], indicators=[indicator_id], start_date=start, end_date=end)
+        expected = full[(full['country_code'] == country_code) & (full['indicator_id'] == indicator_id)
+                        & (full['date_value'] >= start.normalize()) & (full['date_value'] <= end.normalize())]
+        key = ['country_code', 'indicator_id', 'date_value', 'value']
+        assert len(filtered) and filtered.sort_values(key)[key].reset_index(drop=True).equals(expected.sort_values(key)[key].reset_index(drop=True)), \
+            "SQL filters differ from filtering the full load"
+        print("COPY load filters test passed")
+    except Exception as e:
+        print(f"COPY load filters test failed: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    test_staged_upsert_is_idempotent()
+    test_load_timeseries_filters()
\ No newline at end of file
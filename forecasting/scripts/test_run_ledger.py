@@ -0,0 +1,62 @@
+import sqlite3
+import tempfile
+import supabase_client
+from fake_supabase import FakeSupabase, FlakyClient
+from fetch_data import fetch_validated_data
+from forecast_data import forecast_data
+from preprocess_data import preprocess_panel
+from synthetic_data import generate_canonical
+
+def ledger_series(state_dir):
+    db = sqlite3.connect(f"{state_dir}/runs/test-run.sqlite")
+    try:
+        return {key: (status, attempt) for key, status, attempt in db.execute("SELECT series_key, status, attempt FROM series")}
+    finally:
+        db.close()
+
+def test_resume_after_failed_write():
+    previous = supabase_client._client
+    try:
+        client = FakeSupabase(generate_canonical(countries=3, indicators=4, years=3, seed=2))
+        supabase_client.set_client(client)
+        countries, indicators, timeseries = fetch_validated_data(use_cache=False, backend='rest')
+        panel = preprocess_panel(countries, indicators, timeseries)
+
+        with tempfile.TemporaryDirectory() as state_dir:
+            options = dict(state_dir=state_dir, run_id='test-run', batch_size=10, backend='rest', engine='batched')
+            supabase_client.set_client(FlakyClient(client, fail_after=2))
+            try:
+                forecast_data(panel, countries, indicators, **options)
+                raise AssertionError("The third write should have failed the run")
+            except ConnectionError:
+                pass
+            first_attempt = {key: status for key, (status, _) in ledger_series(state_dir).items()}
+            assert 'written' in first_attempt.values() and len(first_attempt) < len(panel), \
+                f"Expected a partial checkpoint, got {first_attempt}"
+
+            supabase_client.set_client(client)
+            try:
+                forecast_data(panel, countries, indicators, **{**options, 'model': 'auto'}, resume=True)
+                raise AssertionError("Resuming with a different model should be refused")
+            except ValueError:
+                pass
+            results = forecast_data(panel, countries, indicators, **options, resume=True)
+
+            series = ledger_series(state_dir)
+            assert all(status == 'written' for status, _ in series.values()), f"Unwritten series after resume: {series}"
+            # Checkpointed series keep the attempt that fitted them; only the rest were fitted again
+            assert all(series[key][1] == 1 for key in first_attempt), "Checkpointed series were refitted"
+            assert sum(attempt == 2 for _, attempt in series.values()) == len(series) - len(first_attempt)
+
+            stored = client.frame("forecast_results")
+            assert len(stored) == len(results) == 3 * len(series), f"Stored {len(stored)} rows, returned {len(results)}"
+            assert not stored.duplicated(['country_code', 'indicator_id', 'forecast_horizon']).any(), "Duplicate forecast rows"
+        print("Resume test passed")
+    except Exception as e:
+        print(f"Resume test failed: {str(e)}")
+        raise
+    finally:
+        supabase_client.set_client(previous)
+
+if __name__ == "__main__":
+    test_resume_after_failed_write()
\ No newline at end of file
@@ -0,0 +1,61 @@
+import pandas as pd
+from map_taxonomy import build_mappings, diff_mappings, label_indicators
+
+CATEGORY_MAP = {'Growth': 1, 'Prices': 2, 'Labor': 3, 'Trade': 4, 'Sentiment': 5}
+
+def make_inputs():
+    countries = pd.DataFrame({'country_code': ['MEX', 'USA']})
+    indicators = pd.DataFrame({
+        'indicator_id': [1, 2, 3, 4],
+        'indicator_name': ['GDP', 'Real GDP growth', 'Import price index', 'Population']
+    })
+    dates = pd.date_range('2020-01-31', periods=4, freq='ME')
+    timeseries = pd.DataFrame({
+        'country_code': ['MEX'] * 4 + ['USA'] * 4 + ['USA'] * 2,
+        'indicator_id': [1] * 4 + [2] * 4 + [1] * 2,
+        'date_value': list(dates) + list(dates) + list(dates[:2]),
+        'value': 1.0
+    })
+    return countries, indicators, timeseries
+
+def test_keyword_priority():
+    try:
+        labelled = label_indicators(make_inputs()[1]).set_index('indicator_id')
+        assert list(labelled.index) == [1, 2, 3], f"Unexpected matches: {list(labelled.index)}"
+        # 'price index' (Prices) outranks 'import' (Trade) even though 'import' comes first in the name
+        assert labelled.loc[3, 'category_name'] == 'Prices', "Rule priority not respected"
+        assert labelled.loc[2, 'keyword'] == 'gdp', "First keyword in rule order should win"
+        print("Keyword priority test passed")
+    except Exception as e:
+        print(f"Keyword priority test failed: {str(e)}")
+        raise
+
+def test_ranked_mappings_and_diff():
+    try:
+        countries, indicators, timeseries = make_inputs()
+        mappings = build_mappings(countries, indicators, CATEGORY_MAP, timeseries)
+        assert len(mappings) == 6, f"Expected 6 mappings, found {len(mappings)}"
+        assert not mappings.duplicated(['country_code', 'category_id', 'rank']).any(), "Unique key violated"
+
+        usa_growth = mappings[(mappings['country_code'] == 'USA') & (mappings['category_id'] == 1)].set_index('indicator_id')
+        assert usa_growth.loc[2, 'coverage_ratio'] == 1.0 and usa_growth.loc[1, 'coverage_ratio'] == 0.5, "Wrong coverage"
+        assert usa_growth.loc[2, 'is_primary'] and usa_growth.loc[2, 'rank'] == 1, "Best-covered indicator should be primary"
+
+        stored = mappings.copy()
+        stored['mapping_id'] = range(1, len(stored) + 1)
+        upserts, stale_ids = diff_mappings(mappings, stored)
+        assert upserts == [] and stale_ids == [], "Unchanged mappings should produce no writes"
+
+        changed = mappings.copy()
+        changed.loc[0, 'coverage_ratio'] = 0.25
+        upserts, stale_ids = diff_mappings(changed.iloc[:5], stored)
+        assert len(upserts) == 1 and upserts[0]['coverage_ratio'] == 0.25, f"Expected one changed row, found {upserts}"
+        assert stale_ids == [6], f"Expected the dropped key to be deleted, found {stale_ids}"
+        print("Ranked mappings and diff test passed")
+    except Exception as e:
+        print(f"Ranked mappings and diff test failed: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    test_keyword_priority()
+    test_ranked_mappings_and_diff()
\ No newline at end of file
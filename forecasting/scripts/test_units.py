@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+from units import standardize_units
+
+def make_units():
+    # Known, unknown and missing units, with one category that never occurs
+    units = pd.Series(['USD Billion', 'Percent', 'Index', None, 'USD Million', 'Index'], dtype=object)
+    categorical = units.astype(pd.CategoricalDtype(['Index', 'Percent', 'Tonnes', 'USD Billion', 'USD Million']))
+    return units, categorical
+
+def test_standardize_units():
+    try:
+        values = np.array([2.0, 3.5, 100.0, 7.0, 4.0, 50.0])
+        units, categorical = make_units()
+        expected = np.array([2e9, 3.5, 100.0, 7.0, 4e6, 50.0])
+
+        standardized, unknown_units = standardize_units(values, units)
+        assert np.array_equal(standardized, expected), f"Unexpected values {standardized}"
+        assert unknown_units == {'Index': 2, '<missing>': 1}, f"Unexpected unknown units {unknown_units}"
+
+        # Categorical input, as from lean preprocessing, gives the same result; unused categories are not reported
+        standardized, unknown_units = standardize_units(pd.Series(values), categorical)
+        assert np.array_equal(standardized, expected), "Categorical units standardized differently"
+        assert unknown_units == {'Index': 2, '<missing>': 1}, f"Unexpected unknown units {unknown_units}"
+
+        standardized, unknown_units = standardize_units(values[:2], units[:2])
+        assert unknown_units == {} and np.array_equal(standardized, expected[:2]), "Known units should all be scaled"
+        print("Standardize units test passed")
+    except Exception as e:
+        print(f"Standardize units test failed: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    test_standardize_units()
\ No newline at end of file
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+from validation import StreamingValidator
+
+class InsertRecorder:
+    def __init__(self):
+        self.inserts = []
+
+    def table(self, name):
+        self.name = name
+        return self
+
+    def insert(self, rows):
+        self.inserts.append((self.name, rows))
+        return self
+
+    def execute(self):
+        return self
+
+def make_frames():
+    countries = pd.DataFrame({'country_code': ['MEX', 'USA', 'usa'], 'country_name': ['Mexico', 'United States', None]})
+    indicators = pd.DataFrame({'indicator_id': [1, 2], 'indicator_name': ['GDP', 'CPI']})
+    dates = pd.date_range('2020-01-31', periods=40, freq='ME')
+    rng = np.random.default_rng(0)
+    frames = []
+    for country_code in ['MEX', 'USA']:
+        for indicator_id, unit in [(1, 'USD Billion'), (2, 'Percent')]:
+            frames.append(pd.DataFrame({
+                'country_code': country_code, 'indicator_id': indicator_id, 'date_value': dates,
+                'value': 100 + rng.normal(0, 1, len(dates)), 'unit': unit, 'vintage_date': pd.Series(pd.NaT, index=range(len(dates)), dtype='datetime64[ns]')
+            }))
+    timeseries = pd.concat(frames, ignore_index=True)
+    timeseries.loc[5, 'value'] = np.nan                         # null value
+    timeseries.loc[50, 'value'] = 10_000.0                      # outlier in MEX/2
+    timeseries.loc[90, 'unit'] = 'USD Million'                  # mixed units in USA/1
+    timeseries.loc[130, 'unit'] = 'Furlongs'                    # unknown unit in USA/2
+    timeseries.loc[131, 'date_value'] = pd.Timestamp('2099-01-31')
+    extra = timeseries.iloc[[10, 11, 12]].copy()
+    extra.loc[extra.index[0], 'vintage_date'] = pd.Timestamp('2021-01-01')  # a new vintage, not a duplicate
+    extra.loc[extra.index[2], 'country_code'] = 'BRA'                       # not in canonical_countries
+    timeseries = pd.concat([timeseries, extra], ignore_index=True)        # row 11 duplicated, across the chunk split
+    return countries, indicators, timeseries
+
+def run(chunk_size, page_size=None):
+    countries, indicators, timeseries = make_frames()
+    validator = StreamingValidator(today='2026-01-01', chunk_size=chunk_size)
+    validator.check_countries(countries)
+    validator.check_indicators(indicators)
+    if page_size is None:
+        validator.update_frame(timeseries)
+    else:
+        # As fetched over REST: small pages, buffered up to chunk_size
+        for start in range(0, len(timeseries), page_size):
+            validator.update(timeseries.iloc[start:start + page_size])
+    return validator
+
+def test_rules_flag_each_problem():
+    try:
+        results = {(r['table_name'], r['validation_rule']): r for r in run(chunk_size=37).results()}
+        failed = {key: r['error_message'] for key, r in results.items() if not r['is_valid']}
+        expected = {
+            ('canonical_countries', 'non_null_fields'), ('canonical_countries', 'valid_country_code_format'),
+            ('canonical_timeseries', 'non_null_fields'), ('canonical_timeseries', 'no_future_dates'),
+            ('canonical_timeseries', 'no_duplicate_records'), ('canonical_timeseries', 'valid_country_code_fk'),
+            ('canonical_timeseries', 'unit_consistency'), ('canonical_timeseries', 'no_outliers')
+        }
+        assert set(failed) == expected, f"Unexpected failures: {sorted(set(failed) ^ expected)}"
+        assert "(1 found in 163 rows)" in failed[('canonical_timeseries', 'no_duplicate_records')], failed
+        assert "(2 found in 163 rows)" in failed[('canonical_timeseries', 'unit_consistency')], failed
+        assert "MEX/2" in failed[('canonical_timeseries', 'no_outliers')], failed
+        assert all(r['record_count'] == 163 for key, r in results.items() if key[0] == 'canonical_timeseries'), "Row counts differ"
+        print("Validation rules test passed")
+    except Exception as e:
+        print(f"Validation rules test failed: {str(e)}")
+        raise
+
+def test_chunking_does_not_change_results():
+    try:
+        def verdicts(validator):
+            return [(r['validation_rule'], r['is_valid'], r['error_message'], r['record_count']) for r in validator.results()]
+        whole = verdicts(run(chunk_size=10_000))
+        assert verdicts(run(chunk_size=7)) == whole, "Chunked and whole-frame results differ"
+        assert verdicts(run(chunk_size=40, page_size=9)) == whole, "Paged results differ"
+
+        recorder = InsertRecorder()
+        rows = run(chunk_size=50).write(backend="rest", client=recorder)
+        assert len(recorder.inserts) == 1 and recorder.inserts[0][0] == "validation_log", "Expected one bulk insert"
+        assert recorder.inserts[0][1] == rows and len(rows) == 13, f"Unexpected rows: {len(rows)}"
+        print("Chunked validation test passed")
+    except Exception as e:
+        print(f"Chunked validation test failed: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    test_rules_flag_each_problem()
+    test_chunking_does_not_change_results()
\ No newline at end of file
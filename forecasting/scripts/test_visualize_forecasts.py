@@ -0,0 +1,76 @@
+import os
+import tempfile
+import matplotlib
+import matplotlib.pyplot as plt
+import pandas as pd
+from fake_supabase import FakeSupabase
+from supabase_client import set_client
+from visualize_forecasts import fetch_forecasts, render_forecasts
+
+def make_client():
+    indicators = pd.DataFrame({'indicator_id': [1, 2], 'indicator_name': ['GDP', 'CPI']})
+    forecasts = []
+    # Two runs of every series; the later one is what latest_forecasts holds
+    for run_id, level in [('old', 50.0), ('new', 100.0)]:
+        for country_code in ['MEX', 'USA']:
+            for indicator_id in [1, 2]:
+                for step, (horizon, date) in enumerate(zip(['1M', '3M', '6M'], ['2024-01-31', '2024-03-31', '2024-06-30'])):
+                    forecasts.append({
+                        'forecast_id': len(forecasts) + 1, 'country_code': country_code, 'indicator_id': indicator_id,
+                        'forecast_date': date, 'forecast_value': level + step, 'forecast_horizon': horizon,
+                        'model_name': 'ARIMA(1,1,1)', 'confidence_interval_lower': level + step - 5,
+                        'confidence_interval_upper': level + step + 5, 'run_id': run_id
+                    })
+    forecasts = pd.DataFrame(forecasts)
+    return FakeSupabase({'canonical_indicators': indicators, 'forecast_results': forecasts,
+                         'latest_forecasts': forecasts[forecasts['run_id'] == 'new']})
+
+def test_fetch_exact_pairs_of_latest_run():
+    try:
+        client = make_client()
+        df = fetch_forecasts(client, [('MEX', 1), ('USA', 2)])
+        # Only the requested pairs, not the MEX/USA x GDP/CPI block, and only the latest run
+        assert sorted(set(zip(df['country_code'], df['indicator_id']))) == [('MEX', 1), ('USA', 2)], "Unrequested pairs fetched"
+        assert len(df) == 6 and df['forecast_value'].min() >= 100.0, "Older runs were fetched"
+        old = fetch_forecasts(client, [('MEX', 1)], run_id='old')
+        assert old['forecast_value'].tolist() == [50.0, 51.0, 52.0], "A named run should read forecast_results"
+        assert len(fetch_forecasts(client)) == 12, "Without pairs every latest series should be read"
+        print("Fetch forecasts test passed")
+    except Exception as e:
+        print(f"Fetch forecasts test failed: {str(e)}")
+        raise
+
+def test_batch_render_skips_unchanged():
+    try:
+        client = make_client()
+        set_client(client)
+        backend = matplotlib.get_backend()
+        with tempfile.TemporaryDirectory() as output_dir:
+            rendered = render_forecasts([('MEX', 'GDP'), ('USA', 'CPI')], output_dir=output_dir, workers=1)
+            # Rendering in-process leaves no figure open and the caller's backend as it was
+            assert plt.get_fignums() == [] and matplotlib.get_backend() == backend, "In-process render leaked state"
+            assert sorted(os.path.basename(p) for p in rendered) == ['forecast_MEX_GDP.png', 'forecast_USA_CPI.png'], \
+                f"Unexpected charts: {rendered}"
+            assert len(os.listdir(output_dir)) == 3, f"Unexpected files: {os.listdir(output_dir)}"
+
+            assert render_forecasts([('MEX', 'GDP'), ('USA', 'CPI')], output_dir=output_dir, workers=1) == [], \
+                "Unchanged series were re-rendered"
+
+            latest = client.frame('latest_forecasts').copy()
+            latest.loc[latest.index[0], 'forecast_value'] = 42.0
+            client.replace('latest_forecasts', latest)
+            rendered = render_forecasts([('MEX', 'GDP'), ('USA', 'CPI')], output_dir=output_dir, workers=1)
+            assert [os.path.basename(p) for p in rendered] == ['forecast_MEX_GDP.png'], "Changed series not re-rendered"
+
+            rendered = render_forecasts(output_dir=output_dir, workers=1)
+            assert len(rendered) == 2, f"Every series should render once, the two new ones now: {rendered}"
+        print("Batch render test passed")
+    except Exception as e:
+        print(f"Batch render test failed: {str(e)}")
+        raise
+    finally:
+        set_client(None)
+
+if __name__ == "__main__":
+    test_fetch_exact_pairs_of_latest_run()
+    test_batch_render_skips_unchanged()
\ No newline at end of file
@@ -0,0 +1,100 @@
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+from fetch_data import fetch_validated_data
+from forecast_data import build_tasks
+from preprocess_data import preprocess_panel
+
+# Needs a Postgres with the migrations applied (up to 013), e.g. DATABASE_URL=postgresql://postgres@/gp?host=/tmp/pgdata
+DATABASE_URL = os.getenv("DATABASE_URL")
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="DATABASE_URL is not set")
+
+def make_panel():
+    # Forecast rows reference the canonical tables, so work from the series already in the database
+    countries, indicators, timeseries = fetch_validated_data(use_cache=False, backend='postgres')
+    panel = preprocess_panel(countries, indicators, timeseries)
+    return panel, countries, indicators, len(list(build_tasks(panel, countries, indicators)))
+
+def cleanup(run_id):
+    import pg_bulk
+    from db_connect import get_pooled_connection
+    with get_pooled_connection() as conn, conn.cursor() as cur:
+        cur.execute("DELETE FROM forecast_tasks WHERE run_id = %s", (run_id,))
+    pg_bulk.delete_forecast_run(run_id)
+
+def task_rows(run_id):
+    from db_connect import get_pooled_connection
+    with get_pooled_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT status, attempts, worker_id FROM forecast_tasks WHERE run_id = %s ORDER BY task_id", (run_id,))
+        tasks = cur.fetchall()
+        cur.execute("SELECT COUNT(*) FROM forecast_results WHERE run_id = %s", (run_id,))
+        return tasks, cur.fetchone()[0]
+
+def test_workers_drain_queue():
+    from work_queue import enqueue_run, run_worker
+    run_id = f"test-{uuid.uuid4().hex[:8]}"
+    try:
+        panel, countries, indicators, n_series = make_panel()
+        assert n_series >= 2, "The database needs at least two forecastable series"
+        _, added = enqueue_run(panel, countries, indicators, run_id=run_id, engine='batched', task_size=1)
+        assert added == n_series, f"Expected one task per series, added {added} for {n_series}"
+        _, added = enqueue_run(panel, countries, indicators, run_id=run_id, engine='batched', task_size=1)
+        assert added == 0, "Enqueueing the same run twice should add nothing"
+
+        # Two competing workers in their own processes, as on separate nodes
+        with ProcessPoolExecutor(2, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [executor.submit(run_worker, run_id=run_id, worker_id=f"worker-{i}", poll_seconds=0.2) for i in range(2)]
+            stats = [future.result() for future in futures]
+
+        tasks, stored = task_rows(run_id)
+        assert [status for status, _, _ in tasks] == ['done'] * n_series, f"Unfinished tasks: {tasks}"
+        assert all(attempts == 1 for _, attempts, _ in tasks), "A task was claimed twice"
+        assert sum(s['done'] for s in stats) == n_series == sum(s['series'] for s in stats), f"Worker stats {stats}"
+        assert stored == 3 * n_series, f"Expected {3 * n_series} forecast rows, found {stored}"
+        print("Work queue drain test passed")
+    except Exception as e:
+        print(f"Work queue drain test failed: {str(e)}")
+        raise
+    finally:
+        cleanup(run_id)
+
+def test_lease_expiry_and_retry_limit():
+    from db_connect import get_db_connection
+    from work_queue import Heartbeat, claim_task, complete_task, enqueue_run, fail_task
+    run_id = f"test-{uuid.uuid4().hex[:8]}"
+    try:
+        panel, countries, indicators, n_series = make_panel()
+        enqueue_run(panel, countries, indicators, run_id=run_id, task_size=100, max_attempts=2)
+        with get_db_connection() as conn:
+            task = claim_task(conn, 'a', run_id, lease_seconds=1)
+            assert task is not None and task['attempts'] == 1 and len(task['payload']['series']) == n_series
+            # Heartbeats keep the lease alive past its original expiry
+            with Heartbeat(task, 'a', lease_seconds=1, interval=0.2) as heartbeat:
+                time.sleep(1.5)
+                assert claim_task(conn, 'b', run_id) is None, "A renewed task was claimed by another worker"
+            assert not heartbeat.lost
+
+            # Without them the lease runs out and the task is claimed again
+            time.sleep(1.2)
+            retried = claim_task(conn, 'b', run_id, lease_seconds=60)
+            assert retried is not None and retried['task_id'] == task['task_id'] and retried['attempts'] == 2
+            assert not complete_task(conn, task, 'a', {'rows': 0}), "The first worker should have lost the task"
+
+            # Failing on the last attempt fails the task for good
+            fail_task(conn, retried, 'b', "fit crashed")
+            assert claim_task(conn, 'c', run_id) is None, "A task out of attempts was claimed"
+        tasks, _ = task_rows(run_id)
+        assert tasks == [('failed', 2, None)], f"Unexpected task state {tasks}"
+        print("Work queue lease test passed")
+    except Exception as e:
+        print(f"Work queue lease test failed: {str(e)}")
+        raise
+    finally:
+        cleanup(run_id)
+
+if __name__ == "__main__":
+    test_workers_drain_queue()
+    test_lease_expiry_and_retry_limit()
\ No newline at end of file
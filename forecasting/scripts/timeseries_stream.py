@@ -0,0 +1,127 @@
+import pandas as pd
+from as_of import as_of_param
+
+TIMESERIES_COLUMNS = ["country_code", "indicator_id", "date_value", "value", "unit"]
+# Sort key for keyset pagination; id breaks ties between vintages of the same date
+KEYSET_COLUMNS = ["country_code", "indicator_id", "date_value", "id"]
+DEFAULT_PAGE_SIZE = 1000
+
+def keyset_filter(last_row):
+    """PostgREST or-filter selecting rows strictly after last_row in keyset order."""
+    country_code = last_row['country_code']
+    indicator_id = last_row['indicator_id']
+    date_value = last_row['date_value']
+    row_id = last_row['id']
+    return ",".join([
+        f"country_code.gt.{country_code}",
+        f"and(country_code.eq.{country_code},indicator_id.gt.{indicator_id})",
+        f"and(country_code.eq.{country_code},indicator_id.eq.{indicator_id},date_value.gt.{date_value})",
+        f"and(country_code.eq.{country_code},indicator_id.eq.{indicator_id},date_value.eq.{date_value},id.gt.{row_id})"
+    ])
+
+def to_typed_frame(rows, columns):
+    chunk = pd.DataFrame(rows, columns=columns)
+    if 'indicator_id' in chunk:
+        chunk['indicator_id'] = chunk['indicator_id'].astype('int64')
+    if 'date_value' in chunk:
+        chunk['date_value'] = pd.to_datetime(chunk['date_value'])
+    if 'value' in chunk:
+        chunk['value'] = pd.to_numeric(chunk['value']).astype('float64')
+    return chunk
+
+def iter_timeseries(client, columns=None, countries=None, indicators=None, start_date=None, end_date=None, ingested_after=None, page_size=DEFAULT_PAGE_SIZE):
+    """Stream canonical_timeseries as typed DataFrame chunks of at most page_size rows.
+
+    Pages are fetched with keyset pagination on (country_code, indicator_id,
+    date_value, id), so no page is skipped or truncated by PostgREST row limits
+    and only one page is held in memory at a time.
+    """
+    columns = list(columns or TIMESERIES_COLUMNS)
+    select_columns = columns + [c for c in KEYSET_COLUMNS if c not in columns]
+    last_row = None
+
+    while True:
+        query = client.table("canonical_timeseries").select(", ".join(select_columns))
+        if countries is not None:
+            query = query.in_("country_code", list(countries))
+        if indicators is not None:
+            query = query.in_("indicator_id", [int(i) for i in indicators])
+        if start_date is not None:
+            query = query.gte("date_value", pd.Timestamp(start_date).strftime('%Y-%m-%d'))
+        if end_date is not None:
+            query = query.lte("date_value", pd.Timestamp(end_date).strftime('%Y-%m-%d'))
+        if ingested_after is not None:
+            query = query.gt("ingested_at", ingested_after)
+        if last_row is not None:
+            query = query.or_(keyset_filter(last_row))
+        for column in KEYSET_COLUMNS:
+            query = query.order(column)
+
+        rows = query.limit(page_size).execute().data
+        # Stop on an empty page rather than a short one: the server may cap page size
+        if not rows:
+            break
+        last_row = rows[-1]
+        yield to_typed_frame(rows, select_columns)[columns]
+
+def fetch_table(client, table, columns, key, updated_after=None, page_size=DEFAULT_PAGE_SIZE):
+    """Fetch a small dimension table in full (or rows changed since updated_after), paging on its primary key."""
+    frames = []
+    last_key = None
+    while True:
+        query = client.table(table).select(", ".join(columns))
+        if updated_after is not None:
+            query = query.gt("updated_at", updated_after)
+        if last_key is not None:
+            query = query.gt(key, last_key)
+        rows = query.order(key).limit(page_size).execute().data
+        if not rows:
+            break
+        last_key = rows[-1][key]
+        frames.append(pd.DataFrame(rows, columns=columns))
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+def iter_timeseries_as_of(client, as_of='latest', columns=None, countries=None, indicators=None, start_date=None, end_date=None, page_size=DEFAULT_PAGE_SIZE):
+    """Stream the latest vintage at or before as_of for every point, chosen in the database.
+
+    Calls the timeseries_as_of function (migration 011) over RPC, paging with its
+    keyset cursor on (country_code, indicator_id, date_value).
+    """
+    columns = list(columns or TIMESERIES_COLUMNS)
+    params = {
+        'p_as_of': as_of_param(as_of),
+        'p_countries': list(countries) if countries is not None else None,
+        'p_indicators': [int(i) for i in indicators] if indicators is not None else None,
+        'p_start_date': pd.Timestamp(start_date).strftime('%Y-%m-%d') if start_date is not None else None,
+        'p_end_date': pd.Timestamp(end_date).strftime('%Y-%m-%d') if end_date is not None else None,
+        'p_limit': page_size
+    }
+    while True:
+        rows = client.rpc("timeseries_as_of", params).execute().data
+        if not rows:
+            break
+        last_row = rows[-1]
+        params.update(p_after_country=last_row['country_code'], p_after_indicator=last_row['indicator_id'],
+                      p_after_date=last_row['date_value'])
+        yield to_typed_frame(rows, columns)
+
+def read_timeseries(client, as_of=None, on_chunk=None, **filters):
+    """Collect iter_timeseries into one frame (empty, but typed, when nothing matches).
+
+    With as_of (a date or 'latest') only the vintage known at that date is read.
+    on_chunk, if given, sees every chunk as it arrives (e.g. StreamingValidator.update).
+    """
+    if as_of is not None:
+        chunks = iter_timeseries_as_of(client, as_of=as_of, **filters)
+    else:
+        chunks = iter_timeseries(client, **filters)
+    frames = []
+    for chunk in chunks:
+        if on_chunk is not None:
+            on_chunk(chunk)
+        frames.append(chunk)
+    if not frames:
+        return to_typed_frame([], list(filters.get('columns') or TIMESERIES_COLUMNS))
+    return pd.concat(frames, ignore_index=True)
\ No newline at end of file
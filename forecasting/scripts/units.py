@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+# Multiplier that converts a value in the given unit to base units
+UNIT_MULTIPLIERS = {
+    'USD Billion': 1e9,
+    'Percent': 1,
+    'USD Million': 1e6
+}
+
+def unit_multipliers(units, unit_map=UNIT_MULTIPLIERS):
+    """Map a unit column to a multiplier array; unknown or missing units come back as NaN."""
+    categorical = pd.Categorical(units)
+    category_multipliers = pd.Series(categorical.categories, dtype=object).map(unit_map).to_numpy(dtype='float64')
+    # Missing units have code -1, which picks the trailing NaN
+    lookup = np.append(category_multipliers, np.nan)
+    return lookup[categorical.codes], categorical
+
+def standardize_units(values, units, unit_map=UNIT_MULTIPLIERS):
+    """Scale values to base units in one vectorized pass.
+
+    Returns the standardized array and a {unit: row_count} report of units that
+    had no multiplier. Those rows are left unscaled, as before, but no longer silently.
+    """
+    multipliers, categorical = unit_multipliers(units, unit_map)
+    unknown_mask = np.isnan(multipliers)
+
+    unknown_units = {}
+    if unknown_mask.any():
+        unknown = pd.Series(categorical[unknown_mask]).astype(object).fillna('<missing>')
+        unknown_units = unknown.value_counts().to_dict()
+        multipliers = np.where(unknown_mask, 1.0, multipliers)
+
+    standardized = np.asarray(values, dtype='float64') * multipliers
+    return standardized, unknown_units
\ No newline at end of file
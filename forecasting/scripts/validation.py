@@ -0,0 +1,241 @@
+import os
+import time
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from units import UNIT_MULTIPLIERS
+
+ISO3_PATTERN = r'^[A-Z]{3}$'
+TIMESERIES_REQUIRED = ["country_code", "indicator_id", "date_value", "value"]
+# A series value further than this many standard deviations from its series mean is an outlier
+OUTLIER_Z = 6.0
+# Rows checked per vectorized pass: small fetch pages are buffered up to this,
+# frames that arrive whole (cache and postgres backends) are sliced to it
+VALIDATION_CHUNK_SIZE = 100_000
+
+class RuleResult:
+    """Running totals for one validation rule: rows checked, rows failing and time spent."""
+
+    def __init__(self, table_name, rule, validation_type, message):
+        self.table_name = table_name
+        self.rule = rule
+        self.validation_type = validation_type
+        self.message = message
+        self.checked = 0
+        self.failed = 0
+        self.seconds = 0.0
+        self.detail = None
+
+    def add(self, checked, failed, seconds):
+        self.checked += int(checked)
+        self.failed += int(failed)
+        self.seconds += seconds
+
+    def row(self, validated_at):
+        error_message = None
+        if self.failed:
+            error_message = f"{self.message} ({self.failed} found in {self.checked} rows)"
+            if self.detail:
+                error_message += f": {self.detail}"
+        return {
+            'table_name': self.table_name,
+            'validation_rule': self.rule,
+            'validation_type': self.validation_type,
+            'is_valid': self.failed == 0,
+            'error_message': error_message,
+            'record_count': self.checked,
+            'validated_at': validated_at,
+            'execution_time_ms': int(self.seconds * 1000)
+        }
+
+class StreamingValidator:
+    """The checks of validate_canonical_* (migration 004), run on the frames the pipeline already holds.
+
+    Dimension tables are checked whole; canonical_timeseries is checked chunk by
+    chunk as it is fetched. Per-chunk checks are vectorized; checks that span
+    chunks keep only small per-chunk summaries, reduced once at the end: 64-bit
+    key hashes for duplicates, row counts per (series, unit), and
+    count/sum/sum of squares/min/max per series for outliers. results() turns
+    the totals into validation_log rows.
+    """
+
+    def __init__(self, unit_map=UNIT_MULTIPLIERS, outlier_z=OUTLIER_Z, today=None, chunk_size=VALIDATION_CHUNK_SIZE):
+        self.known_units = set(unit_map)
+        self.chunk_size = chunk_size
+        self.pending = []
+        self.pending_rows = 0
+        self.outlier_z = outlier_z
+        self.today = pd.Timestamp(today or datetime.now().date())
+        self.rules = {}
+        self.country_codes = None
+        self.indicator_ids = None
+        self.key_hashes = []
+        self.unit_counts = []
+        self.series_stats = []
+
+    def rule(self, table_name, rule, validation_type, message):
+        key = (table_name, rule)
+        if key not in self.rules:
+            self.rules[key] = RuleResult(table_name, rule, validation_type, message)
+        return self.rules[key]
+
+    def check(self, table_name, rule, validation_type, message, checked, failing):
+        """Time failing() and add its count of failing rows to the rule's totals."""
+        start = time.perf_counter()
+        failed = failing()
+        self.rule(table_name, rule, validation_type, message).add(checked, failed, time.perf_counter() - start)
+
+    def check_countries(self, countries):
+        table = 'canonical_countries'
+        n = len(countries)
+        self.check(table, 'non_null_fields', 'completeness', 'Null values found in country_code or country_name', n,
+                   lambda: (countries['country_code'].isna() | countries['country_name'].isna()).sum())
+        self.check(table, 'unique_country_code', 'completeness', 'Duplicate country_code found', n,
+                   lambda: countries['country_code'].duplicated().sum())
+        self.check(table, 'valid_country_code_format', 'format',
+                   'Invalid country_code format (must be 3-letter ISO 3166-1 alpha-3)', n,
+                   lambda: (~countries['country_code'].str.fullmatch(ISO3_PATTERN).fillna(False).astype(bool)).sum())
+        self.country_codes = pd.Index(countries['country_code'].dropna().unique())
+
+    def check_indicators(self, indicators):
+        table = 'canonical_indicators'
+        n = len(indicators)
+        self.check(table, 'non_null_indicator_name', 'completeness', 'Null indicator_name found', n,
+                   lambda: indicators['indicator_name'].isna().sum())
+        self.check(table, 'unique_indicator_name', 'completeness', 'Duplicate indicator_name found', n,
+                   lambda: indicators['indicator_name'].dropna().duplicated().sum())
+        self.indicator_ids = pd.Index(indicators['indicator_id'].dropna().astype('int64').unique())
+
+    def update(self, chunk):
+        """Take one canonical_timeseries chunk as it is fetched.
+
+        Fetch pages are small and pandas has a fixed cost per call, so pages are
+        buffered and checked chunk_size rows at a time.
+        """
+        self.pending.append(chunk)
+        self.pending_rows += len(chunk)
+        if self.pending_rows >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            chunk = self.pending[0] if len(self.pending) == 1 else pd.concat(self.pending, ignore_index=True)
+            self.pending, self.pending_rows = [], 0
+            self.check_chunk(chunk)
+
+    def check_chunk(self, chunk):
+        """Check a block of canonical_timeseries rows and fold it into the running totals."""
+        table = 'canonical_timeseries'
+        n = len(chunk)
+        if n == 0:
+            return
+        codes = chunk['country_code']
+        self.check(table, 'non_null_fields', 'completeness',
+                   'Null values found in country_code, indicator_id, date_value, or value', n,
+                   lambda: chunk[TIMESERIES_REQUIRED].isna().any(axis=1).sum())
+        self.check(table, 'valid_country_code_format', 'format',
+                   'Invalid country_code format (must be 3-letter ISO 3166-1 alpha-3)', n,
+                   lambda: (~codes.str.fullmatch(ISO3_PATTERN).fillna(False).astype(bool)).sum())
+        self.check(table, 'no_future_dates', 'format', 'Future date_value found', n,
+                   lambda: (pd.to_datetime(chunk['date_value']) > self.today).sum())
+        if self.country_codes is not None:
+            self.check(table, 'valid_country_code_fk', 'referential_integrity', 'Invalid country_code foreign key', n,
+                       lambda: (~codes.isin(self.country_codes)).sum())
+        if self.indicator_ids is not None:
+            self.check(table, 'valid_indicator_id_fk', 'referential_integrity', 'Invalid indicator_id foreign key', n,
+                       lambda: (~chunk['indicator_id'].isin(self.indicator_ids)).sum())
+
+        # Duplicates can straddle chunks, so only hash the keys here and count at the end
+        start = time.perf_counter()
+        key_columns = [c for c in ["country_code", "indicator_id", "date_value", "vintage_date"] if c in chunk]
+        self.key_hashes.append(pd.util.hash_pandas_object(chunk[key_columns], index=False).to_numpy())
+        self.rule(table, 'no_duplicate_records', 'completeness',
+                  f"Duplicate records found for ({', '.join(key_columns)})").add(n, 0, time.perf_counter() - start)
+
+        if 'unit' in chunk:
+            start = time.perf_counter()
+            self.unit_counts.append(chunk.groupby(['country_code', 'indicator_id', 'unit'], dropna=False, observed=True).size())
+            self.rule(table, 'unit_consistency', 'consistency',
+                      'Rows with an unknown unit or a unit other than their series\' main unit').add(n, 0, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        values = chunk[['country_code', 'indicator_id']].assign(value=pd.to_numeric(chunk['value']))
+        values['value_sq'] = values['value'] ** 2
+        self.series_stats.append(values.groupby(['country_code', 'indicator_id'], observed=True).agg(
+            n=('value', 'count'), total=('value', 'sum'), total_sq=('value_sq', 'sum'),
+            low=('value', 'min'), high=('value', 'max')))
+        self.rule(table, 'no_outliers', 'plausibility',
+                  f"Series with values more than {self.outlier_z:g} standard deviations from their mean").add(n, 0, time.perf_counter() - start)
+
+    def update_frame(self, frame):
+        """Validate a frame that arrived in one piece, in row slices."""
+        self.flush()
+        for start in range(0, len(frame), self.chunk_size):
+            self.check_chunk(frame.iloc[start:start + self.chunk_size])
+
+    def finish(self):
+        # Checks whose verdict needs every chunk
+        self.flush()
+        table = 'canonical_timeseries'
+        if self.key_hashes:
+            start = time.perf_counter()
+            hashes = np.concatenate(self.key_hashes)
+            duplicates = len(hashes) - len(np.unique(hashes))
+            self.rules[(table, 'no_duplicate_records')].add(0, duplicates, time.perf_counter() - start)
+            self.key_hashes = []
+
+        if self.unit_counts:
+            start = time.perf_counter()
+            counts = pd.concat(self.unit_counts).groupby(level=[0, 1, 2], dropna=False).sum().rename('rows').reset_index()
+            # The most common unit of each series is its main unit; rows in any other unit are inconsistent
+            main = counts.sort_values('rows', ascending=False, kind='stable').drop_duplicates(['country_code', 'indicator_id'])
+            counts = counts.merge(main[['country_code', 'indicator_id', 'unit']].rename(columns={'unit': 'main_unit'}),
+                                  on=['country_code', 'indicator_id'])
+            unknown = ~counts['unit'].isin(self.known_units)
+            minority = counts['unit'].astype(object) != counts['main_unit'].astype(object)
+            result = self.rules[(table, 'unit_consistency')]
+            result.add(0, counts.loc[unknown | minority, 'rows'].sum(), time.perf_counter() - start)
+            details = []
+            mixed = counts.loc[minority, ['country_code', 'indicator_id']].drop_duplicates()
+            if len(mixed):
+                details.append(f"{len(mixed)} series with more than one unit, e.g. {mixed.iloc[0, 0]}/{mixed.iloc[0, 1]}")
+            unknown_units = sorted(counts.loc[unknown, 'unit'].fillna('<missing>').astype(str).unique())
+            if unknown_units:
+                details.append(f"unknown units {unknown_units[:5]}")
+            result.detail = "; ".join(details) or None
+            self.unit_counts = []
+
+        if self.series_stats:
+            start = time.perf_counter()
+            # Series split across chunks merge their sufficient statistics
+            stats = pd.concat(self.series_stats).groupby(level=[0, 1]).agg(
+                {'n': 'sum', 'total': 'sum', 'total_sq': 'sum', 'low': 'min', 'high': 'max'})
+            mean = stats['total'] / stats['n']
+            std = np.sqrt(np.maximum(stats['total_sq'] / stats['n'] - mean ** 2, 0))
+            spread = np.maximum(stats['high'] - mean, mean - stats['low'])
+            outliers = stats[(stats['n'] >= 3) & (std > 0) & (spread > self.outlier_z * std)]
+            result = self.rules[(table, 'no_outliers')]
+            result.add(0, len(outliers), time.perf_counter() - start)
+            if len(outliers):
+                result.detail = "e.g. " + ", ".join(f"{c}/{i}" for c, i in outliers.index[:5])
+            self.series_stats = []
+
+    def results(self, validated_at=None):
+        """validation_log rows for every rule checked so far."""
+        self.finish()
+        validated_at = validated_at or datetime.now(timezone.utc).isoformat()
+        return [result.row(validated_at) for result in self.rules.values()]
+
+    def write(self, backend=None, client=None):
+        """Insert the results into validation_log in one request (or one COPY); returns the rows."""
+        rows = self.results()
+        if not rows:
+            return rows
+        backend = backend or os.getenv("PIPELINE_BACKEND", "rest")
+        if backend == "postgres":
+            import pg_bulk
+            pg_bulk.write_validation_log(rows)
+        else:
+            from supabase_client import get_client
+            (client or get_client()).table("validation_log").insert(rows).execute()
+        return rows
\ No newline at end of file
@@ -1,53 +1,199 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-from supabase import create_client
-from dotenv import load_dotenv
+import argparse
+import hashlib
 import os
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from forecast_state import FingerprintStore
+from process_pool import default_chunksize, default_workers
+from supabase_client import get_client
+from timeseries_stream import DEFAULT_PAGE_SIZE, fetch_table
 
-# Load environment variables
-load_dotenv()
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-supabase = create_client(supabase_url, supabase_key)
-
-def visualize_forecasts(country_code, indicator_name):
-    # Fetch forecast results
-    results = supabase.table("forecast_results")\
-        .select("forecast_date, forecast_value, forecast_horizon, confidence_interval_lower, confidence_interval_upper")\
-        .eq("country_code", country_code)\
-        .eq("model_name", "ARIMA(1,1,1)")\
-        .execute().data
-    
-    if not results:
-        print(f"No forecast data for {country_code}_{indicator_name}")
-        return
+CHART_COLUMNS = ["forecast_id", "country_code", "indicator_id", "forecast_date", "forecast_value", "forecast_horizon",
+                 "model_name", "confidence_interval_lower", "confidence_interval_upper"]
+RENDER_MANIFEST = "render_manifest.json"
 
-    df = pd.DataFrame(results)
-    df['forecast_date'] = pd.to_datetime(df['forecast_date'])
+# One figure per rendering process, cleared and redrawn for every chart
+_axes = None
 
-    # Create chart
-    plt.figure(figsize=(10, 6), facecolor='#1E1E1E')
-    ax = plt.gca()
+def chart_path(output_dir, country_code, indicator_name):
+    return os.path.join(output_dir, f'forecast_{country_code}_{indicator_name}.png')
+
+def new_axes():
+    import matplotlib.pyplot as plt
+    fig = plt.figure(figsize=(10, 6), facecolor='#1E1E1E')
+    # Fixed margins instead of tight_layout(), which costs a full extra draw per chart
+    fig.subplots_adjust(left=0.08, right=0.97, bottom=0.09, top=0.93)
+    return fig.add_subplot()
+
+def draw_forecast(ax, df, country_code, indicator_name, path):
+    ax.cla()
     ax.set_facecolor('#2D2D2D')
 
-    for horizon in df['forecast_horizon'].unique():
-        horizon_data = df[df['forecast_horizon'] == horizon]
-        plt.plot(horizon_data['forecast_date'], horizon_data['forecast_value'], marker='o', label=f'{horizon} Forecast')
-        plt.fill_between(horizon_data['forecast_date'], 
-                        horizon_data['confidence_interval_lower'], 
-                        horizon_data['confidence_interval_upper'], 
+    for (model, horizon), horizon_data in df.groupby(['model_name', 'forecast_horizon'], sort=False):
+        ax.plot(horizon_data['forecast_date'], horizon_data['forecast_value'], marker='o', label=f'{model} {horizon} Forecast')
+        ax.fill_between(horizon_data['forecast_date'],
+                        horizon_data['confidence_interval_lower'],
+                        horizon_data['confidence_interval_upper'],
                         alpha=0.2)
 
-    plt.title(f'Forecast for {country_code}_{indicator_name}', color='white')
-    plt.xlabel('Date', color='white')
-    plt.ylabel('Value', color='white')
-    plt.legend(facecolor='#2D2D2D', edgecolor='white', labelcolor='white')
-    plt.grid(True, color='gray', linestyle='--', alpha=0.5)
+    ax.set_title(f'Forecast for {country_code}_{indicator_name}', color='white')
+    ax.set_xlabel('Date', color='white')
+    ax.set_ylabel('Value', color='white')
+    ax.legend(facecolor='#2D2D2D', edgecolor='white', labelcolor='white')
+    ax.grid(True, color='gray', linestyle='--', alpha=0.5)
     ax.tick_params(colors='white')
-    plt.tight_layout()
-    plt.savefig(f'forecast_{country_code}_{indicator_name}.png', facecolor='#1E1E1E', edgecolor='white')
-    plt.close()
+    ax.figure.savefig(path, facecolor='#1E1E1E', edgecolor='white')
+
+def init_renderer():
+    # Runs once per worker: headless backend and a single reusable figure
+    global _axes
+    import matplotlib
+    matplotlib.use('Agg')
+    _axes = new_axes()
+
+def render_chart(job, ax=None):
+    country_code, indicator_name, df, path = job
+    draw_forecast(ax or _axes, df, country_code, indicator_name, path)
+    return path
+
+def resolve_indicator_ids(supabase, indicator_names):
+    """Map indicator names to ids with one query."""
+    rows = supabase.table("canonical_indicators").select("indicator_id, indicator_name")\
+        .in_("indicator_name", list(indicator_names)).execute().data
+    return {row['indicator_name']: row['indicator_id'] for row in rows}
+
+def pair_filter(pairs):
+    """PostgREST or_ expression matching exactly these (country_code, indicator_id) pairs, grouped by country."""
+    indicator_ids = {}
+    for country_code, indicator_id in sorted(pairs):
+        indicator_ids.setdefault(country_code, []).append(str(int(indicator_id)))
+    return ",".join(f"and(country_code.eq.{country_code},indicator_id.in.({','.join(ids)}))"
+                    for country_code, ids in indicator_ids.items())
+
+def fetch_forecasts(supabase, pairs=None, model_name=None, run_id=None, page_size=DEFAULT_PAGE_SIZE):
+    """Fetch forecast rows for a batch of series with the filters applied server-side, paging on forecast_id.
+
+    Without a run_id only the latest forecasts are read, from latest_forecasts
+    (migration 012), rather than every historical run in forecast_results.
+    """
+    frames = []
+    last_id = None
+    while True:
+        query = supabase.table("forecast_results" if run_id is not None else "latest_forecasts").select(", ".join(CHART_COLUMNS))
+        if pairs is not None:
+            query = query.or_(pair_filter(pairs))
+        if model_name is not None:
+            query = query.eq("model_name", model_name)
+        if run_id is not None:
+            query = query.eq("run_id", run_id)
+        if last_id is not None:
+            query = query.gt("forecast_id", last_id)
+        rows = query.order("forecast_id").limit(page_size).execute().data
+        if not rows:
+            break
+        last_id = rows[-1]['forecast_id']
+        frames.append(pd.DataFrame(rows, columns=CHART_COLUMNS))
+    if not frames:
+        return pd.DataFrame(columns=CHART_COLUMNS)
+    df = pd.concat(frames, ignore_index=True)
+    df['forecast_date'] = pd.to_datetime(df['forecast_date'])
+    return df
+
+def chart_fingerprint(df):
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(df.drop(columns='forecast_id'), index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def render_forecasts(series=None, model_name=None, run_id=None, output_dir='.', workers=None, batch_size=200, force=False):
+    """Render one chart per (country_code, indicator_name) pair in `series` (every forecast series when None).
+
+    Forecasts are fetched with one query per batch of series, filtered to exactly
+    those pairs, from the latest forecasts unless run_id names a run. Charts whose
+    data is unchanged since the last render (per render_manifest.json in
+    output_dir) are skipped unless force is set. Drawing runs across a process
+    pool on the Agg backend, each worker reusing one figure.
+    """
+    supabase = get_client()
+    indicators = fetch_table(supabase, "canonical_indicators", ["indicator_id", "indicator_name"], key="indicator_id")
+    indicator_names = indicators.set_index('indicator_id')['indicator_name'].to_dict()
+
+    if series is None:
+        batches = [None]
+    else:
+        name_to_id = {name: indicator_id for indicator_id, name in indicator_names.items()}
+        wanted = sorted({(country_code, name_to_id[name]) for country_code, name in series if name in name_to_id})
+        missing = sorted({name for _, name in series if name not in name_to_id})
+        if missing:
+            print(f"Unknown indicators, skipped: {missing}")
+        batches = []
+        batches = [wanted[start:start + batch_size] for start in range(0, len(wanted), batch_size)]
+
+    manifest = FingerprintStore(output_dir, filename=RENDER_MANIFEST)
+    jobs, fingerprints, skipped = [], {}, 0
+    for pairs in batches:
+        df = fetch_forecasts(supabase, pairs, model_name=model_name, run_id=run_id)
+        for (country_code, indicator_id), group in df.groupby(['country_code', 'indicator_id'], sort=True):
+            indicator_name = indicator_names.get(indicator_id, str(indicator_id))
+            path = chart_path(output_dir, country_code, indicator_name)
+            fingerprint = chart_fingerprint(group)
+            if not force and manifest.is_unchanged(path, fingerprint) and os.path.exists(path):
+                skipped += 1
+                continue
+            jobs.append((country_code, indicator_name, group.sort_values('forecast_id'), path))
+            fingerprints[path] = fingerprint
+
+    os.makedirs(output_dir, exist_ok=True)
+    workers = default_workers(workers, len(jobs))
+    if not jobs:
+        rendered = []
+    elif workers == 1:
+        import matplotlib.pyplot as plt
+        # Draw in this process on one figure, leaving the caller's matplotlib backend alone
+        ax = new_axes()
+        try:
+            rendered = [render_chart(job, ax) for job in jobs]
+        finally:
+            plt.close(ax.figure)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_renderer) as executor:
+            rendered = list(executor.map(render_chart, jobs, chunksize=default_chunksize(len(jobs), workers)))
+
+    manifest.update(fingerprints)
+    manifest.save()
+    print(f"Rendered {len(rendered)} forecast charts, skipped {skipped} unchanged")
+    return rendered
+
+def visualize_forecasts(country_code, indicator_name, model_name=None):
+    import matplotlib.pyplot as plt
+
+    # Fetch forecast results for this series (for every model unless one is named)
+    supabase = get_client()
+    indicator_id = resolve_indicator_ids(supabase, [indicator_name]).get(indicator_name)
+    if indicator_id is None:
+        print(f"Unknown indicator: {indicator_name}")
+        return
+    df = fetch_forecasts(supabase, [(country_code, indicator_id)], model_name=model_name)
+
+    if df.empty:
+        print(f"No forecast data for {country_code}_{indicator_name}")
+        return
+
+    # Create chart
+    ax = new_axes()
+    draw_forecast(ax, df, country_code, indicator_name, f'forecast_{country_code}_{indicator_name}.png')
+    plt.close(ax.figure)
     print(f"Saved forecast chart for {country_code}_{indicator_name}")
 
 if __name__ == "__main__":
-    visualize_forecasts("MEX", "GDP")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Render forecast charts")
+    parser.add_argument("--series", default=None, help="comma-separated COUNTRY_Indicator name pairs (default: every forecast series)")
+    parser.add_argument("--model", default=None, help="only plot this model")
+    parser.add_argument("--run-id", default=None, help="only plot this run")
+    parser.add_argument("--output-dir", default=".", help="directory for the PNG files")
+    parser.add_argument("--workers", type=int, default=None, help="number of rendering processes")
+    parser.add_argument("--force", action="store_true", help="re-render charts whose data has not changed")
+    args = parser.parse_args()
+
+    series = [tuple(pair.split('_', 1)) for pair in args.series.split(',')] if args.series else None
+    render_forecasts(series, model_name=args.model, run_id=args.run_id, output_dir=args.output_dir,
+                     workers=args.workers, force=args.force)
\ No newline at end of file
@@ -1,17 +1,11 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-from supabase import create_client
-from dotenv import load_dotenv
-import os
-
-# Load environment variables
-load_dotenv()
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-supabase = create_client(supabase_url, supabase_key)
+from supabase_client import get_client
 
 def visualize_taxonomy():
+    import matplotlib.pyplot as plt
+
     try:
+        supabase = get_client()
         # Fetch taxonomy mappings
         mappings = supabase.table("taxonomy_mapping")\
             .select("category_id")\
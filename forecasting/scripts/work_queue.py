@@ -0,0 +1,310 @@
+import json
+import os
+import socket
+import threading
+import time
+import pandas as pd
+import pg_bulk
+from db_connect import get_db_connection, get_pooled_connection
+from forecast_engine import ENGINES, run_forecasts
+from forecast_sink import default_run_id
+from model_registry import DEFAULT_MODEL
+from telemetry import flush, span
+
+# Series per task: enough to amortize a claim and a results write, few enough to spread over many workers
+DEFAULT_TASK_SIZE = 100
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+# How long an idle worker waits before looking again while other workers still hold tasks
+DEFAULT_POLL_SECONDS = 5
+
+# A task is claimable while pending, or while running under a lease nobody renewed
+CLAIM_SQL = """
+    WITH next AS (
+        SELECT task_id FROM forecast_tasks
+        WHERE (%(run_id)s::text IS NULL OR run_id = %(run_id)s)
+          AND attempts < max_attempts
+          AND (status = 'pending' OR (status = 'running' AND lease_expires_at < NOW()))
+        ORDER BY task_id
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE forecast_tasks t SET
+        status = 'running', attempts = t.attempts + 1, worker_id = %(worker_id)s,
+        lease_expires_at = NOW() + make_interval(secs => %(lease_seconds)s), heartbeat_at = NOW(), updated_at = NOW()
+    FROM next
+    WHERE t.task_id = next.task_id
+    RETURNING t.task_id, t.run_id, t.task_key, t.payload, t.attempts
+"""
+# Tasks whose lease ran out on their last attempt will never be claimed again
+EXPIRE_SQL = """
+    UPDATE forecast_tasks SET status = 'failed', last_error = COALESCE(last_error, 'lease expired'), updated_at = NOW()
+    WHERE (%(run_id)s::text IS NULL OR run_id = %(run_id)s)
+      AND status = 'running' AND lease_expires_at < NOW() AND attempts >= max_attempts
+"""
+
+def encode_task(task):
+    # JSON form of a forecast_data task; the series is rebuilt from its start, frequency and values
+    series = task['series']
+    return {
+        'column': task['column'],
+        'country_code': task['country_code'],
+        'indicator_id': int(task['indicator_id']),
+        'period_months': task['period_months'],
+        'freq': series.index.freqstr,
+        'start': series.index[0].strftime('%Y-%m-%d'),
+        'values': series.tolist()
+    }
+
+def decode_task(item):
+    index = pd.date_range(item['start'], periods=len(item['values']), freq=item['freq'], name='date_value')
+    return {
+        'column': item['column'],
+        'country_code': item['country_code'],
+        'indicator_id': item['indicator_id'],
+        'period_months': item['period_months'],
+        'series': pd.Series(item['values'], index=index, dtype='float64')
+    }
+
+def enqueue_run(preprocessed_data, countries, indicators, run_id=None, horizons=['1M', '3M', '6M'], model=DEFAULT_MODEL,
+                criterion='cv', engine='statsmodels', task_size=DEFAULT_TASK_SIZE, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Coordinator side: queue the run's series in forecast_tasks, task_size series per task.
+
+    Each task carries its series and the fit options, so workers need nothing
+    but the database. Tasks are keyed by their position in the run, so
+    enqueueing the same run again adds nothing. Returns (run_id, tasks added).
+    """
+    from forecast_data import build_tasks
+    try:
+        run_id = run_id or default_run_id()
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown forecast engine: {engine}")
+        options = {'horizons': list(horizons), 'model': model, 'criterion': criterion, 'engine': engine}
+        with span("work_queue.enqueue") as stage:
+            items = [encode_task(task) for task in build_tasks(preprocessed_data, countries, indicators)]
+            tasks = [{
+                'run_id': run_id,
+                'task_key': f"{start // task_size:06d}",
+                'payload': {'options': options, 'series': items[start:start + task_size]},
+                'max_attempts': max_attempts
+            } for start in range(0, len(items), task_size)]
+            added = pg_bulk.write_forecast_tasks(tasks) if tasks else 0
+            stage.set(rows_in=len(items), rows_out=added)
+        print(f"Enqueued {added} of {len(tasks)} tasks ({len(items)} series) for run {run_id}")
+        return run_id, added
+    except Exception as e:
+        print(f"Error enqueueing forecast tasks: {str(e)}")
+        raise
+
+def claim_task(conn, worker_id, run_id=None, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """Claim the oldest claimable task (of run_id, or of any run) for worker_id; None when there is none."""
+    params = {'run_id': run_id, 'worker_id': worker_id, 'lease_seconds': lease_seconds}
+    with conn.cursor() as cur:
+        cur.execute(EXPIRE_SQL, params)
+        cur.execute(CLAIM_SQL, params)
+        row = cur.fetchone()
+    conn.commit()
+    if row is None:
+        return None
+    task_id, run_id, task_key, payload, attempts = row
+    return {'task_id': task_id, 'run_id': run_id, 'task_key': task_key, 'payload': payload, 'attempts': attempts}
+
+def complete_task(conn, task, worker_id, result):
+    """Mark a task done; False if its lease was lost to another worker, which then owns it."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE forecast_tasks SET status = 'done', result = %s, lease_expires_at = NULL, updated_at = NOW()
+            WHERE task_id = %s AND worker_id = %s AND status = 'running'
+        """, (json.dumps(result), task['task_id'], worker_id))
+        completed = cur.rowcount == 1
+    conn.commit()
+    return completed
+
+def fail_task(conn, task, worker_id, error):
+    """Give a task back for another attempt, or mark it failed once it has used max_attempts."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE forecast_tasks SET
+                status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'pending' END,
+                worker_id = NULL, lease_expires_at = NULL, last_error = %s, updated_at = NOW()
+            WHERE task_id = %s AND worker_id = %s AND status = 'running'
+        """, (error, task['task_id'], worker_id))
+    conn.commit()
+
+def open_tasks(conn, run_id=None):
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT COUNT(*) FROM forecast_tasks
+            WHERE (%(run_id)s::text IS NULL OR run_id = %(run_id)s) AND status IN ('pending', 'running')
+        """, {'run_id': run_id})
+        count = cur.fetchone()[0]
+    conn.commit()
+    return count
+
+class Heartbeat:
+    """Renew a claimed task's lease from a background thread while the worker fits.
+
+    Uses its own pooled connection, so long fits never delay it. lost is set
+    once the lease can no longer be renewed because another worker has taken
+    the task; the worker then stops and leaves the task to it.
+    """
+
+    def __init__(self, task, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS, interval=None):
+        self.task_id = task['task_id']
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.interval = interval or lease_seconds / 3
+        self.lost = False
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def renew(self):
+        with get_pooled_connection() as conn, conn.cursor() as cur:
+            cur.execute("""
+                UPDATE forecast_tasks SET lease_expires_at = NOW() + make_interval(secs => %s), heartbeat_at = NOW()
+                WHERE task_id = %s AND worker_id = %s AND status = 'running'
+            """, (self.lease_seconds, self.task_id, self.worker_id))
+            return cur.rowcount == 1
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                if not self.renew():
+                    self.lost = True
+                    return
+            except Exception as e:
+                # A missed beat is not fatal; the lease outlasts several intervals
+                print(f"Heartbeat for task {self.task_id} failed: {str(e)}")
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stopped.set()
+        self.thread.join()
+        return False
+
+def process_task(task, heartbeat=None):
+    """Fit a claimed task's series and upsert their forecasts; None if the lease was lost part way."""
+    options = task['payload']['options']
+    tasks = [decode_task(item) for item in task['payload']['series']]
+    failed = {}
+    with pg_bulk.PgForecastSink(run_id=task['run_id']) as sink:
+        for outcome in run_forecasts(tasks, options['horizons'], workers=1, model=options['model'],
+                                     criterion=options['criterion'], engine=options['engine']):
+            if outcome['error'] is not None:
+                failed[outcome['column']] = outcome['error']
+            else:
+                sink.add(outcome['results'])
+            if heartbeat is not None and heartbeat.lost:
+                return None
+    return {'series': len(tasks), 'rows': sink.written, 'failed': failed}
+
+def run_worker(run_id=None, worker_id=None, lease_seconds=DEFAULT_LEASE_SECONDS, poll_seconds=DEFAULT_POLL_SECONDS,
+               max_tasks=None, wait=True):
+    """Claim and fit tasks until the queue (of run_id, or of every run) is drained; returns counts.
+
+    With wait, an idle worker keeps polling while other workers hold tasks,
+    since a worker that dies leaves its task to be claimed once its lease
+    expires.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    stats = {'done': 0, 'failed': 0, 'lost': 0, 'series': 0, 'rows': 0}
+    try:
+        with get_db_connection() as conn:
+            while max_tasks is None or stats['done'] + stats['failed'] + stats['lost'] < max_tasks:
+                task = claim_task(conn, worker_id, run_id, lease_seconds)
+                if task is None:
+                    if wait and open_tasks(conn, run_id):
+                        time.sleep(poll_seconds)
+                        continue
+                    break
+
+                with span("work_queue.task") as step, Heartbeat(task, worker_id, lease_seconds) as heartbeat:
+                    try:
+                        result = process_task(task, heartbeat)
+                    except Exception as e:
+                        print(f"Task {task['run_id']}/{task['task_key']} failed on attempt {task['attempts']}: {str(e)}")
+                        fail_task(conn, task, worker_id, str(e))
+                        stats['failed'] += 1
+                        continue
+                    if result is None or not complete_task(conn, task, worker_id, result):
+                        print(f"Lost the lease on task {task['run_id']}/{task['task_key']}")
+                        stats['lost'] += 1
+                        continue
+                    step.set(rows_in=result['series'], rows_out=result['rows'], task_id=task['task_id'], attempt=task['attempts'])
+                stats['done'] += 1
+                stats['series'] += result['series']
+                stats['rows'] += result['rows']
+        print(f"Worker {worker_id} finished: {stats}")
+        return stats
+    except Exception as e:
+        print(f"Error in forecast worker {worker_id}: {str(e)}")
+        raise
+    finally:
+        flush()
+
+def run_status(run_id):
+    """Task counts by status for a run, with the series and rows of its finished tasks."""
+    with get_pooled_connection() as conn, conn.cursor() as cur:
+        cur.execute("""
+            SELECT status, COUNT(*), COALESCE(SUM((result->>'series')::int), 0), COALESCE(SUM((result->>'rows')::int), 0)
+            FROM forecast_tasks WHERE run_id = %s GROUP BY status
+        """, (run_id,))
+        rows = cur.fetchall()
+    status = {name: count for name, count, _, _ in rows}
+    status['series'] = sum(series for _, _, series, _ in rows)
+    status['rows'] = sum(written for _, _, _, written in rows)
+    return status
+
+def wait_for_run(run_id, poll_seconds=DEFAULT_POLL_SECONDS):
+    """Block until none of the run's tasks is pending or running; returns run_status."""
+    while True:
+        status = run_status(run_id)
+        if not status.get('pending') and not status.get('running'):
+            return status
+        print(f"Run {run_id}: {status}")
+        time.sleep(poll_seconds)
+
+if __name__ == "__main__":
+    import argparse
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    parser = argparse.ArgumentParser(description="Distribute forecast fits over workers through a Postgres queue")
+    parser.add_argument("command", choices=["enqueue", "work", "status"])
+    parser.add_argument("--run-id", default=None, help="run to enqueue, work on or report (default: today's date; work: any run)")
+    parser.add_argument("--task-size", type=int, default=DEFAULT_TASK_SIZE, help="series per task")
+    parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS, help="claims per task before it is marked failed")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="registry model name, or 'auto' to select per series")
+    parser.add_argument("--criterion", choices=["cv", "aic"], default="cv", help="selection criterion for --model auto ('aic' picks among ARIMA orders only)")
+    parser.add_argument("--engine", choices=ENGINES, default="statsmodels", help="'batched' fits each task's ARIMA(1,1,1) series together")
+    parser.add_argument("--as-of", default=None, help="forecast from the data as known on this date, or 'latest'")
+    parser.add_argument("--wait", action="store_true", help="enqueue: block until every task is done or failed")
+    parser.add_argument("--processes", type=int, default=1, help="work: worker processes on this node")
+    parser.add_argument("--lease-seconds", type=int, default=DEFAULT_LEASE_SECONDS, help="work: lease renewed by each heartbeat")
+    parser.add_argument("--no-wait", action="store_true", help="work: exit as soon as nothing is claimable")
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        from fetch_data import fetch_validated_data
+        from preprocess_data import preprocess_panel
+        countries, indicators, timeseries = fetch_validated_data(backend="postgres", as_of=args.as_of)
+        panel = preprocess_panel(countries, indicators, timeseries)
+        run_id, _ = enqueue_run(panel, countries, indicators, run_id=args.run_id, model=args.model, criterion=args.criterion,
+                                engine=args.engine, task_size=args.task_size, max_attempts=args.max_attempts)
+        if args.wait:
+            print(f"Run {run_id} finished: {wait_for_run(run_id)}")
+    elif args.command == "work":
+        worker = dict(run_id=args.run_id, lease_seconds=args.lease_seconds, wait=not args.no_wait)
+        if args.processes == 1:
+            run_worker(**worker)
+        else:
+            # Spawned, not forked: each worker opens its own connections
+            with ProcessPoolExecutor(args.processes, mp_context=multiprocessing.get_context("spawn")) as executor:
+                futures = [executor.submit(run_worker, **worker) for _ in range(args.processes)]
+                totals = pd.DataFrame([future.result() for future in futures]).sum().to_dict()
+            print(f"All workers finished: {totals}")
+    else:
+        print(run_status(args.run_id or default_run_id()))
\ No newline at end of file